@@ -0,0 +1,119 @@
+"""Compare the torch, ONNX and int8 ONNX sentence-embedding backends.
+
+Run from the repository root after exporting the model::
+
+    python packages/backend/embedder.py export --quantize
+    python -m benchmarks.bench_embedder --backends torch onnx onnx-int8
+
+Each backend is measured in a fresh interpreter so cold start (imports plus
+model load) and peak RSS are not shared between runs.  Throughput is the
+sentences per second of batched ``encode`` calls, and the cosine column is
+the worst agreement with the first backend over the benchmark sentences.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+VARIANTS = {
+    "torch": ("torch", False),
+    "onnx": ("onnx", False),
+    "onnx-int8": ("onnx", True),
+}
+
+
+def sentences(count: int) -> list:
+    topics = ["object storage", "message queue", "relational database", "search index",
+              "container platform", "identity provider", "data warehouse", "API gateway"]
+    return [
+        f"Which applications use {topics[i % len(topics)]} for workload {i}?"
+        for i in range(count)
+    ]
+
+
+def child(args: argparse.Namespace) -> None:
+    """Measure one backend and print the results as JSON."""
+    start = time.perf_counter()
+    sys.path.insert(0, str(BACKEND_DIR))
+    from embedder import load_embedder  # type: ignore
+
+    backend, quantized = VARIANTS[args.child]
+    model = load_embedder(backend, args.model, args.onnx_dir, quantized)
+    model.encode(["warm up"], convert_to_numpy=True)
+    cold_start = time.perf_counter() - start
+
+    texts = sentences(args.sentences)
+    start = time.perf_counter()
+    embeddings = np.concatenate(
+        [
+            np.asarray(model.encode(texts[i : i + args.batch_size], convert_to_numpy=True))
+            for i in range(0, len(texts), args.batch_size)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    np.save(args.output, embeddings.astype("float32"))
+    print(
+        json.dumps(
+            {
+                "cold_start_s": cold_start,
+                "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "sentences_per_s": len(texts) / elapsed,
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-dir", default=None, help="defaults to EMBEDDER_ONNX_DIR")
+    parser.add_argument("--sentences", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--child", choices=list(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{'backend':<10} {'cold s':>7} {'RSS MB':>8} {'sent/s':>9} {'min cos':>8}")
+    reference = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends:
+            output = Path(tmp) / f"{name}.npy"
+            cmd = [
+                sys.executable, "-m", "benchmarks.bench_embedder", "--child", name,
+                "--output", str(output), "--model", args.model,
+                "--sentences", str(args.sentences), "--batch-size", str(args.batch_size),
+            ]
+            if args.onnx_dir:
+                cmd += ["--onnx-dir", args.onnx_dir]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{name:<10} failed: {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            embeddings = np.load(output)
+            if reference is None:
+                reference = embeddings
+            cosine = float(np.min(np.sum(reference * embeddings, axis=1)))
+            print(
+                f"{name:<10} {r['cold_start_s']:>7.2f} {r['rss_mb']:>8.1f} "
+                f"{r['sentences_per_s']:>9.1f} {cosine:>8.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
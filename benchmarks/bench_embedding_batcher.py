@@ -0,0 +1,109 @@
+"""Measure query-embedding throughput with and without micro-batching.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_embedding_batcher --concurrency 1 8 32 128
+
+By default the encoder is simulated as a fixed per-call overhead plus a
+per-sentence cost (``--overhead-ms``/``--per-item-ms``), which is how a
+transformer forward pass behaves on CPU.  Pass ``--model all-MiniLM-L6-v2``
+to measure the real sentence model instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from benchmarks.common import percentile
+from embedding_batcher import EmbeddingBatcher  # type: ignore
+
+
+def simulated_encoder(overhead_ms: float, per_item_ms: float) -> Callable[[List[str]], np.ndarray]:
+    def encode(texts: List[str]) -> np.ndarray:
+        time.sleep((overhead_ms + per_item_ms * len(texts)) / 1000)
+        return np.zeros((len(texts), 384), dtype="float32")
+
+    return encode
+
+
+async def run_level(
+    strategy: str, encode: Callable[[List[str]], np.ndarray], concurrency: int, total: int, args
+) -> dict:
+    batcher = (
+        EmbeddingBatcher(encode, args.max_batch_size, args.max_wait_ms)
+        if strategy == "batched"
+        else None
+    )
+    latencies: List[float] = []
+    counter = iter(range(total))
+
+    async def one(i: int) -> None:
+        start = time.perf_counter()
+        text = f"which applications use technology {i}?"
+        if strategy == "inline":
+            encode([text])  # blocks the event loop, like the original code path
+        elif strategy == "thread":
+            await asyncio.to_thread(encode, [text])
+        else:
+            await batcher.encode(text)
+        latencies.append(time.perf_counter() - start)
+
+    async def client() -> None:
+        for i in counter:
+            await one(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    if batcher is not None:
+        batcher.close()
+    return {
+        "qps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "batch": batcher.stats()["mean_batch_size"] if batcher else 1.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--overhead-ms", type=float, default=8.0)
+    parser.add_argument("--per-item-ms", type=float, default=0.5)
+    parser.add_argument("--model", default=None, help="use a real SentenceTransformer model")
+    parser.add_argument(
+        "--strategies", nargs="+", default=["inline", "thread", "batched"]
+    )
+    args = parser.parse_args()
+
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(args.model)
+
+        def encode(texts: List[str]) -> np.ndarray:
+            return model.encode(texts, convert_to_numpy=True)
+
+    else:
+        encode = simulated_encoder(args.overhead_ms, args.per_item_ms)
+
+    print(f"{'strategy':<8} {'conc':>5} {'qps':>9} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for concurrency in args.concurrency:
+        for strategy in args.strategies:
+            r = asyncio.run(run_level(strategy, encode, concurrency, args.requests, args))
+            print(
+                f"{strategy:<8} {concurrency:>5} {r['qps']:>9.1f} {r['p50_ms']:>8.1f} "
+                f"{r['p95_ms']:>8.1f} {r['batch']:>6.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
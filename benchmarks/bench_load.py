@@ -0,0 +1,269 @@
+"""Load-test the HTTP service against simulated Bedrock and ABACUS endpoints.
+
+Run from the repository root (no network or model download needed)::
+
+    python -m benchmarks.bench_load --applications 100000 --concurrency 1 8 32 64
+
+A synthetic catalog is served by :mod:`benchmarks.simulator`, and the real
+FastAPI app runs under uvicorn in a child process configured through the
+usual environment variables to use the simulator, a temporary vector store
+and memory, and the hashing encoder instead of the sentence model.  The
+child builds its indexes from the simulated ABACUS collections on start-up,
+so the reported start-up time includes paging and embedding the catalog.
+
+For each concurrency level ``--requests`` questions are posted to ``/ask``
+by that many clients, each with its own session.  The table reports
+throughput, latency percentiles, errors and the server process's CPU use
+(100% = one core) and resident memory.  ``--json`` also writes the rows to
+a file so runs can be compared across commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, percentile
+from benchmarks.simulator import Simulator
+from benchmarks.synthetic_catalog import generate_catalog, sample_questions
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the service on ``args.serve`` with the offline encoder."""
+    import uvicorn
+
+    from benchmarks.common import HashingEncoder
+
+    import main  # type: ignore
+    import orchestrator  # type: ignore
+    import vector_index  # type: ignore
+
+    vector_index.VECTOR_DIR = Path(args.workdir) / "vector_store"
+    orchestrator.load_embedder = lambda *a, **kw: HashingEncoder()
+    uvicorn.run(main.app, host="127.0.0.1", port=args.serve, log_level="warning")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_env(args: argparse.Namespace, sim: Simulator, workdir: str) -> Dict[str, str]:
+    caches = "true" if args.caches else "false"
+    return {
+        **os.environ,
+        "BEDROCK_API_BASE": sim.url,
+        "BEDROCK_API_KEY": "bench",
+        "BEDROCK_MODEL_ID": "bench",
+        "ABACUS_BASE_URL": sim.url,
+        "ABACUS_CLIENT_SECRET": "bench",
+        "LONG_TERM_PATH": str(Path(workdir) / "long_term.db"),
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": caches,
+        "LLM_MEMO_ENABLED": caches,
+        "CATALOG_SYNC_INTERVAL": "0",
+        "PIPELINE_MODE": args.pipeline_mode,
+    }
+
+
+class ProcessStats:
+    """CPU seconds and memory of a process read from ``/proc`` (Linux only)."""
+
+    def __init__(self, pid: int) -> None:
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self) -> Optional[float]:
+        try:
+            fields = Path(f"/proc/{self.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime are fields 14 and 15; the split starts at field 3.
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def memory_mb(self) -> Tuple[Optional[float], Optional[float]]:
+        """Return the current and peak resident set size."""
+        try:
+            lines = Path(f"/proc/{self.pid}/status").read_text().splitlines()
+        except OSError:
+            return None, None
+        values = {
+            key: int(rest.split()[0]) / 1024
+            for key, _, rest in (line.partition(":") for line in lines)
+            if key in {"VmRSS", "VmHWM"}
+        }
+        return values.get("VmRSS"), values.get("VmHWM")
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float) -> float:
+    start = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Server exited with status {proc.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server did not start within {timeout:.0f}s")
+
+
+async def _drive(
+    url: str, questions: List[str], concurrency: int, timeout: float
+) -> Tuple[List[float], int, float]:
+    """Post ``questions`` with ``concurrency`` clients; return latencies, errors, wall time."""
+    pending = iter(enumerate(questions))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker(client: httpx.AsyncClient, worker_id: int) -> None:
+        nonlocal errors
+        for i, question in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{url}/ask",
+                    json={"question": question, "session_id": f"bench-{worker_id}"},
+                )
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, n) for n in range(concurrency)))
+        wall = time.perf_counter() - start
+    return latencies, errors, wall
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "n/a" if value is None else format(value, spec)
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    capabilities, applications = generate_catalog(
+        args.applications, args.capabilities, args.seed
+    )
+    sim = Simulator(
+        capabilities,
+        applications,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        abacus_latency=args.abacus_latency,
+        llm_error_rate=args.llm_error_rate,
+    )
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    rows: List[Dict[str, Any]] = []
+    with sim, tempfile.TemporaryDirectory() as workdir:
+        cmd = [
+            sys.executable, "-m", "benchmarks.bench_load",
+            "--serve", str(port), "--workdir", workdir,
+        ]
+        proc = subprocess.Popen(cmd, env=_server_env(args, sim, workdir), cwd=BACKEND_DIR.parents[1])
+        try:
+            startup = await _wait_ready(url, proc, args.startup_timeout)
+            stats = ProcessStats(proc.pid)
+            print(
+                f"{len(capabilities)} capabilities, {len(applications)} applications; "
+                f"server ready in {startup:.1f}s "
+                f"(RSS {_fmt(stats.memory_mb()[0], '.0f')} MB)"
+            )
+            print(
+                f"{'conc':>5} {'reqs':>6} {'errs':>5} {'QPS':>8} {'p50 ms':>8} "
+                f"{'p95 ms':>8} {'p99 ms':>8} {'CPU %':>6} {'RSS MB':>7}"
+            )
+            for level in args.concurrency:
+                questions = sample_questions(capabilities, args.requests, seed=args.seed + level)
+                cpu_before = stats.cpu_seconds()
+                latencies, errors, wall = await _drive(url, questions, level, args.timeout)
+                cpu_after = stats.cpu_seconds()
+                cpu = (
+                    None
+                    if cpu_before is None or cpu_after is None
+                    else 100 * (cpu_after - cpu_before) / wall
+                )
+                rss, peak = stats.memory_mb()
+                row = {
+                    "concurrency": level,
+                    "requests": len(questions),
+                    "errors": errors,
+                    "qps": len(latencies) / wall,
+                    "p50_ms": percentile(latencies, 50) * 1000,
+                    "p95_ms": percentile(latencies, 95) * 1000,
+                    "p99_ms": percentile(latencies, 99) * 1000,
+                    "cpu_pct": cpu,
+                    "rss_mb": rss,
+                    "peak_rss_mb": peak,
+                }
+                rows.append(row)
+                print(
+                    f"{level:>5} {row['requests']:>6} {errors:>5} {row['qps']:>8.1f} "
+                    f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                    f"{_fmt(cpu, '.0f'):>6} {_fmt(rss, '.0f'):>7}"
+                )
+            print(f"simulator: {sim.llm_calls} LLM calls, {sim.abacus_requests} ABACUS requests")
+        finally:
+            proc.send_signal(signal.SIGINT)
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    if args.json:
+        summary = {"startup_s": startup, "applications": len(applications), "levels": rows}
+        Path(args.json).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--applications", type=int, default=10_000)
+    parser.add_argument("--capabilities", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-jitter", type=float, default=0.01)
+    parser.add_argument("--abacus-latency", type=float, default=0.01)
+    parser.add_argument(
+        "--llm-error-rate", type=float, default=0.0, help="fraction of LLM calls failing with 503"
+    )
+    parser.add_argument("--pipeline-mode", default="full")
+    parser.add_argument(
+        "--caches", action="store_true", help="keep the response cache and LLM memo enabled"
+    )
+    parser.add_argument("--timeout", type=float, default=60.0, help="per request")
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare latency and LLM call count of the orchestrator pipeline modes.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_pipeline --requests 50 --latency 0.2
+
+Bedrock is replaced by an in-process fake that sleeps for ``--latency``
+seconds (with ``--jitter``) per call, so the numbers reflect the number of
+sequential round trips each mode makes rather than real model speed.
+``overlap ms`` is the mean stage time per request hidden by running
+independent stages concurrently.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.common import offline_orchestrator, percentile
+
+QUERIES = [
+    "which apps use AWS?",
+    "container orchestration",
+    "I need a place to store large files and share them with partners",
+    "what do we use for claims processing and which database backs it?",
+]
+
+
+async def bench_mode(mode: str, requests: int, latency: float, jitter: float) -> dict:
+    orch = offline_orchestrator(mode, latency, jitter)
+    timings: List[float] = []
+    for i in range(requests):
+        start = time.perf_counter()
+        await orch.run(QUERIES[i % len(QUERIES)])
+        timings.append(time.perf_counter() - start)
+    return {
+        "mode": mode,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "calls_per_request": orch.adapter.calls / requests,
+        "overlap_ms": orch.stats().get("stages", {}).get("saved_ms", 0.0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument(
+        "--modes", nargs="+", default=["full", "merged", "direct"]
+    )
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'p50 ms':>9} {'p95 ms':>9} {'calls/req':>10} {'overlap ms':>11}")
+    for mode in args.modes:
+        result = asyncio.run(bench_mode(mode, args.requests, args.latency, args.jitter))
+        print(
+            f"{result['mode']:<8} {result['p50_ms']:>9.1f} "
+            f"{result['p95_ms']:>9.1f} {result['calls_per_request']:>10.2f} "
+            f"{result['overlap_ms']:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
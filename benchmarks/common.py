@@ -0,0 +1,129 @@
+"""Shared helpers for the offline benchmarks."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Ensure backend modules can be imported
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import orchestrator as orch_module  # type: ignore  # noqa: E402
+from catalog import Catalog  # type: ignore  # noqa: E402
+from memory import ShortTermSessions  # type: ignore  # noqa: E402
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder standing in for the sentence model."""
+
+    def __init__(self, dim: int = 64) -> None:
+        self.dim = dim
+
+    def encode(self, texts: Sequence[str], convert_to_numpy: bool = True) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.md5(word.encode()).digest()
+                out[row, int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        return out
+
+
+def fake_completion(system: str, user: str) -> str:
+    """Return a plausible reply of the agent whose system prompt is ``system``."""
+    if "search keywords" in system:
+        return json.dumps({"query": user.split(":", 1)[-1].strip()})
+    if "Rank the following" in system:
+        return json.dumps(re.findall(r"^- (\S+):", user, re.MULTILINE))
+    return "- Suggested application"
+
+
+class FakeBedrock:
+    """Adapter double that sleeps for a simulated round trip and counts calls."""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.01) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.model_id = "bench"
+        self.temperature = 0.7
+        self.max_tokens = 512
+        self.calls = 0
+
+    async def acreate(self, model, messages, *, max_tokens=None, temperature=None):
+        self.calls += 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        content = fake_completion(messages[0]["content"], messages[-1]["content"])
+        return {"choices": [{"message": {"content": content}}]}
+
+
+class _ListMemory:
+    def __init__(self) -> None:
+        self.messages: List[Dict[str, str]] = []
+
+    async def aadd_turn(self, question: str, answer: str, session_id: str = "", **kwargs: Any) -> None:
+        self.messages.append({"role": "user", "content": question})
+        self.messages.append({"role": "assistant", "content": answer})
+
+
+def load_catalog() -> List[Dict[str, str]]:
+    entries: List[Dict[str, str]] = []
+    for name in ("technology_capabilities.json", "applications.json"):
+        with (BACKEND_DIR / name).open("r", encoding="utf-8") as fh:
+            entries.extend(json.load(fh))
+    return entries
+
+
+def offline_orchestrator(
+    mode: str = "full", latency: float = 0.05, jitter: float = 0.01
+) -> "orch_module.Orchestrator":
+    """Return an ``Orchestrator`` wired to in-process fakes (no network, no model)."""
+    orch = object.__new__(orch_module.Orchestrator)
+    orch.pipeline_mode = mode
+    orch.short_query_words = orch_module.settings.PIPELINE_SHORT_QUERY_WORDS
+    orch.candidate_top_n = orch_module.settings.APP_CANDIDATE_TOP_N
+    orch.ranker_token_budget = orch_module.settings.RANKER_PROMPT_TOKEN_BUDGET
+    orch.recall_top_k = 0
+    orch.adapter = FakeBedrock(latency, jitter)
+    orch._vector_model = HashingEncoder()
+    orch.short_memories = ShortTermSessions()
+    orch.long_memory = _ListMemory()
+    orch.response_cache = None
+    orch.llm_memo = None
+    settings = orch_module.settings
+    # Query embeddings go through the batcher thread as in the service.
+    orch.embedding_batcher = (
+        orch_module.EmbeddingBatcher(
+            orch._encode, settings.EMBED_BATCH_MAX_SIZE, settings.EMBED_BATCH_MAX_WAIT_MS
+        )
+        if settings.EMBED_BATCHING
+        else None
+    )
+    orch.embedding_cache = None
+    orch._stage_stats = orch_module.StageStats()
+
+    entries = load_catalog()
+    orch.catalog = Catalog(
+        [e for e in entries if "category" in e],
+        [e for e in entries if "technologies" in e],
+    )
+    orch.capability_index, _ = orch._build_capability_index(orch.catalog.capabilities)
+    orch.application_index, _ = orch._build_application_index(orch.catalog.applications)
+    return orch
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Return the ``pct`` percentile of ``samples`` (nearest-rank)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
@@ -0,0 +1,212 @@
+"""Local stand-ins for the Bedrock and ABACUS HTTP APIs.
+
+One threaded HTTP server answers:
+
+* ``POST /chat/completions`` in the OpenAI format (plain and ``stream``),
+  replying like the planner, ranker or synthesizer agent its system prompt
+  belongs to, with a ``usage`` block;
+* ``POST /query`` like the ABACUS plan endpoint;
+* ``GET /capabilities`` and ``GET /applications`` as OData collections
+  honoring ``$top``, ``$skip`` and ``$count``.
+
+Each reply is delayed by a normally distributed latency.  Run it on its own
+to point a development server at it::
+
+    python -m benchmarks.simulator --applications 10000 --port 8900
+    BEDROCK_API_BASE=http://127.0.0.1:8900 BEDROCK_API_KEY=x \\
+    ABACUS_BASE_URL=http://127.0.0.1:8900 ABACUS_CLIENT_SECRET=x python main.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.common import fake_completion
+from benchmarks.synthetic_catalog import generate_catalog
+
+
+class Simulator:
+    """Fake Bedrock and ABACUS endpoints served from a background thread.
+
+    ``llm_latency``/``llm_jitter`` and ``abacus_latency``/``abacus_jitter``
+    are the mean and standard deviation, in seconds, of each reply's delay.
+    ``llm_error_rate`` of chat completions fail with ``503`` to exercise
+    retries and circuit breaking.
+    """
+
+    def __init__(
+        self,
+        capabilities: List[Dict[str, Any]],
+        applications: List[Dict[str, Any]],
+        *,
+        llm_latency: float = 0.05,
+        llm_jitter: float = 0.01,
+        abacus_latency: float = 0.01,
+        abacus_jitter: float = 0.0,
+        llm_error_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.collections = {"capabilities": capabilities, "applications": applications}
+        self.llm_latency, self.llm_jitter = llm_latency, llm_jitter
+        self.abacus_latency, self.abacus_jitter = abacus_latency, abacus_jitter
+        self.llm_error_rate = llm_error_rate
+        self.llm_calls = 0
+        self.abacus_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "Simulator":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="simulator", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "Simulator":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def delay(self, latency: float, jitter: float) -> None:
+        time.sleep(max(0.0, random.gauss(latency, jitter)))
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def _handler(sim: Simulator) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _send_json(self, payload: Any, status: int = 200) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_POST(self) -> None:
+            path = urlsplit(self.path).path.rstrip("/")
+            payload = self._body()
+            if path.endswith("/chat/completions"):
+                sim.count("llm_calls")
+                self._chat(payload)
+            elif path.endswith("/query"):
+                sim.count("abacus_requests")
+                sim.delay(sim.abacus_latency, sim.abacus_jitter)
+                self._send_json({"response": f"Executed plan: {payload.get('plan', '')}"})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def _chat(self, payload: Dict[str, Any]) -> None:
+            messages = payload.get("messages") or [{"content": ""}]
+            content = fake_completion(messages[0]["content"], messages[-1]["content"])
+            usage = {
+                "prompt_tokens": sum(len(m.get("content", "")) for m in messages) // 4 + 1,
+                "completion_tokens": len(content) // 4 + 1,
+            }
+            sim.delay(sim.llm_latency, sim.llm_jitter)
+            if random.random() < sim.llm_error_rate:
+                self._send_json({"error": "simulated outage"}, 503)
+                return
+            if not payload.get("stream"):
+                self._send_json(
+                    {
+                        "model": payload.get("model", "bench"),
+                        "choices": [{"message": {"role": "assistant", "content": content}}],
+                        "usage": usage,
+                    }
+                )
+                return
+            chunks = [{"choices": [{"delta": {"content": word}}]} for word in content.split(" ")]
+            chunks[-1]["usage"] = usage
+            events = "".join(
+                f"data: {json.dumps(chunk)}\n\n" for chunk in chunks
+            ) + "data: [DONE]\n\n"
+            body = events.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            parts = urlsplit(self.path)
+            records = sim.collections.get(parts.path.strip("/").rsplit("/", 1)[-1])
+            if records is None:
+                self._send_json({"error": "not found"}, 404)
+                return
+            sim.count("abacus_requests")
+            sim.delay(sim.abacus_latency, sim.abacus_jitter)
+            query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            skip = int(query.get("$skip", 0))
+            top = int(query.get("$top", len(records)))
+            payload: Dict[str, Any] = {"value": records[skip : skip + top]}
+            if query.get("$count") == "true":
+                payload["@odata.count"] = len(records)
+            self._send_json(payload)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--applications", type=int, default=10_000)
+    parser.add_argument("--capabilities", type=int, default=None)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-jitter", type=float, default=0.01)
+    parser.add_argument("--abacus-latency", type=float, default=0.01)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+
+    capabilities, applications = generate_catalog(args.applications, args.capabilities)
+    sim = Simulator(
+        capabilities,
+        applications,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        abacus_latency=args.abacus_latency,
+        llm_error_rate=args.llm_error_rate,
+        port=args.port,
+    )
+    print(f"Serving {len(applications)} applications on {sim.url}")
+    try:
+        sim._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
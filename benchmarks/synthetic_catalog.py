@@ -0,0 +1,134 @@
+"""Deterministic synthetic technology catalog for load tests.
+
+Write one to disk (same shape as the backend's bundled JSON files) with::
+
+    python -m benchmarks.synthetic_catalog --applications 100000 --out /tmp/catalog
+
+Capability names are unique two-word technology names; every application
+lists one to four of them as technologies, so the catalog's
+capability-to-application matching has realistic fan-out.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PREFIXES = [
+    "Apex", "Aurora", "Beacon", "Cobalt", "Delta", "Ember", "Falcon", "Granite",
+    "Harbor", "Helix", "Iris", "Juniper", "Kestrel", "Lumen", "Meridian", "Nimbus",
+    "Onyx", "Orbit", "Pioneer", "Quartz", "Raven", "Sable", "Summit", "Tidal",
+    "Umber", "Vector", "Willow", "Zenith",
+]
+KINDS = [
+    ("Store", "object storage", "Durable storage for files and binary objects"),
+    ("Queue", "messaging", "Asynchronous message delivery between services"),
+    ("DB", "relational database", "Transactional SQL database for structured records"),
+    ("Search", "search index", "Full-text search over documents and logs"),
+    ("Mesh", "container orchestration", "Schedules and scales containerized workloads"),
+    ("Auth", "identity", "Single sign-on and access management for users"),
+    ("Lake", "data warehouse", "Analytical storage for reporting and BI"),
+    ("Gateway", "API management", "Routes, secures and throttles API traffic"),
+    ("Stream", "event streaming", "Ordered event logs for real-time pipelines"),
+    ("Cache", "in-memory cache", "Low-latency key-value cache in front of databases"),
+    ("Vault", "secrets management", "Stores and rotates credentials and keys"),
+    ("Flow", "workflow automation", "Orchestrates long-running business processes"),
+]
+DOMAINS = [
+    "claims", "billing", "underwriting", "policy", "customer", "broker", "payments",
+    "fraud", "reporting", "compliance", "HR", "payroll", "marketing", "support",
+]
+PURPOSES = [
+    "portal", "processing service", "analytics dashboard", "batch pipeline",
+    "mobile backend", "document service", "notification service", "rules engine",
+]
+
+
+def generate_catalog(
+    applications: int = 1000, capabilities: Optional[int] = None, seed: int = 0
+) -> Tuple[List[Dict[str, object]], List[Dict[str, object]]]:
+    """Return ``(capabilities, applications)`` records.
+
+    ``capabilities`` defaults to one per 50 applications, between 20 and the
+    number of distinct names available.
+    """
+    rng = random.Random(seed)
+    names = [(prefix, kind) for kind in KINDS for prefix in PREFIXES]
+    if capabilities is None:
+        capabilities = max(20, applications // 50)
+    count = max(1, min(len(names), capabilities))
+    caps = []
+    for i, (prefix, (suffix, category, text)) in enumerate(rng.sample(names, count), 1):
+        caps.append(
+            {
+                "id": f"cap{i}",
+                "name": f"{prefix} {suffix}",
+                "category": category,
+                "description": f"{text}. Provided by the {prefix} {suffix} platform.",
+            }
+        )
+    apps = []
+    for i in range(1, applications + 1):
+        domain, purpose = rng.choice(DOMAINS), rng.choice(PURPOSES)
+        techs = rng.sample(caps, rng.randint(1, min(4, len(caps))))
+        apps.append(
+            {
+                "id": f"app{i}",
+                "name": f"{domain.title()} {purpose.title()} {i}",
+                "description": (
+                    f"{domain.title()} {purpose} using "
+                    + ", ".join(f"{t['name']} for {t['category']}" for t in techs)
+                    + "."
+                ),
+                "technologies": [t["name"] for t in techs],
+            }
+        )
+    return caps, apps
+
+
+def sample_questions(
+    capabilities: List[Dict[str, object]], count: int, seed: int = 1
+) -> List[str]:
+    """Return ``count`` user questions about the catalog's capabilities."""
+    rng = random.Random(seed)
+    templates = [
+        "Which applications use {name}?",
+        "What do we use for {category} in {domain}?",
+        "Show me {domain} systems built on {name} for {category}",
+        "I need {category} for a new {domain} {purpose}, what is already in place?",
+    ]
+    questions = []
+    for _ in range(count):
+        cap = rng.choice(capabilities)
+        questions.append(
+            rng.choice(templates).format(
+                name=cap["name"],
+                category=cap["category"],
+                domain=rng.choice(DOMAINS),
+                purpose=rng.choice(PURPOSES),
+            )
+        )
+    return questions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--applications", type=int, default=100_000)
+    parser.add_argument("--capabilities", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, required=True, help="output directory")
+    args = parser.parse_args()
+
+    caps, apps = generate_catalog(args.applications, args.capabilities, args.seed)
+    args.out.mkdir(parents=True, exist_ok=True)
+    for name, records in (("technology_capabilities.json", caps), ("applications.json", apps)):
+        with (args.out / name).open("w", encoding="utf-8") as fh:
+            json.dump(records, fh)
+    print(f"Wrote {len(caps)} capabilities and {len(apps)} applications to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,34 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 
+import metrics
+import resilience
 from env import settings
+from odata_stream import ODataStream
+
+
+def _endpoint(url: str) -> str:
+    """Return the collection name of an ABACUS URL (the metrics label)."""
+    return urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def batched(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group ``records`` into lists of at most ``size`` items."""
+    iterator = iter(records)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 
 class AbacusClient:
@@ -18,6 +41,11 @@ class AbacusClient:
         client_secret: Optional[str] = None,
         timeout: Optional[int] = None,
         verify_ssl: Optional[bool] = None,
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        order_by: Optional[str] = None,
     ) -> None:
         self.base_url = (base_url or settings.ABACUS_BASE_URL).rstrip("/")
         self.client_secret = client_secret or settings.ABACUS_CLIENT_SECRET
@@ -33,6 +61,38 @@ class AbacusClient:
             "Authorization": f"Bearer {self.client_secret}",
             "Content-Type": "application/json",
         }
+        self.page_size = page_size if page_size is not None else settings.ABACUS_PAGE_SIZE
+        self.concurrency = max(
+            1, concurrency if concurrency is not None else settings.ABACUS_FETCH_CONCURRENCY
+        )
+        self.order_by = order_by if order_by is not None else settings.ABACUS_ORDER_BY
+        self.chunk_size = 64 * 1024
+
+        self.max_retries = max_retries if max_retries is not None else settings.ABACUS_MAX_RETRIES
+        # Pooled keep-alive connections shared by concurrent page fetches,
+        # retrying GETs on connection errors, 429 and 5xx.
+        retry = resilience.JitteredRetry(
+            total=self.max_retries,
+            backoff_factor=backoff if backoff is not None else settings.ABACUS_RETRY_BACKOFF,
+            backoff_max=settings.RETRY_MAX_DELAY,
+            status_forcelist=tuple(resilience.RETRY_STATUSES),
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(10, self.concurrency), max_retries=retry
+        )
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        # Plan queries are POSTs, which urllib3 would still retry on connect
+        # errors; their pool never retries so ``call_with_retries`` is the
+        # only retry layer.
+        post_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=0)
+        self._post_session = requests.Session()
+        self._post_session.mount("https://", post_adapter)
+        self._post_session.mount("http://", post_adapter)
 
     # ------------------------------------------------------------------
     # Low-level HTTP helpers
@@ -42,8 +102,9 @@ class AbacusClient:
             raise RuntimeError("ABACUS API credentials are not configured")
 
         url = f"{self.base_url}/query"
-        try:
-            response = requests.post(
+
+        def post() -> requests.Response:
+            response = self._post_session.post(
                 url,
                 headers=self._headers,
                 json=payload,
@@ -51,9 +112,15 @@ class AbacusClient:
                 verify=self.verify_ssl,
             )
             response.raise_for_status()
+            return response
+
+        try:
+            response = resilience.call_with_retries(
+                post, self._breaker(), self.max_retries, (requests.RequestException,)
+            )
             return response.json()
         except requests.RequestException as exc:  # pragma: no cover - network
-            raise RuntimeError("Failed to call ABACUS service") from exc
+            raise resilience.failure_type(exc)("Failed to call ABACUS service") from exc
         except ValueError as exc:  # pragma: no cover - unlikely
             raise RuntimeError("Invalid response from ABACUS service") from exc
 
@@ -73,24 +140,166 @@ class AbacusClient:
             ) from exc
 
     def query_data(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        """Fetch JSON data from the ABACUS API using OData query parameters."""
+        """Fetch JSON data from the ABACUS API using OData query parameters.
+
+        Collections are returned as a list of every record across all pages
+        (see :meth:`iter_records`); other responses are returned as is.
+        """
+        url = self._url(endpoint)
+        stream, page_params = self._first_page(url, params)
+        records = list(self._records(url, stream, page_params))
+        metrics.ABACUS_RECORDS.inc(len(records), endpoint=_endpoint(url))
+        return records if stream.has_value else stream.meta
+
+    def iter_records(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield every record of the OData collection ``endpoint``.
+
+        When paging is enabled (``page_size``) and the caller did not page
+        itself, the first page is requested with ``$top``, ``$count`` and an
+        ``$orderby`` ending in the unique ``order_by`` key.  If the service
+        reports the total, the remaining ``$skip`` pages are fetched
+        ``concurrency`` at a time and yielded in order; otherwise, or when
+        the query cannot be ordered, ``@odata.nextLink`` is followed.  Records are parsed incrementally
+        from each response body.
+        """
+        url = self._url(endpoint)
+        stream, page_params = self._first_page(url, params)
+        received = 0
+        try:
+            for record in self._records(url, stream, page_params):
+                received += 1
+                yield record
+        finally:
+            metrics.ABACUS_RECORDS.inc(received, endpoint=_endpoint(url))
+
+    # ------------------------------------------------------------------
+    # Paging helpers
 
+    def _url(self, endpoint: str) -> str:
         if not self.base_url or not self.client_secret:
             raise RuntimeError("ABACUS API credentials are not configured")
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    def _first_page(
+        self, url: str, params: Optional[Dict[str, Any]]
+    ) -> Tuple[ODataStream, Optional[Dict[str, Any]]]:
+        """Open the first page; also return the params of ``$skip`` paging."""
+        params = dict(params or {})
+        if self.page_size <= 0 or "$top" in params or "$skip" in params:
+            return self._open(url, params), None
+        ordered = self._ordered(params)
+        if ordered is None:
+            # Unordered $skip pages may overlap or miss records; let the
+            # service page with @odata.nextLink instead.
+            return self._open(url, params), None
+        return self._open(url, {**ordered, "$top": self.page_size, "$count": "true"}), ordered
+
+    def _ordered(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return ``params`` with a stable ``$orderby``, or None if unorderable.
 
-        url = f"{self.base_url}/{endpoint.lstrip('/') }"
+        OData only guarantees consistent ``$skip`` pages under a total order,
+        so ``order_by`` is appended as a tie-breaker to any caller ordering.
+        """
+        if not self.order_by or "$apply" in params:
+            return None
+        order = str(params.get("$orderby", "")).strip()
+        keys = [part.split()[0] for part in order.split(",") if part.strip()]
+        if self.order_by not in keys:
+            order = f"{order},{self.order_by}" if order else self.order_by
+        return {**params, "$orderby": order}
+
+    def _records(
+        self, url: str, stream: ODataStream, page_params: Optional[Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        received = 0
+        for record in self._parse(stream):
+            received += 1
+            yield record
+        total = stream.meta.get("@odata.count")
+        next_link = stream.meta.get("@odata.nextLink")
+        if page_params is None or total is None or (next_link and received < self.page_size):
+            # No count, or the service pages on its own with a smaller page.
+            yield from self._follow(next_link)
+            return
+        skips = range(self.page_size, int(total), self.page_size)
+        yield from self._fetch_pages(url, page_params, skips)
+
+    def _breaker(self) -> resilience.CircuitBreaker:
+        return resilience.circuit_breaker("abacus", self.base_url)
+
+    def _open(self, url: str, params: Optional[Dict[str, Any]]) -> ODataStream:
+        """GET ``url`` and return a parser over the streamed response body.
+
+        The session retries failed attempts itself; the circuit breaker sees
+        the outcome once the retries are spent.
+        """
+        breaker = self._breaker()
+        breaker.before_call()
         try:
-            response = requests.get(
-                url,
-                headers=self._headers,
-                params=params or {},
-                timeout=self.timeout,
-                verify=self.verify_ssl,
-            )
+            with metrics.ABACUS_SECONDS.time(endpoint=_endpoint(url)):
+                response = self._session.get(
+                    url,
+                    headers=self._headers,
+                    params=params,
+                    timeout=self.timeout,
+                    verify=self.verify_ssl,
+                    stream=True,
+                )
             response.raise_for_status()
-            data = response.json()
-            return data.get("value", data)
-        except requests.RequestException as exc:  # pragma: no cover - network
-            raise RuntimeError("Failed to query ABACUS service") from exc
-        except ValueError as exc:  # pragma: no cover - unlikely
+        except requests.RequestException as exc:
+            if resilience.retryable(exc):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise resilience.failure_type(exc)("Failed to query ABACUS service") from exc
+        breaker.record_success()
+        return ODataStream(self._chunks(response))
+
+    def _chunks(self, response: requests.Response) -> Iterator[bytes]:
+        with response:
+            try:
+                yield from response.iter_content(chunk_size=self.chunk_size)
+            except requests.RequestException as exc:  # pragma: no cover - network
+                raise RuntimeError("Failed to query ABACUS service") from exc
+
+    @staticmethod
+    def _parse(stream: ODataStream) -> Iterator[Dict[str, Any]]:
+        try:
+            yield from stream.records()
+        except ValueError as exc:
             raise RuntimeError("Invalid response from ABACUS service") from exc
+
+    def _follow(self, next_link: Optional[str]) -> Iterator[Dict[str, Any]]:
+        while next_link:
+            stream = self._open(next_link, None)
+            yield from self._parse(stream)
+            next_link = stream.meta.get("@odata.nextLink")
+
+    def _page(self, url: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return list(self._parse(self._open(url, params)))
+
+    def _fetch_pages(
+        self, url: str, params: Dict[str, Any], skips: Iterable[int]
+    ) -> Iterator[Dict[str, Any]]:
+        """Fetch ``$skip`` pages concurrently, yielding records in page order.
+
+        At most ``concurrency`` pages are in flight or buffered at a time.
+        """
+        skips = iter(skips)
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="abacus-page") as pool:
+            pending: Deque[Future] = deque()
+
+            def submit(skip: int) -> None:
+                page_params = {**params, "$top": self.page_size, "$skip": skip}
+                pending.append(pool.submit(self._page, url, page_params))
+
+            for skip in itertools.islice(skips, self.concurrency):
+                submit(skip)
+            while pending:
+                records = pending.popleft().result()
+                skip = next(skips, None)
+                if skip is not None:
+                    submit(skip)
+                yield from records
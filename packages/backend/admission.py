@@ -0,0 +1,226 @@
+"""Admission control: bounded concurrency, wait queues and per-client rate limits.
+
+The primitives keep their state in plain attributes and only create
+:mod:`anyio` events while a caller waits, so a limiter shared at module or
+class level works on any event loop (asyncio or trio) and across loops.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Iterable, Optional, Tuple
+
+import anyio
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+import metrics
+
+
+class Overloaded(RuntimeError):
+    """Raised when work is shed instead of queued.
+
+    ``status_code`` is 429 for rate-limited clients and 503 when the service
+    is saturated; ``retry_after`` is the suggested wait in seconds.
+    """
+
+    def __init__(self, detail: str, status_code: int = 503, retry_after: float = 1.0) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Run at most ``limit`` holders at once; up to ``queue_size`` more wait.
+
+    A waiter gives up after ``timeout`` seconds.  Callers beyond the queue,
+    and waiters that time out, get :class:`Overloaded` so they fail fast
+    instead of piling up behind a slow dependency.  Slots are handed to
+    waiters in arrival order.  ``limit <= 0`` disables the limiter.
+    """
+
+    def __init__(self, limit: int, queue_size: int = 0, timeout: float = 0.0, name: str = "") -> None:
+        self.limit = limit
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.name = name
+        self.active = 0
+        self._waiters: Deque[anyio.Event] = deque()
+        # Moving average of how long a slot is held, for ``Retry-After``.
+        self._hold = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed; raise :class:`Overloaded`."""
+        if self.limit <= 0:
+            return
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            metrics.ADMISSION_REJECTED.inc(limiter=self.name, reason="queue_full")
+            raise Overloaded(f"Too many concurrent {self.name}", 503, self.retry_after())
+        event = anyio.Event()
+        self._waiters.append(event)
+        self.queued += 1
+        try:
+            with anyio.move_on_after(self.timeout):
+                await event.wait()
+        except BaseException:
+            # Cancelled while waiting: pass on a slot that was already handed over.
+            if event.is_set():
+                self.release()
+            else:
+                self._waiters.remove(event)
+            raise
+        if event.is_set():
+            # ``release`` transferred its slot to this waiter.
+            self.admitted += 1
+            return
+        self._waiters.remove(event)
+        self.timed_out += 1
+        metrics.ADMISSION_REJECTED.inc(limiter=self.name, reason="queue_timeout")
+        raise Overloaded(f"Timed out waiting for {self.name} capacity", 503, self.retry_after())
+
+    def release(self, held: Optional[float] = None) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one.
+
+        ``held`` is how long the slot was held, in seconds, if known.
+        """
+        if self.limit <= 0:
+            return
+        if held is not None:
+            self._hold += 0.2 * (held - self._hold)
+        if self._waiters:
+            self._waiters.popleft().set()
+        else:
+            self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the enclosed block."""
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def retry_after(self) -> float:
+        """Estimate the seconds until the current queue has drained."""
+        if self.limit <= 0:
+            return 1.0
+        return max(1.0, self._hold * (len(self._waiters) + 1) / self.limit)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class RateLimiter:
+    """Token bucket per client: ``rate`` requests per second, bursts of ``burst``.
+
+    Buckets of the ``max_clients`` most recently seen clients are kept; a
+    forgotten client starts again with a full bucket.  ``rate <= 0``
+    disables the limiter.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10_000) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.limited = 0
+
+    def check(self, client: str, now: Optional[float] = None) -> None:
+        """Spend a token of ``client``; raise :class:`Overloaded` (429) if none is left."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens < 1.0:
+            self._buckets[client] = (tokens, now)
+            self.limited += 1
+            metrics.ADMISSION_REJECTED.inc(limiter="rate", reason="rate_limited")
+            raise Overloaded("Rate limit exceeded", 429, (1.0 - tokens) / self.rate)
+        self._buckets[client] = (tokens - 1.0, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        return {"clients": len(self._buckets), "limited": self.limited}
+
+
+def overloaded_response(exc: Overloaded) -> JSONResponse:
+    """Return the HTTP reply for shed work, with a whole-second ``Retry-After``."""
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    """Rate-limit and bound the concurrency of requests to ``paths``.
+
+    A plain ASGI middleware rather than ``@app.middleware("http")`` so the
+    slot is held until a streamed response body has been sent, not just
+    until its headers are ready.  Clients are identified by the first entry
+    of ``client_header`` when set (e.g. ``X-Forwarded-For`` behind a proxy),
+    otherwise by the peer address.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        paths: Iterable[str],
+        limiter: ConcurrencyLimiter,
+        rate_limiter: RateLimiter,
+        client_header: str = "",
+    ) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.client_header = client_header.lower().encode("latin-1")
+
+    def _client(self, scope: Scope) -> str:
+        if self.client_header:
+            for name, value in scope.get("headers", []):
+                if name == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        try:
+            self.rate_limiter.check(self._client(scope))
+            await self.limiter.acquire()
+        except Overloaded as exc:
+            await overloaded_response(exc)(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(time.perf_counter() - start)
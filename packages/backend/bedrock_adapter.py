@@ -2,16 +2,48 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import importlib.util
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, ClassVar, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
+import httpx
 import requests
 
+import metrics
+import resilience
 from env import settings
 
 
+@dataclass
+class _AsyncPool:
+    """Keep-alive client and per-host semaphores bound to one event loop."""
+
+    loop: asyncio.AbstractEventLoop
+    client: httpx.AsyncClient
+    semaphores: Dict[str, asyncio.Semaphore] = field(default_factory=dict)
+
+
+def _record_usage(data: Dict[str, Any]) -> None:
+    """Count the prompt and completion tokens Bedrock reports for a call."""
+    usage = data.get("usage") or {}
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if isinstance(tokens, int):
+            metrics.LLM_TOKENS.inc(tokens, kind=kind)
+
+
 class BedrockAdapter:
     """HTTP adapter for AWS Bedrock using the OpenAI chat format."""
 
+    # Async clients are shared by every adapter instance so concurrent requests
+    # reuse pooled keep-alive (and HTTP/2) connections instead of paying a TLS
+    # handshake per call.  Pools are keyed by event loop and TLS settings.
+    _async_pools: ClassVar[Dict[Tuple[int, bool, bool], _AsyncPool]] = {}
+
     def __init__(
         self,
         api_base: Optional[str] = None,
@@ -21,6 +53,10 @@ class BedrockAdapter:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
         verify_ssl: Optional[bool] = None,
+        http2: Optional[bool] = None,
+        max_concurrency_per_host: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        hedge_percentile: Optional[float] = None,
     ) -> None:
         self.api_base = (api_base or settings.BEDROCK_API_BASE).rstrip("/")
         self.api_key = api_key or settings.BEDROCK_API_KEY
@@ -36,6 +72,23 @@ class BedrockAdapter:
         self.verify_ssl = (
             verify_ssl if verify_ssl is not None else settings.VERIFY_SSL
         )
+        # HTTP/2 is negotiated via ALPN and needs the optional ``h2`` package
+        self.http2 = (
+            http2 if http2 is not None else settings.BEDROCK_HTTP2
+        ) and importlib.util.find_spec("h2") is not None
+        self.max_concurrency_per_host = (
+            max_concurrency_per_host
+            if max_concurrency_per_host is not None
+            else settings.BEDROCK_MAX_CONCURRENCY_PER_HOST
+        )
+        self.max_retries = (
+            max_retries if max_retries is not None else settings.BEDROCK_MAX_RETRIES
+        )
+        self.hedge_percentile = (
+            hedge_percentile
+            if hedge_percentile is not None
+            else settings.BEDROCK_HEDGE_PERCENTILE
+        )
 
         self._headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -50,38 +103,203 @@ class BedrockAdapter:
             raise RuntimeError("Bedrock API credentials are not configured")
 
         url = f"{self.api_base}/chat/completions"
+
+        def post() -> requests.Response:
+            with metrics.LLM_IN_FLIGHT.track_in_progress(), metrics.LLM_SECONDS.time(
+                operation="create"
+            ):
+                response = requests.post(
+                    url,
+                    headers=self._headers,
+                    json=payload,
+                    timeout=self.timeout,
+                    verify=self.verify_ssl,
+                    # Explicitly disable proxies so Bedrock calls bypass any
+                    # HTTP_PROXY/HTTPS_PROXY environment settings.
+                    proxies={"http": None, "https": None},
+                )
+            response.raise_for_status()
+            return response
+
         try:
-            response = requests.post(
-                url,
-                headers=self._headers,
-                json=payload,
-                timeout=self.timeout,
-                verify=self.verify_ssl,
-                # Explicitly disable proxies so Bedrock calls bypass any
-                # HTTP_PROXY/HTTPS_PROXY environment settings.
-                proxies={"http": None, "https": None},
+            response = resilience.call_with_retries(
+                post, self._breaker(), self.max_retries, (requests.RequestException,)
             )
-            response.raise_for_status()
-            return response.json()
+            data = response.json()
         except requests.RequestException as exc:  # pragma: no cover - network
-            raise RuntimeError("Failed to call Bedrock API") from exc
+            raise resilience.failure_type(exc)("Failed to call Bedrock API") from exc
+        except ValueError as exc:  # pragma: no cover - unlikely
+            raise RuntimeError("Invalid response from Bedrock API") from exc
+        _record_usage(data)
+        return data
+
+    def _breaker(self) -> resilience.CircuitBreaker:
+        return resilience.circuit_breaker("bedrock", self.api_base)
+
+    def _async_pool(self) -> _AsyncPool:
+        """Return the shared pool for the running event loop, creating it once."""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), self.verify_ssl, self.http2)
+        pool = self._async_pools.get(key)
+        if pool is None or pool.loop is not loop or pool.client.is_closed:
+            # Drop pools whose event loop has gone away (e.g. between tests)
+            for stale in [k for k, p in self._async_pools.items() if p.loop.is_closed()]:
+                del self._async_pools[stale]
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                verify=self.verify_ssl,
+                limits=httpx.Limits(
+                    max_connections=settings.BEDROCK_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.BEDROCK_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.BEDROCK_POOL_KEEPALIVE_EXPIRY,
+                ),
+                # Bypass HTTP_PROXY/HTTPS_PROXY just like the blocking path.
+                trust_env=False,
+            )
+            pool = _AsyncPool(loop=loop, client=client)
+            self._async_pools[key] = pool
+        return pool
+
+    def _host_semaphore(self, pool: _AsyncPool, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = pool.semaphores.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(max(1, self.max_concurrency_per_host))
+            pool.semaphores[host] = sem
+        return sem
+
+    async def _apost(self, pool: _AsyncPool, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """Make one attempt of a chat completion call."""
+        start = time.perf_counter()
+        with metrics.LLM_IN_FLIGHT.track_in_progress(), metrics.LLM_SECONDS.time(
+            operation="create"
+        ):
+            async with self._host_semaphore(pool, url):
+                response = await pool.client.post(
+                    url,
+                    headers=self._headers,
+                    json=payload,
+                    timeout=self.timeout,
+                )
+        response.raise_for_status()
+        resilience.latency_tracker(self.api_base).record(time.perf_counter() - start)
+        return response
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds after which a duplicate call is sent, if hedging is on."""
+        if self.hedge_percentile <= 0:
+            return None
+        return resilience.latency_tracker(self.api_base).percentile(self.hedge_percentile)
+
+    async def _arequest(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Async counterpart of :meth:`_request` using the shared client pool.
+
+        Slow attempts are hedged with a duplicate call (see
+        ``BEDROCK_HEDGE_PERCENTILE``); connection errors, 429 and 5xx are
+        retried with jittered backoff behind the circuit breaker.
+        """
+        if not self.api_base or not self.api_key:
+            raise RuntimeError("Bedrock API credentials are not configured")
+
+        url = f"{self.api_base}/chat/completions"
+        pool = self._async_pool()
+        try:
+            response = await resilience.acall_with_retries(
+                lambda: resilience.hedged(
+                    lambda: self._apost(pool, url, payload), self._hedge_delay(), "bedrock"
+                ),
+                self._breaker(),
+                self.max_retries,
+                (httpx.HTTPError,),
+            )
+            data = response.json()
+        except httpx.HTTPError as exc:  # pragma: no cover - network
+            raise resilience.failure_type(exc)("Failed to call Bedrock API") from exc
         except ValueError as exc:  # pragma: no cover - unlikely
             raise RuntimeError("Invalid response from Bedrock API") from exc
+        _record_usage(data)
+        return data
+
+    async def _astream_request(self, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield content deltas from a ``stream: true`` chat completion.
+
+        Failures before the first token are retried like :meth:`_arequest`.
+        """
+        if not self.api_base or not self.api_key:
+            raise RuntimeError("Bedrock API credentials are not configured")
+
+        url = f"{self.api_base}/chat/completions"
+        pool = self._async_pool()
+        breaker = self._breaker()
+        delays = resilience.backoff_delays(
+            self.max_retries, settings.RETRY_BASE_DELAY, settings.RETRY_MAX_DELAY
+        )
+        while True:
+            breaker.before_call()
+            streamed = False
+            try:
+                with metrics.LLM_IN_FLIGHT.track_in_progress(), metrics.LLM_SECONDS.time(
+                    operation="stream"
+                ):
+                    async with self._host_semaphore(pool, url):
+                        async with pool.client.stream(
+                            "POST",
+                            url,
+                            headers=self._headers,
+                            json={**payload, "stream": True},
+                            timeout=self.timeout,
+                        ) as response:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                # Server-Sent Events: ``data: {...}`` lines, blank separators
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:") :].strip()
+                                if data == "[DONE]":
+                                    break
+                                chunk = json.loads(data)
+                                # Some endpoints report usage on the last chunk.
+                                _record_usage(chunk)
+                                for choice in chunk.get("choices", []):
+                                    delta = choice.get("delta") or {}
+                                    if delta.get("content"):
+                                        streamed = True
+                                        yield delta["content"]
+                breaker.record_success()
+                return
+            except httpx.HTTPError as exc:  # pragma: no cover - network
+                if streamed:
+                    # Tokens were already yielded; the stream cannot be retried.
+                    breaker.record_failure()
+                    delay = None
+                else:
+                    delay = resilience.next_retry(breaker, exc, delays)
+                if delay is None:
+                    raise resilience.failure_type(exc)("Failed to call Bedrock API") from exc
+                await asyncio.sleep(delay)
+            except ValueError as exc:
+                raise RuntimeError("Invalid response from Bedrock API") from exc
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared async clients owned by the running event loop."""
+        loop = asyncio.get_running_loop()
+        for key, pool in list(cls._async_pools.items()):
+            if pool.loop is loop:
+                await pool.client.aclose()
+                del cls._async_pools[key]
 
     # ------------------------------------------------------------------
     # Public API used by the orchestrator
 
-    def create(
+    def _payload(
         self,
         model: Optional[str],
         messages: List[Dict[str, str]],
-        *,
-        max_tokens: Optional[int] = None,
-        temperature: Optional[float] = None,
+        max_tokens: Optional[int],
+        temperature: Optional[float],
     ) -> Dict[str, Any]:
-        """Return a response dict in the OpenAI chat format."""
-
-        payload = {
+        return {
             "model": model or self.model_id,
             "messages": messages,
             "max_tokens": max_tokens if max_tokens is not None else self.max_tokens,
@@ -90,8 +308,46 @@ class BedrockAdapter:
             ),
         }
 
+    def create(
+        self,
+        model: Optional[str],
+        messages: List[Dict[str, str]],
+        *,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Return a response dict in the OpenAI chat format."""
+
+        payload = self._payload(model, messages, max_tokens, temperature)
         return self._request(payload)
 
+    async def acreate(
+        self,
+        model: Optional[str],
+        messages: List[Dict[str, str]],
+        *,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Async version of :meth:`create` on the pooled keep-alive client."""
+
+        payload = self._payload(model, messages, max_tokens, temperature)
+        return await self._arequest(payload)
+
+    async def astream(
+        self,
+        model: Optional[str],
+        messages: List[Dict[str, str]],
+        *,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Stream the completion text for ``messages`` as it is generated."""
+
+        payload = self._payload(model, messages, max_tokens, temperature)
+        async for token in self._astream_request(payload):
+            yield token
+
     def invoke(self, prompt: str) -> str:
         """Send ``prompt`` and return the model's completion text."""
 
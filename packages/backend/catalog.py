@@ -0,0 +1,283 @@
+"""In-memory model of the technology catalog built once at load time."""
+
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from record_store import RecordStore
+
+_WORD = re.compile(r"\w+")
+_R = TypeVar("_R")
+
+# Kinds of application postings: lowercase technology names and the words of
+# technologies and descriptions.
+TECHNOLOGY = "technology"
+WORD = "word"
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def application_postings(
+    applications: Iterable["Application"],
+    positions: Optional[Iterable[int]] = None,
+) -> Dict[str, Dict[str, List[int]]]:
+    """Return the technology and word inverted indexes of ``applications``.
+
+    Postings list each application's position, ``0..n-1`` unless
+    ``positions`` is given.
+    """
+    postings: Dict[str, Dict[str, List[int]]] = {TECHNOLOGY: {}, WORD: {}}
+    numbered = (
+        zip(positions, applications) if positions is not None else enumerate(applications)
+    )
+    for pos, app in numbered:
+        for tech in {t.lower() for t in app.technologies}:
+            postings[TECHNOLOGY].setdefault(tech, []).append(pos)
+        words = _words(app.description)
+        for tech in app.technologies:
+            words |= _words(tech)
+        for word in words:
+            postings[WORD].setdefault(word, []).append(pos)
+    return postings
+
+
+class Capability:
+    """A technology capability record."""
+
+    __slots__ = ("id", "name", "category", "description")
+
+    def __init__(self, id: str, name: str, category: str, description: str) -> None:
+        self.id = id
+        self.name = name
+        self.category = category
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Capability":
+        return cls(
+            str(data.get("id", "")),
+            data.get("name", ""),
+            data.get("category", ""),
+            data.get("description", ""),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "description": self.description,
+        }
+
+
+class Application:
+    """An application record from the catalog."""
+
+    __slots__ = ("id", "name", "description", "technologies")
+
+    def __init__(
+        self, id: str, name: str, description: str, technologies: Tuple[str, ...]
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.description = description
+        self.technologies = technologies
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Application":
+        return cls(
+            str(data.get("id", "")),
+            data.get("name", ""),
+            data.get("description", ""),
+            tuple(data.get("technologies", []) or ()),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "technologies": list(self.technologies),
+        }
+
+
+class Catalog:
+    """Capabilities and applications with constant-time lookups.
+
+    Records keep the order of the vector indexes, so the position returned by
+    a FAISS search maps directly to :meth:`application_at`.  Applications are
+    also indexed by lowercase technology name and by the words of their
+    technologies and descriptions, which answers "which applications mention
+    this capability" without scanning the catalog.
+    """
+
+    def __init__(
+        self,
+        capabilities: Iterable[Dict[str, Any]],
+        applications: Iterable[Dict[str, Any]],
+    ) -> None:
+        self.capabilities: List[Capability] = [Capability.from_dict(c) for c in capabilities]
+        self.applications: List[Application] = [Application.from_dict(a) for a in applications]
+        self._capabilities_by_id: Dict[str, Capability] = {
+            c.id: c for c in self.capabilities
+        }
+        self._applications_by_id: Dict[str, Application] = {
+            a.id: a for a in self.applications
+        }
+        self._postings_index = application_postings(self.applications)
+        self._capability_matches: Dict[str, List[int]] = {}
+
+    def _postings(self, kind: str, term: str) -> Sequence[int]:
+        return self._postings_index[kind].get(term, [])
+
+    def capability(self, capability_id: str) -> Optional[Capability]:
+        return self._capabilities_by_id.get(capability_id)
+
+    def application(self, application_id: str) -> Optional[Application]:
+        return self._applications_by_id.get(application_id)
+
+    def capability_at(self, position: int) -> Optional[Capability]:
+        if 0 <= position < len(self.capabilities):
+            return self.capabilities[position]
+        return None
+
+    def application_at(self, position: int) -> Optional[Application]:
+        if 0 <= position < len(self.applications):
+            return self.applications[position]
+        return None
+
+    def applications_with_technology(self, technology: str) -> Sequence[int]:
+        """Return positions of applications listing ``technology`` (any case)."""
+        return self._postings(TECHNOLOGY, technology.lower())
+
+    def applications_for_capability(self, capability: Capability) -> List[int]:
+        """Return positions of applications that mention ``capability``.
+
+        An application matches when it lists the capability name as a
+        technology or when every word of the name appears in its technologies
+        or description.  Results are cached per capability.
+        """
+        cached = self._capability_matches.get(capability.id)
+        if cached is not None:
+            return cached
+        matches = set(self.applications_with_technology(capability.name))
+        words = _words(capability.name)
+        if words:
+            postings = [set(self._postings(WORD, w)) for w in words]
+            matches |= set.intersection(*postings)
+        result = sorted(matches)
+        self._capability_matches[capability.id] = result
+        return result
+
+
+class _LazyRecords(Generic[_R]):
+    """Sequence view decoding store records on access, with a small LRU."""
+
+    def __init__(
+        self, store: "RecordStore", decode: Callable[[Dict[str, Any]], _R], cache_size: int
+    ) -> None:
+        self._store = store
+        self._decode = decode
+        self._cache: "OrderedDict[int, _R]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, position: int) -> _R:
+        record = self._cache.get(position)
+        if record is not None:
+            self._cache.move_to_end(position)
+            return record
+        record = self._decode(self._store[position])
+        self._cache[position] = record
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return record
+
+    def __iter__(self) -> Iterator[_R]:
+        for position in self._store.positions():
+            yield self[position]
+
+
+class LazyCatalog(Catalog):
+    """:class:`Catalog` over SQLite record stores, loading records on demand.
+
+    Id lookups and inverted-index postings are answered by the stores'
+    indexes, so nothing is parsed up front and the catalog size does not
+    affect start-up time or per-process memory.  Positions are the stores'
+    vector ids, which may have gaps after an incremental sync.
+    """
+
+    def __init__(
+        self,
+        capabilities: "RecordStore",
+        applications: "RecordStore",
+        cache_size: int = 4096,
+    ) -> None:
+        self._capability_store = capabilities
+        self._application_store = applications
+        # Sequence views stand in for the eager lists of the base class.
+        self.capabilities = _LazyRecords(  # type: ignore[assignment]
+            capabilities, Capability.from_dict, cache_size
+        )
+        self.applications = _LazyRecords(  # type: ignore[assignment]
+            applications, Application.from_dict, cache_size
+        )
+        self._capability_matches = {}
+
+    def capability(self, capability_id: str) -> Optional[Capability]:
+        pos = self._capability_store.position(capability_id)
+        return self.capabilities[pos] if pos is not None else None
+
+    def application(self, application_id: str) -> Optional[Application]:
+        pos = self._application_store.position(application_id)
+        return self.applications[pos] if pos is not None else None
+
+    def capability_at(self, position: int) -> Optional[Capability]:
+        try:
+            return self.capabilities[position] if position >= 0 else None
+        except IndexError:
+            return None
+
+    def application_at(self, position: int) -> Optional[Application]:
+        try:
+            return self.applications[position] if position >= 0 else None
+        except IndexError:
+            return None
+
+    def _postings(self, kind: str, term: str) -> Sequence[int]:
+        return self._application_store.postings(kind, term)
+
+    @property
+    def capability_store(self) -> "RecordStore":
+        return self._capability_store
+
+    @property
+    def application_store(self) -> "RecordStore":
+        return self._application_store
+
+    def close(self, keep: Sequence["RecordStore"] = ()) -> None:
+        """Close the record stores, except those in ``keep`` still used elsewhere."""
+        for store in (self._capability_store, self._application_store):
+            if not any(store is kept for kept in keep):
+                store.close()
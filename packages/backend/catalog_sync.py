@@ -0,0 +1,358 @@
+"""Incremental synchronisation of the catalog vector stores with ABACUS.
+
+Fetched records are compared with the stored ones by ``id`` and by the text
+that is embedded (the description).  Only new or changed descriptions are
+re-encoded; their vectors are added to (and stale ones removed from) the
+ID-mapped FAISS index, so unchanged records keep their vector ids.
+
+Syncs are serialized across threads and worker processes by a lock file in
+the vector store directory.  The state file records when the last sync ran
+and a ``generation`` that grows whenever a store changed, so a worker that
+finds a recent sync by another process reloads its stores instead of
+fetching ABACUS again.  Run once from the command line with::
+
+    python catalog_sync.py
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+
+import vector_index
+from abacus_client import AbacusClient
+from catalog import Application, application_postings
+from env import settings
+from record_store import RecordStore
+
+# Vector store name -> ABACUS OData endpoint
+ENDPOINTS = {
+    vector_index.CAPABILITY_STORE: "capabilities",
+    vector_index.APPLICATION_STORE: "applications",
+}
+STATE_FILE = "sync_state.json"
+LOCK_FILE = "sync.lock"
+
+# Serializes syncs started from the scheduler, the CLI or tests within a
+# process; the lock file does the same across worker processes.
+_SYNC_LOCK = threading.Lock()
+
+
+@contextmanager
+def _process_lock(directory: Path) -> Iterator[None]:
+    """Hold an exclusive lock on the store directory's lock file."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - Windows: one worker process
+        yield
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    with (directory / LOCK_FILE).open("a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _record_id(record: Dict[str, Any]) -> str:
+    return str(record.get("id", ""))
+
+
+def _text(record: Dict[str, Any]) -> str:
+    return record.get("description", "")
+
+
+@dataclass
+class SyncPlan:
+    """Records of a store after a sync and the index changes that produce it."""
+
+    records: List[Dict[str, Any]] = field(default_factory=list)
+    positions: List[int] = field(default_factory=list)
+    remove: List[int] = field(default_factory=list)
+    embed_positions: List[int] = field(default_factory=list)
+    embed_texts: List[str] = field(default_factory=list)
+    stats: Dict[str, int] = field(
+        default_factory=lambda: {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    )
+
+    @property
+    def changed(self) -> bool:
+        return any(self.stats[key] for key in ("added", "updated", "removed"))
+
+
+def plan_sync(
+    current: Iterable[Tuple[int, Dict[str, Any]]], fetched: Iterable[Dict[str, Any]]
+) -> SyncPlan:
+    """Diff ``fetched`` records against the ``(position, record)`` pairs stored.
+
+    A record whose description changed is re-embedded under its existing
+    position; new records get positions after the highest one in use.
+    Records are matched by ``id`` and duplicates in ``fetched`` are ignored.
+    """
+    current_by_id = {_record_id(record): (pos, record) for pos, record in current}
+    next_position = max((pos for pos, _ in current_by_id.values()), default=-1) + 1
+    plan = SyncPlan()
+    seen: Set[str] = set()
+    for record in fetched:
+        record_id = _record_id(record)
+        if record_id in seen:
+            continue
+        seen.add(record_id)
+        old = current_by_id.get(record_id)
+        if old is None:
+            pos = next_position
+            next_position += 1
+            plan.stats["added"] += 1
+        else:
+            pos, old_record = old
+            if old_record == record:
+                plan.stats["unchanged"] += 1
+            else:
+                plan.stats["updated"] += 1
+        if old is None or _text(old[1]) != _text(record):
+            if old is not None:
+                plan.remove.append(pos)
+            plan.embed_positions.append(pos)
+            plan.embed_texts.append(_text(record))
+        plan.records.append(record)
+        plan.positions.append(pos)
+    for record_id, (pos, _) in current_by_id.items():
+        if record_id not in seen:
+            plan.remove.append(pos)
+            plan.stats["removed"] += 1
+    return plan
+
+
+def merge_delta(
+    current: Iterable[Tuple[int, Dict[str, Any]]],
+    modified: Iterable[Dict[str, Any]],
+    live_ids: Set[str],
+) -> List[Dict[str, Any]]:
+    """Return the full record list from a delta fetch.
+
+    ``modified`` holds the records changed since the last sync and
+    ``live_ids`` every id still in the catalog, which reveals deletions.
+    """
+    modified = list(modified)
+    modified_ids = {_record_id(record) for record in modified}
+    kept = [
+        record
+        for _, record in current
+        if _record_id(record) in live_ids and _record_id(record) not in modified_ids
+    ]
+    return kept + modified
+
+
+@dataclass
+class StoreSync:
+    """Result of syncing one vector store.
+
+    ``index`` and ``records`` are only opened when the store ``changed``
+    (or was reloaded); otherwise the caller keeps the ones it has.
+    ``generation`` is the catalog generation the store belongs to.
+    """
+
+    index: Optional[faiss.Index]
+    records: Optional[RecordStore]
+    stats: Dict[str, int]
+    changed: bool
+    generation: int = 0
+
+
+def _current_store(
+    name: str, directory: Path
+) -> Tuple[Optional[faiss.Index], List[Tuple[int, Dict[str, Any]]]]:
+    """Return a writable copy of the stored index and its records, if usable."""
+    if not all(path.exists() for path in vector_index.store_paths(name, directory)):
+        return None, []
+    try:
+        index, records = vector_index.read_store(name, directory, mmap=False)
+    except Exception as exc:  # pragma: no cover - corrupt store
+        print(f"Failed to read vector store {name!r}: {exc}. Rebuilding it.")
+        return None, []
+    try:
+        if not vector_index.supports_updates(index):
+            # Stores written before ids were kept: rebuild once.
+            return None, []
+        return index, list(records.items())
+    finally:
+        records.close()
+
+
+def sync_store(
+    name: str,
+    fetched: Iterable[Dict[str, Any]],
+    encode: Callable[[List[str]], np.ndarray],
+    directory: Path = vector_index.VECTOR_DIR,
+    live_ids: Optional[Set[str]] = None,
+) -> StoreSync:
+    """Bring the vector store ``name`` in line with the ``fetched`` records.
+
+    With ``live_ids`` the fetch is treated as a delta (see
+    :func:`merge_delta`).  Changed stores are rewritten atomically and
+    reopened memory-mapped; unchanged stores are left as they are and not
+    reopened.
+    """
+    index, current = _current_store(name, directory)
+    if live_ids is not None:
+        if index is None:
+            raise ValueError(f"A delta sync of {name!r} needs an existing store")
+        fetched = merge_delta(current, fetched, live_ids)
+    plan = plan_sync(current, fetched)
+    if not plan.records:
+        raise RuntimeError(f"ABACUS returned no {name}; keeping the current catalog")
+
+    if index is not None and not plan.changed:
+        return StoreSync(None, None, plan.stats, changed=False)
+
+    embeddings = encode(plan.embed_texts)
+    if index is None:
+        index = vector_index.build_index(embeddings, ids=plan.embed_positions)
+    else:
+        index = vector_index.update_index(
+            index, plan.remove, embeddings, plan.embed_positions
+        )
+    postings = None
+    if name == vector_index.APPLICATION_STORE:
+        postings = application_postings(
+            (Application.from_dict(r) for r in plan.records), plan.positions
+        )
+    vector_index.write_store(
+        name, index, plan.records, directory, postings=postings, positions=plan.positions
+    )
+    index, records = vector_index.read_store(name, directory)
+    return StoreSync(index, records, plan.stats, changed=True)
+
+
+def _load_state(directory: Path) -> Dict[str, Any]:
+    path = directory / STATE_FILE
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_state(directory: Path, state: Dict[str, Any]) -> None:
+    path = directory / STATE_FILE
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2)
+    tmp.replace(path)
+
+
+def generation(directory: Path = vector_index.VECTOR_DIR) -> int:
+    """Return the catalog generation recorded by the last sync."""
+    return int(_load_state(directory).get("generation", 0))
+
+
+def _reload(directory: Path, current: int, stale: bool) -> Dict[str, StoreSync]:
+    """Return the stores as another process left them, opened only if ``stale``."""
+    unchanged = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    results: Dict[str, StoreSync] = {}
+    for name in ENDPOINTS:
+        if stale:
+            index, records = vector_index.read_store(name, directory)
+            results[name] = StoreSync(index, records, dict(unchanged), True, current)
+        else:
+            results[name] = StoreSync(None, None, dict(unchanged), False, current)
+    return results
+
+
+def sync_catalog(
+    client: AbacusClient,
+    encode: Callable[[List[str]], np.ndarray],
+    directory: Path = vector_index.VECTOR_DIR,
+    modified_field: Optional[str] = None,
+    min_interval: float = 0.0,
+    loaded_generation: Optional[int] = None,
+) -> Dict[str, StoreSync]:
+    """Sync every catalog store with ABACUS and return the results by store.
+
+    With ``modified_field`` (default ``settings.ABACUS_MODIFIED_FIELD``) only
+    records modified since the previous sync are fetched, using an OData
+    ``$filter``, plus the list of live ids to detect deletions.  Otherwise
+    the full catalog is fetched and diffed.
+
+    When any process synced less than ``min_interval`` seconds ago, ABACUS is
+    not queried: if ``loaded_generation`` (the caller's) is older than the
+    stored one, the stores are reopened and reported as changed.
+    """
+    modified_field = (
+        settings.ABACUS_MODIFIED_FIELD if modified_field is None else modified_field
+    )
+    with _SYNC_LOCK, _process_lock(directory):
+        state = _load_state(directory)
+        current = int(state.get("generation", 0))
+        if min_interval > 0 and time.time() - float(state.get("synced_at", 0)) < min_interval:
+            stale = loaded_generation is not None and loaded_generation != current
+            return _reload(directory, current, stale)
+        stale = loaded_generation not in (None, current)
+        results: Dict[str, StoreSync] = {}
+        try:
+            for name, endpoint in ENDPOINTS.items():
+                started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                since = state.get(name)
+                stored = all(path.exists() for path in vector_index.store_paths(name, directory))
+                if modified_field and since and stored:
+                    fetched = client.query_data(
+                        endpoint, {"$filter": f"{modified_field} gt {since}"}
+                    )
+                    live_ids = {
+                        _record_id(r) for r in client.query_data(endpoint, {"$select": "id"})
+                    }
+                    results[name] = sync_store(name, fetched, encode, directory, live_ids)
+                else:
+                    fetched = client.query_data(endpoint)
+                    results[name] = sync_store(name, fetched, encode, directory)
+                state[name] = started
+        except BaseException:
+            for result in results.values():
+                if result.records is not None:
+                    result.records.close()
+            raise
+        finally:
+            # Record the stores written so far even when a later one fails:
+            # other workers then reload them, and the next delta sync of a
+            # written store starts from its own fetch time.
+            if any(result.changed for result in results.values()):
+                current += 1
+                state["generation"] = current
+            if len(results) == len(ENDPOINTS):
+                state["synced_at"] = time.time()
+            _save_state(directory, state)
+        for name, result in results.items():
+            result.generation = current
+            if not result.changed and stale:
+                # Another process changed this store since the caller loaded it.
+                result.index, result.records = vector_index.read_store(name, directory)
+                result.changed = True
+    return results
+
+
+def main() -> None:
+    from embedder import load_embedder
+    from embedding_cache import cached_encoder, open_cache
+
+    model = load_embedder()
+
+    def encode(texts: List[str]) -> np.ndarray:
+        if not texts:
+            return encode([""])[:0]
+        return np.asarray(model.encode(texts, convert_to_numpy=True), dtype="float32")
+
+    encode_catalog = cached_encoder(open_cache(), encode)
+    for name, result in sync_catalog(AbacusClient(), encode_catalog).items():
+        print(f"{name}: " + ", ".join(f"{k} {v}" for k, v in result.stats.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Pluggable sentence-embedding backends.
+
+``torch`` runs the original ``SentenceTransformer`` model.  ``onnx`` runs the
+same model exported to ONNX (optionally int8-quantized) through onnxruntime,
+which avoids importing PyTorch and has a much smaller memory footprint.
+Export a model once with::
+
+    python embedder.py export --quantize
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from env import settings
+
+BACKENDS = ("torch", "onnx")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model.int8.onnx"
+ONNX_CONFIG_FILE = "embedder_config.json"
+
+
+class Embedder(Protocol):
+    """Interface shared by the embedding backends (a ``SentenceTransformer`` subset)."""
+
+    def encode(self, texts: Sequence[str], convert_to_numpy: bool = True) -> np.ndarray:
+        ...
+
+
+class OnnxEmbedder:
+    """Sentence embeddings from an exported ONNX transformer.
+
+    Tokenization uses the ``tokenizers`` library and pooling/normalization are
+    applied in NumPy according to the ``embedder_config.json`` written by
+    :func:`export_onnx`, mirroring the original SentenceTransformer modules.
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        quantized: bool = False,
+        threads: int = 0,
+        batch_size: int = 32,
+    ) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with (model_dir / ONNX_CONFIG_FILE).open("r", encoding="utf-8") as fh:
+            self.config = json.load(fh)
+        self.batch_size = batch_size
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=int(self.config["max_seq_length"]))
+        self.tokenizer.enable_padding(pad_id=int(self.config.get("pad_token_id", 0)))
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_file = model_dir / (ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE)
+        self.session = ort.InferenceSession(
+            str(model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype="int64")
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype="int64")
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype="int64")
+        hidden = self.session.run(None, feeds)[0]
+
+        if self.config.get("pooling", "mean") == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype("float32")
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config.get("normalize", True):
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype("float32")
+
+    def encode(self, texts: Sequence[str], convert_to_numpy: bool = True) -> np.ndarray:
+        """Return a ``(len(texts), dim)`` float32 array of sentence embeddings."""
+        if not texts:
+            return np.zeros((0, int(self.config["dimension"])), dtype="float32")
+        batches = [
+            self._encode_batch(texts[i : i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        return np.concatenate(batches)
+
+
+def load_embedder(
+    backend: Optional[str] = None,
+    model_name: Optional[str] = None,
+    onnx_dir: Optional[Path] = None,
+    quantized: Optional[bool] = None,
+) -> Embedder:
+    """Return the embedder selected by ``settings.EMBEDDER_BACKEND``."""
+    backend = (backend or settings.EMBEDDER_BACKEND).lower()
+    if backend == "torch":
+        # Imported lazily: PyTorch dominates start-up time and memory.
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name or settings.EMBEDDER_MODEL)
+    if backend == "onnx":
+        return OnnxEmbedder(
+            Path(onnx_dir or settings.EMBEDDER_ONNX_DIR),
+            quantized=settings.EMBEDDER_ONNX_QUANTIZED if quantized is None else quantized,
+            threads=settings.EMBEDDER_ONNX_THREADS,
+        )
+    raise ValueError(f"Unknown EMBEDDER_BACKEND {backend!r}; expected one of {BACKENDS}")
+
+
+_file_digests: Dict[Tuple[str, int, int], str] = {}
+
+
+def _file_digest(path: Path) -> str:
+    """Return a short content hash of ``path``, memoized by size and mtime."""
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    digest = _file_digests.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = _file_digests[key] = sha.hexdigest()[:16]
+    return digest
+
+
+def embedder_id(
+    backend: Optional[str] = None,
+    model_name: Optional[str] = None,
+    onnx_dir: Optional[Path] = None,
+    quantized: Optional[bool] = None,
+) -> str:
+    """Name the embedder :func:`load_embedder` returns for the same arguments.
+
+    Used to key cached vectors, so two ids are equal only if both embedders
+    produce the same vectors.  An ONNX id names the exported model and
+    hashes the model file, so re-exporting into the same directory, or two
+    directories with the same name, never share cached vectors.
+    """
+    backend = (backend or settings.EMBEDDER_BACKEND).lower()
+    if backend == "onnx":
+        quantized = settings.EMBEDDER_ONNX_QUANTIZED if quantized is None else quantized
+        model_dir = Path(onnx_dir or settings.EMBEDDER_ONNX_DIR)
+        model_file = model_dir / (ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE)
+        kind = f"onnx{'-int8' if quantized else ''}"
+        try:
+            with (model_dir / ONNX_CONFIG_FILE).open("r", encoding="utf-8") as fh:
+                name = json.load(fh).get("model_name") or model_dir.name
+            return f"{kind}:{name}@{_file_digest(model_file)}"
+        except OSError:
+            # Not exported yet; load_embedder would fail for it anyway.
+            return f"{kind}:{model_dir.name}"
+    return f"{backend}:{model_name or settings.EMBEDDER_MODEL}"
+
+
+# ----------------------------------------------------------------------
+# Export tooling
+
+
+def export_onnx(model_name: str, out_dir: Path, quantize: bool = False) -> Path:
+    """Export ``model_name`` to ONNX under ``out_dir`` (plus an int8 copy)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    pooling = next((m for m in model if type(m).__name__ == "Pooling"), None)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    transformer.tokenizer.save_pretrained(str(out_dir))
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, auto_model: torch.nn.Module) -> None:
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.auto_model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            )[0]
+
+    sample = transformer.tokenizer(["example sentence"], return_tensors="pt")
+    inputs = (
+        sample["input_ids"],
+        sample["attention_mask"],
+        sample.get("token_type_ids", torch.zeros_like(sample["input_ids"])),
+    )
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # the TorchScript exporter handles dynamic axes
+    encoder = _Encoder(transformer.auto_model).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder,
+            inputs,
+            str(out_dir / ONNX_MODEL_FILE),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in names}
+            | {"last_hidden_state": {0: "batch", 1: "sequence"}},
+            opset_version=14,
+            **kwargs,
+        )
+
+    pooling_config = pooling.get_config_dict() if pooling is not None else {}
+    cls_pooling = (
+        pooling_config.get("pooling_mode_cls_token")
+        or pooling_config.get("pooling_mode") == "cls"
+    )
+    config = {
+        "model_name": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pad_token_id": transformer.tokenizer.pad_token_id or 0,
+        "pooling": "cls" if cls_pooling else "mean",
+        "normalize": any(type(m).__name__ == "Normalize" for m in model),
+    }
+    with (out_dir / ONNX_CONFIG_FILE).open("w", encoding="utf-8") as fh:
+        json.dump(config, fh, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(out_dir / ONNX_MODEL_FILE),
+            str(out_dir / ONNX_QUANTIZED_FILE),
+            weight_type=QuantType.QInt8,
+        )
+    return out_dir
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Embedding backend tooling.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="export the sentence model to ONNX")
+    export.add_argument("--model", default=settings.EMBEDDER_MODEL)
+    export.add_argument("--out", type=Path, default=Path(settings.EMBEDDER_ONNX_DIR))
+    export.add_argument("--quantize", action="store_true", help="also write an int8 model")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        out = export_onnx(args.model, args.out, args.quantize)
+        print(f"Exported {args.model} to {out}")
+
+
+if __name__ == "__main__":
+    main()
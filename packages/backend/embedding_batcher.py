@@ -0,0 +1,141 @@
+"""Micro-batching of sentence embeddings off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_Request = Tuple[str, asyncio.Future, asyncio.AbstractEventLoop, float]
+
+
+class EmbeddingBatcher:
+    """Collect concurrent encode requests and run them as one batch.
+
+    Requests are queued to a dedicated worker thread which waits up to
+    ``max_wait_ms`` after the first request for more to arrive (or until
+    ``max_batch_size`` are pending), runs a single batched ``encode`` call and
+    resolves each caller's future with its row.  The event loop never blocks
+    on the model's forward pass.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self._encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.batches = 0
+        self.encode_seconds = 0.0
+        self.latency_seconds = 0.0
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Return the embedding of ``text`` as a ``(1, dim)`` float32 array."""
+        self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._queue.put((text, future, loop, time.perf_counter()))
+        return await future
+
+    # ------------------------------------------------------------------
+    # Worker thread
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            start = time.perf_counter()
+            try:
+                texts = [text for text, *_ in batch]
+                embeddings = np.asarray(self._encode(texts), dtype="float32")
+                error: Optional[Exception] = None
+            except Exception as exc:  # propagate to every waiting caller
+                embeddings, error = None, exc
+            done = time.perf_counter()
+
+            self.batches += 1
+            self.requests += len(batch)
+            self.encode_seconds += done - start
+            for row, (_, future, loop, enqueued) in enumerate(batch):
+                self.latency_seconds += done - enqueued
+                try:
+                    if error is not None:
+                        loop.call_soon_threadsafe(_set_exception, future, error)
+                    else:
+                        loop.call_soon_threadsafe(
+                            _set_result, future, embeddings[row : row + 1]
+                        )
+                except RuntimeError:  # the caller's event loop has been closed
+                    pass
+            if stop:
+                return
+
+    def close(self) -> None:
+        """Stop the worker thread after pending requests are processed."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        """Return throughput and latency counters."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "encode_seconds": self.encode_seconds,
+            "mean_latency_ms": (
+                1000 * self.latency_seconds / self.requests if self.requests else 0.0
+            ),
+        }
+
+
+def _set_result(future: asyncio.Future, value: np.ndarray) -> None:
+    if not future.done():
+        future.set_result(value)
+
+
+def _set_exception(future: asyncio.Future, exc: Exception) -> None:
+    if not future.done():
+        future.set_exception(exc)
@@ -0,0 +1,299 @@
+"""Persistent cache of text embeddings keyed by embedder and content hash.
+
+Vectors are appended to a raw float32 file that is memory-mapped for
+lookups; a parallel file holds the 16-byte hash of each row and is loaded
+into a dict on open.  Rebuilding the catalog indexes then only encodes
+descriptions that are new or changed.  Drop entries no longer used by the
+catalog stores with::
+
+    python embedding_cache.py prune
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import vector_index
+from embedder import embedder_id
+from env import settings
+from record_store import RecordStore
+
+KEY_SIZE = 16
+
+Encoder = Callable[[List[str]], np.ndarray]
+
+
+class EmbeddingCache:
+    """Map ``(embedder, text)`` to a float32 vector, persisted under ``directory``.
+
+    ``model`` identifies the embedder (see :func:`embedder.embedder_id`);
+    every embedder gets its own files, so switching models never returns
+    stale vectors.  Rows are only ever appended, and a partially written row
+    left by a crash is dropped on the next open.  Worker processes sharing
+    ``directory`` append and prune under a file lock.
+    """
+
+    def __init__(self, directory: Path, model: str) -> None:
+        self.model = model
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+        self.vectors_path = directory / f"embedding_cache.{slug}.f32"
+        self.keys_path = directory / f"embedding_cache.{slug}.keys"
+        self.meta_path = directory / f"embedding_cache.{slug}.json"
+        self.lock_path = directory / f"embedding_cache.{slug}.lock"
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+        self._rows: Dict[bytes, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        # Keys file size and meta file mtime as last read, to spot other
+        # writers, and the prune generation the row numbers belong to.
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        with self._file_lock():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def key(self, text: str) -> bytes:
+        """Return the hash of ``text`` under this cache's embedder."""
+        data = f"{self.model}\0{text}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=KEY_SIZE).digest()
+
+    # ------------------------------------------------------------------
+    # Persistence
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold an exclusive lock on the cache files across worker processes.
+
+        Row numbers are offsets into files shared by every worker, so they
+        are only assigned (or renumbered by :meth:`prune`) under this lock,
+        after :meth:`_load` has caught up with rows other workers appended.
+        """
+        try:
+            import fcntl
+        except ImportError:  # pragma: no cover - Windows: one worker process
+            yield
+            return
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock_path.open("a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _stamp_files(self) -> Optional[Tuple[int, int]]:
+        try:
+            return (self.keys_path.stat().st_size, self.meta_path.stat().st_mtime_ns)
+        except OSError:
+            return None
+
+    def _write_meta(self) -> None:
+        self.meta_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            json.dump({"model": self.model, "dim": self.dim, "generation": self._generation}, fh)
+        tmp.replace(self.meta_path)
+
+    def _load(self) -> None:
+        """Read rows appended (or renumbered) since the last load.
+
+        Must be called under :meth:`_file_lock`.
+        """
+        stamp = self._stamp_files()
+        if stamp is not None and stamp == self._stamp:
+            return
+        if not self.meta_path.exists():
+            return
+        try:
+            with self.meta_path.open("r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            if meta.get("model") != self.model:
+                raise ValueError(f"cache belongs to embedder {meta.get('model')!r}")
+            dim = int(meta["dim"])
+            generation = int(meta.get("generation", 0))
+            size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+            # Rows we already know keep their numbers unless a prune has
+            # renumbered them since; then every key is read again.
+            known = len(self._rows) if generation == self._generation else 0
+            keys = b""
+            if self.keys_path.exists():
+                with self.keys_path.open("rb") as fh:
+                    fh.seek(known * KEY_SIZE)
+                    keys = fh.read()
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"Failed to load embedding cache: {exc}. Starting empty.")
+            return
+        key_bytes = known * KEY_SIZE + len(keys)
+        count = min(key_bytes // KEY_SIZE, size // (4 * dim))
+        if key_bytes != count * KEY_SIZE or size != count * 4 * dim:
+            # Drop a row left half-written by an interrupted append.
+            for path, length in ((self.keys_path, count * KEY_SIZE), (self.vectors_path, count * 4 * dim)):
+                if path.exists():
+                    os.truncate(path, length)
+        self.dim = dim
+        self._generation = generation
+        if not known:
+            self._rows = {}
+        for row in range(known, count):
+            offset = (row - known) * KEY_SIZE
+            self._rows[keys[offset : offset + KEY_SIZE]] = row
+        self._stamp = self._stamp_files()
+        self._map()
+
+    def _map(self) -> None:
+        count = len(self._rows)
+        self._vectors = (
+            np.memmap(self.vectors_path, dtype="float32", mode="r", shape=(count, self.dim))
+            if count
+            else None
+        )
+
+    def _append(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Append rows for ``keys``; must be called under :meth:`_file_lock`."""
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            self._write_meta()
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedder {self.model!r} returned {vectors.shape[1]}-d vectors; "
+                f"the cache holds {self.dim}-d vectors"
+            )
+        # Vectors first: the keys file decides how many rows are valid.
+        with self.vectors_path.open("ab") as fh:
+            fh.write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+        with self.keys_path.open("ab") as fh:
+            fh.write(b"".join(keys))
+        start = len(self._rows)
+        for offset, key in enumerate(keys):
+            self._rows[key] = start + offset
+        self._stamp = self._stamp_files()
+        self._map()
+
+    # ------------------------------------------------------------------
+    # Public API
+
+    def encode(self, texts: Sequence[str], encode: Encoder) -> np.ndarray:
+        """Return embeddings of ``texts``, calling ``encode`` only for misses.
+
+        Each distinct missing text is encoded once and added to the cache.
+        """
+        if not texts:
+            return encode([])
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                with self._file_lock():
+                    # Another worker may have added (or pruned) rows meanwhile.
+                    self._load()
+                    missing: Dict[bytes, str] = {}
+                    for key, text in zip(keys, texts):
+                        if key not in self._rows:
+                            missing.setdefault(key, text)
+                    if missing:
+                        vectors = np.asarray(encode(list(missing.values())), dtype="float32")
+                        self._append(list(missing), vectors)
+            else:
+                missing = {}
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+            return np.array(self._vectors[[self._rows[key] for key in keys]])
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Drop every entry whose text is not in ``keep``; return how many."""
+        wanted = {self.key(text) for text in keep}
+        with self._lock, self._file_lock():
+            self._load()
+            kept = [(key, row) for key, row in self._rows.items() if key in wanted]
+            removed = len(self._rows) - len(kept)
+            if not removed:
+                return 0
+            kept.sort(key=lambda item: item[1])
+            vectors = (
+                np.array(self._vectors[[row for _, row in kept]])
+                if kept
+                else np.zeros((0, self.dim), dtype="float32")
+            )
+            self._vectors = None
+            # Empty the keys first so a crash part-way leaves an empty cache
+            # rather than keys that point at the wrong vectors.
+            os.truncate(self.keys_path, 0)
+            # Tell other workers their row numbers are stale.
+            self._generation += 1
+            self._write_meta()
+            for path, data in (
+                (self.vectors_path, vectors.tobytes()),
+                (self.keys_path, b"".join(key for key, _ in kept)),
+            ):
+                tmp = path.with_name(path.name + ".tmp")
+                tmp.write_bytes(data)
+                tmp.replace(path)
+            self._rows = {key: row for row, (key, _) in enumerate(kept)}
+            self._stamp = self._stamp_files()
+            self._map()
+        return removed
+
+
+def cached_encoder(cache: Optional[EmbeddingCache], encode: Encoder) -> Encoder:
+    """Wrap ``encode`` so it goes through ``cache`` (when there is one)."""
+    if cache is None:
+        return encode
+    return lambda texts: cache.encode(texts, encode)
+
+
+def open_cache(
+    model: Optional[str] = None, directory: Optional[Path] = None
+) -> Optional[EmbeddingCache]:
+    """Return the cache for ``model`` (the configured embedder), if enabled."""
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    return EmbeddingCache(
+        Path(directory or settings.EMBEDDING_CACHE_DIR), model or embedder_id()
+    )
+
+
+def catalog_texts(directory: Optional[Path] = None) -> List[str]:
+    """Return the descriptions stored in the catalog vector stores."""
+    texts: List[str] = []
+    for name in (vector_index.CAPABILITY_STORE, vector_index.APPLICATION_STORE):
+        _, db_path = vector_index.store_paths(name, directory or vector_index.VECTOR_DIR)
+        if not db_path.exists():
+            raise RuntimeError(f"Vector store {name!r} not found at {db_path}")
+        store = RecordStore(db_path)
+        try:
+            texts.extend(record.get("description", "") for record in store)
+        finally:
+            store.close()
+    return texts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or prune the embedding cache.")
+    parser.add_argument("command", choices=("stats", "prune"))
+    parser.add_argument("--model", default=None, help="embedder id (defaults to the configured one)")
+    args = parser.parse_args(argv)
+
+    cache = EmbeddingCache(Path(settings.EMBEDDING_CACHE_DIR), args.model or embedder_id())
+    if args.command == "prune":
+        removed = cache.prune(catalog_texts())
+        print(f"Removed {removed} stale entries; {len(cache)} remain")
+    else:
+        print(f"{cache.model}: {len(cache)} entries of dimension {cache.dim}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,22 +16,150 @@ class Settings:
     BEDROCK_TIMEOUT: int = int(os.getenv("BEDROCK_TIMEOUT", "15"))
     BEDROCK_MAX_TOKENS: int = int(os.getenv("BEDROCK_MAX_TOKENS", "2048"))
     BEDROCK_TEMPERATURE: float = float(os.getenv("BEDROCK_TEMPERATURE", "0.7"))
+    # Shared async connection pool used by ``BedrockAdapter.acreate``
+    BEDROCK_HTTP2: bool = os.getenv("BEDROCK_HTTP2", "true").lower() not in {"0", "false", "no"}
+    BEDROCK_POOL_MAX_CONNECTIONS: int = int(os.getenv("BEDROCK_POOL_MAX_CONNECTIONS", "100"))
+    BEDROCK_POOL_MAX_KEEPALIVE: int = int(os.getenv("BEDROCK_POOL_MAX_KEEPALIVE", "20"))
+    BEDROCK_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("BEDROCK_POOL_KEEPALIVE_EXPIRY", "30"))
+    BEDROCK_MAX_CONCURRENCY_PER_HOST: int = int(
+        os.getenv("BEDROCK_MAX_CONCURRENCY_PER_HOST", "32")
+    )
+
+    # Outstanding Bedrock calls across all requests (0 disables); up to
+    # LLM_QUEUE_SIZE more wait at most LLM_QUEUE_TIMEOUT seconds before the
+    # call fails instead of adding to the backlog
+    LLM_MAX_OUTSTANDING: int = int(os.getenv("LLM_MAX_OUTSTANDING", "32"))
+    LLM_QUEUE_SIZE: int = int(os.getenv("LLM_QUEUE_SIZE", "256"))
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+
+    # Retries of Bedrock calls and ABACUS queries on connection errors, 429
+    # and 5xx sleep with decorrelated jitter between RETRY_BASE_DELAY and
+    # RETRY_MAX_DELAY seconds (ABACUS GETs use ABACUS_RETRY_BACKOFF as base)
+    BEDROCK_MAX_RETRIES: int = int(os.getenv("BEDROCK_MAX_RETRIES", "2"))
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", "0.2"))
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", "5"))
+    # Send a duplicate Bedrock call when one is still pending after this
+    # latency percentile of recent calls, keeping the first reply (0 disables)
+    BEDROCK_HEDGE_PERCENTILE: float = float(os.getenv("BEDROCK_HEDGE_PERCENTILE", "0"))
+    # Circuit breakers per upstream: open after CIRCUIT_FAILURE_THRESHOLD
+    # consecutive failures (0 disables), probe again after
+    # CIRCUIT_RESET_TIMEOUT seconds.  Meanwhile answers come from the response
+    # cache (similarity >= DEGRADED_CACHE_THRESHOLD) or the vector search alone
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    DEGRADED_CACHE_THRESHOLD: float = float(os.getenv("DEGRADED_CACHE_THRESHOLD", "0.8"))
 
     # ABACUS
     ABACUS_BASE_URL: str = os.getenv("ABACUS_BASE_URL", "").rstrip("/")
     ABACUS_CLIENT_SECRET: str = os.getenv("ABACUS_CLIENT_SECRET", "")
     ABACUS_TIMEOUT: int = int(os.getenv("ABACUS_TIMEOUT", "15"))
+    # Catalog fetches: OData page size ($top, 0 disables client paging),
+    # pages fetched in parallel, and GET retries with exponential backoff
+    ABACUS_PAGE_SIZE: int = int(os.getenv("ABACUS_PAGE_SIZE", "500"))
+    ABACUS_FETCH_CONCURRENCY: int = int(os.getenv("ABACUS_FETCH_CONCURRENCY", "4"))
+    ABACUS_MAX_RETRIES: int = int(os.getenv("ABACUS_MAX_RETRIES", "3"))
+    ABACUS_RETRY_BACKOFF: float = float(os.getenv("ABACUS_RETRY_BACKOFF", "0.5"))
+    # Unique key $skip pages are ordered by ("" = follow server paging)
+    ABACUS_ORDER_BY: str = os.getenv("ABACUS_ORDER_BY", "id")
+    # Incremental catalog sync: seconds between runs (0 disables) and the
+    # OData timestamp field used to fetch only modified records ("" = diff
+    # the full catalog by content)
+    CATALOG_SYNC_INTERVAL: float = float(os.getenv("CATALOG_SYNC_INTERVAL", "0"))
+    ABACUS_MODIFIED_FIELD: str = os.getenv("ABACUS_MODIFIED_FIELD", "")
+
+    # Vector index: "flat", "hnsw", "ivf_flat" or "ivf_pq"; "ip" indexes hold
+    # L2-normalized vectors (cosine similarity), "l2" uses Euclidean distance
+    VECTOR_INDEX_TYPE: str = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+    VECTOR_METRIC: str = os.getenv("VECTOR_METRIC", "ip").lower()
+    HNSW_M: int = int(os.getenv("HNSW_M", "32"))
+    HNSW_EF_CONSTRUCTION: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH: int = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    IVF_NLIST: int = int(os.getenv("IVF_NLIST", "0"))  # 0 = 4 * sqrt(n)
+    IVF_NPROBE: int = int(os.getenv("IVF_NPROBE", "8"))
+    PQ_M: int = int(os.getenv("PQ_M", "16"))
+    PQ_NBITS: int = int(os.getenv("PQ_NBITS", "8"))
+
+    # Memory-map the catalog indexes (shared page cache across workers) and
+    # warm the stores and embedder in the FastAPI lifespan, before serving
+    VECTOR_INDEX_MMAP: bool = os.getenv("VECTOR_INDEX_MMAP", "true").lower() not in {"0", "false", "no"}
+    VECTOR_STORE_WARMUP: bool = os.getenv("VECTOR_STORE_WARMUP", "true").lower() not in {"0", "false", "no"}
 
     # Misc
     VERIFY_SSL: bool = os.getenv("VERIFY_SSL", "true").lower() not in {"0", "false", "no"}
 
     # FastAPI
     ALLOWED_ORIGINS: str = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
+    # Prometheus-format /metrics route, and a Server-Timing header with the
+    # orchestration stage durations of each response
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() not in {"0", "false", "no"}
+    METRICS_TIMING_HEADER: bool = os.getenv("METRICS_TIMING_HEADER", "false").lower() in {"1", "true", "yes"}
+
+    # Admission control for /ask and /ask/stream: ADMISSION_MAX_CONCURRENT
+    # requests run at once (0 disables), ADMISSION_QUEUE_SIZE more wait up to
+    # ADMISSION_QUEUE_TIMEOUT seconds and the rest get 503 with Retry-After
+    ADMISSION_MAX_CONCURRENT: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", "64"))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "128"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+    # Per-client token bucket (0 disables): RATE_LIMIT_PER_MINUTE requests with
+    # bursts of RATE_LIMIT_BURST; clients are keyed by the first entry of
+    # RATE_LIMIT_CLIENT_HEADER (e.g. X-Forwarded-For) or the peer address
+    RATE_LIMIT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_PER_MINUTE", "0"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "10"))
+    RATE_LIMIT_CLIENT_HEADER: str = os.getenv("RATE_LIMIT_CLIENT_HEADER", "")
 
     # UI
     APP_NAME: str = os.getenv("APP_NAME", "AskABACUS")
     APP_LOGO: str = os.getenv("APP_LOGO", "/images/ameritas-logo.png")
 
+    # Sentence embedder: "torch" (SentenceTransformer) or "onnx" (an export
+    # written by ``python embedder.py export``, optionally int8-quantized)
+    EMBEDDER_BACKEND: str = os.getenv("EMBEDDER_BACKEND", "torch").lower()
+    EMBEDDER_MODEL: str = os.getenv("EMBEDDER_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDER_ONNX_DIR: str = os.getenv(
+        "EMBEDDER_ONNX_DIR", str(Path(__file__).with_name("models") / "all-MiniLM-L6-v2-onnx")
+    )
+    EMBEDDER_ONNX_QUANTIZED: bool = os.getenv("EMBEDDER_ONNX_QUANTIZED", "false").lower() not in {"0", "false", "no"}
+    EMBEDDER_ONNX_THREADS: int = int(os.getenv("EMBEDDER_ONNX_THREADS", "0"))
+
+    # Persistent cache of catalog description embeddings (per embedder), so
+    # index rebuilds only encode new or changed descriptions
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() not in {"0", "false", "no"}
+    EMBEDDING_CACHE_DIR: str = os.getenv(
+        "EMBEDDING_CACHE_DIR", str(Path(__file__).with_name("vector_store"))
+    )
+
+    # Query embeddings are micro-batched on a worker thread
+    EMBED_BATCHING: bool = os.getenv("EMBED_BATCHING", "true").lower() not in {"0", "false", "no"}
+    EMBED_BATCH_MAX_SIZE: int = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+    EMBED_BATCH_MAX_WAIT_MS: float = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+    # Orchestration pipeline: "full" (planner, ranker, synthesizer, reviewer),
+    # "merged" (synthesizer and reviewer in one call) or "direct" (skip the
+    # planner for queries of at most PIPELINE_SHORT_QUERY_WORDS words)
+    PIPELINE_MODE: str = os.getenv("PIPELINE_MODE", "full").lower()
+    PIPELINE_SHORT_QUERY_WORDS: int = int(os.getenv("PIPELINE_SHORT_QUERY_WORDS", "8"))
+
+    # Application candidates sent to the ranker: vector top-N within a rough
+    # prompt token budget (~4 characters per token)
+    APP_CANDIDATE_TOP_N: int = int(os.getenv("APP_CANDIDATE_TOP_N", "20"))
+    RANKER_PROMPT_TOKEN_BUDGET: int = int(os.getenv("RANKER_PROMPT_TOKEN_BUDGET", "3000"))
+
+    # Semantic response cache in front of ``Orchestrator.run``
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() not in {"0", "false", "no"}
+    RESPONSE_CACHE_THRESHOLD: float = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    # Seconds between writes of new cache entries to disk (also saved at shutdown)
+    RESPONSE_CACHE_SAVE_INTERVAL: float = float(os.getenv("RESPONSE_CACHE_SAVE_INTERVAL", "30"))
+
+    # Per-call LLM memoization (planner/ranker sub-steps)
+    LLM_MEMO_ENABLED: bool = os.getenv("LLM_MEMO_ENABLED", "true").lower() not in {"0", "false", "no"}
+    LLM_MEMO_MAX_ENTRIES: int = int(os.getenv("LLM_MEMO_MAX_ENTRIES", "2048"))
+    LLM_MEMO_SQLITE: bool = os.getenv("LLM_MEMO_SQLITE", "true").lower() not in {"0", "false", "no"}
+    LLM_MEMO_TTL: float = float(os.getenv("LLM_MEMO_TTL", "86400"))
+    # Rows kept in the SQLite tier; older and expired rows are pruned
+    LLM_MEMO_SQLITE_MAX_ENTRIES: int = int(os.getenv("LLM_MEMO_SQLITE_MAX_ENTRIES", "100000"))
+
     # Memory
     LONG_TERM_PATH: str = os.getenv(
         "LONG_TERM_PATH",
@@ -42,6 +170,34 @@ class Settings:
     )
     # Backwards compatibility
     LONG_TERM_DB_PATH: str = LONG_TERM_PATH
+    # Conversation writes are queued and committed in one transaction per
+    # flush interval; the queue holds at most LONG_TERM_QUEUE_SIZE requests
+    LONG_TERM_FLUSH_INTERVAL_MS: float = float(os.getenv("LONG_TERM_FLUSH_INTERVAL_MS", "50"))
+    LONG_TERM_QUEUE_SIZE: int = int(os.getenv("LONG_TERM_QUEUE_SIZE", "10000"))
+    # SQLite ``PRAGMA synchronous`` in WAL mode: OFF, NORMAL, FULL or EXTRA
+    LONG_TERM_SYNCHRONOUS: str = os.getenv("LONG_TERM_SYNCHRONOUS", "NORMAL").upper()
+    # Sessions idle for LONG_TERM_RETENTION_DAYS are purged (0 keeps them)
+    # every LONG_TERM_RETENTION_INTERVAL seconds, appending their messages to
+    # LONG_TERM_ARCHIVE_PATH (JSON Lines) when set
+    LONG_TERM_RETENTION_DAYS: float = float(os.getenv("LONG_TERM_RETENTION_DAYS", "0"))
+    LONG_TERM_RETENTION_INTERVAL: float = float(os.getenv("LONG_TERM_RETENTION_INTERVAL", "3600"))
+    LONG_TERM_ARCHIVE_PATH: str = os.getenv("LONG_TERM_ARCHIVE_PATH", "")
+    # Semantic recall of earlier turns of the same session: up to
+    # RECALL_TOP_K turns (0 disables) scoring at least RECALL_MIN_SCORE
+    # (cosine) among the last RECALL_MAX_CANDIDATES, within
+    # RECALL_TOKEN_BUDGET prompt tokens. A question scoring
+    # RECALL_FOLLOW_UP_SCORE against an earlier one reuses its capability
+    # instead of calling the planner.
+    RECALL_TOP_K: int = int(os.getenv("RECALL_TOP_K", "3"))
+    RECALL_MIN_SCORE: float = float(os.getenv("RECALL_MIN_SCORE", "0.5"))
+    RECALL_MAX_CANDIDATES: int = int(os.getenv("RECALL_MAX_CANDIDATES", "200"))
+    RECALL_TOKEN_BUDGET: int = int(os.getenv("RECALL_TOKEN_BUDGET", "600"))
+    RECALL_FOLLOW_UP_SCORE: float = float(os.getenv("RECALL_FOLLOW_UP_SCORE", "0.8"))
+    # Recent turns kept in process for at most SHORT_TERM_MAX_SESSIONS sessions
+    SHORT_TERM_MAX_SESSIONS: int = int(os.getenv("SHORT_TERM_MAX_SESSIONS", "1000"))
+    # Bearer token for GET /sessions/{id}/messages; the route is disabled
+    # while it is empty
+    SESSION_HISTORY_API_KEY: str = os.getenv("SESSION_HISTORY_API_KEY", "")
 
 
 settings = Settings()
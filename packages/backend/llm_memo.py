@@ -0,0 +1,253 @@
+"""Memoization of individual LLM calls keyed by a hash of the request."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# (key, response, created_at)
+_Row = Tuple[str, str, float]
+
+
+def memo_key(
+    model: str,
+    system_prompt: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+) -> str:
+    """Return a stable hash identifying one chat-completion request."""
+    blob = json.dumps(
+        {
+            "model": model,
+            "system": system_prompt,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMMemo:
+    """Two-tier memo of completion texts: in-process LRU plus optional SQLite.
+
+    The SQLite tier lives in its own ``llm_memo`` table so it can share the
+    database file used by :class:`sqlite_memory.SQLiteMemory` and survive
+    restarts.  Entries older than ``ttl`` seconds are ignored (``0`` disables
+    expiry).
+
+    :meth:`aget` reads SQLite on a worker thread and :meth:`put` hands rows
+    to a write-behind thread, so the event loop never waits for the
+    database.  Rows are written in batches, and every ``prune_interval``
+    seconds rows older than ``ttl`` and all but the newest ``max_rows`` are
+    deleted.  A full write queue drops rows rather than blocking the caller.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        db_path: Optional[Path] = None,
+        ttl: float = 0,
+        max_rows: int = 0,
+        prune_interval: float = 60.0,
+        max_queue: int = 10000,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self._lru: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_Row]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._pruned_at = 0.0
+        self.conn: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_memo (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_memo_created ON llm_memo (created_at)"
+            )
+            self._prune(time.time())
+            self.conn.commit()
+
+        self.memory_hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+        self.dropped = 0
+
+    def _fresh(self, created_at: float) -> bool:
+        return self.ttl <= 0 or time.time() - created_at <= self.ttl
+
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        self._lru[key] = (response, created_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            cached = self._lru.get(key)
+            if cached is not None and self._fresh(cached[1]):
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return cached[0]
+            return None
+
+    def _read(self, key: str) -> Optional[_Row]:
+        assert self.conn is not None
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM llm_memo WHERE key = ?",
+                (key,),
+            ).fetchone()
+        return (key, row[0], row[1]) if row else None
+
+    def _found(self, row: Optional[_Row]) -> Optional[str]:
+        with self._lock:
+            if row and self._fresh(row[2]):
+                self._remember(*row)
+                self.sqlite_hits += 1
+                return row[1]
+            self.misses += 1
+            return None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the memoized response for ``key`` or ``None``."""
+        cached = self._get_memory(key)
+        if cached is not None:
+            return cached
+        return self._found(self._read(key) if self.conn is not None else None)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Like :meth:`get`, reading the SQLite tier on a worker thread."""
+        cached = self._get_memory(key)
+        if cached is not None:
+            return cached
+        row = await asyncio.to_thread(self._read, key) if self.conn is not None else None
+        return self._found(row)
+
+    def put(self, key: str, response: str) -> None:
+        """Store ``response`` under ``key``; the SQLite row is written behind."""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, response, created_at)
+        if self.conn is None:
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((key, response, created_at))
+        except queue.Full:
+            # The memo is an optimization; never make the caller wait for it.
+            self.dropped += 1
+
+    # ------------------------------------------------------------------
+    # Write-behind
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._write_loop, name="llm-memo-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            rows: List[_Row] = []
+            stop = item is None
+            if item is not None:
+                rows.append(item)
+            while not stop and len(rows) < 500:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    rows.append(item)
+            try:
+                if rows:
+                    self._write(rows)
+            except sqlite3.Error as exc:
+                print(f"Failed to write LLM memo rows: {exc}")
+            finally:
+                for _ in range(len(rows) + (1 if stop else 0)):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, rows: List[_Row]) -> None:
+        assert self.conn is not None
+        with self._db_lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO llm_memo (key, response, created_at) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            now = time.time()
+            if now - self._pruned_at >= self.prune_interval:
+                self._prune(now)
+            self.conn.commit()
+
+    def _prune(self, now: float) -> None:
+        """Delete expired rows and all but the newest ``max_rows``."""
+        assert self.conn is not None
+        if self.ttl > 0:
+            self.conn.execute("DELETE FROM llm_memo WHERE created_at < ?", (now - self.ttl,))
+        if self.max_rows > 0:
+            self.conn.execute(
+                "DELETE FROM llm_memo WHERE created_at <= ("
+                "SELECT created_at FROM llm_memo ORDER BY created_at DESC LIMIT 1 OFFSET ?)",
+                (self.max_rows,),
+            )
+        self._pruned_at = now
+
+    def flush(self) -> None:
+        """Block until every queued row has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the queued rows and close the database."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for both tiers."""
+        return {
+            "memory_hits": self.memory_hits,
+            "sqlite_hits": self.sqlite_hits,
+            "misses": self.misses,
+            "dropped": self.dropped,
+        }
@@ -2,12 +2,23 @@
 
 from __future__ import annotations
 
+import argparse
 import json
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+import vector_index
+from abacus_client import AbacusClient, batched
+from catalog import Application, application_postings
+from catalog_sync import ENDPOINTS
+from embedder import BACKENDS, Embedder, embedder_id, load_embedder
+from embedding_cache import cached_encoder, open_cache
+from env import settings
 
 DATA_FILES = [
     Path(__file__).with_name("technology_capabilities.json"),
@@ -27,26 +38,175 @@ def load_entries() -> List[Dict[str, str]]:
     return entries
 
 
-def build_index(texts: List[str], model_name: str = "all-MiniLM-L6-v2") -> faiss.Index:
-    """Create a FAISS index from the provided texts."""
-    model = SentenceTransformer(model_name)
+@lru_cache(maxsize=None)
+def _load_model(model_name: str, backend: Optional[str] = None) -> Embedder:
+    return load_embedder(backend, model_name)
+
+
+def encode_texts(
+    texts: List[str],
+    model_name: str = "all-MiniLM-L6-v2",
+    backend: Optional[str] = None,
+) -> np.ndarray:
+    """Embed ``texts`` with the sentence model as a float32 matrix.
+
+    ``backend`` defaults to ``settings.EMBEDDER_BACKEND`` so the stored
+    vectors come from the same embedder that encodes queries at runtime.
+    """
+    model = _load_model(model_name, backend)
     embeddings = model.encode(texts, convert_to_numpy=True)
-    embeddings = embeddings.astype("float32")
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
-    return index
-
-
-def main() -> None:
-    entries = load_entries()
-    texts = [e.get("description", "") for e in entries]
-    index = build_index(texts)
-
-    out_dir = Path(__file__).with_name("vector_store")
-    out_dir.mkdir(exist_ok=True)
-    faiss.write_index(index, str(out_dir / "index.faiss"))
-    with (out_dir / "metadata.json").open("w", encoding="utf-8") as fh:
-        json.dump(entries, fh, indent=2)
+    return embeddings.astype("float32")
+
+
+def build_index(
+    texts: List[str],
+    model_name: str = "all-MiniLM-L6-v2",
+    index_type: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> faiss.Index:
+    """Create a FAISS index from the provided texts.
+
+    Vectors are added with their positions as ids so the stores support
+    incremental updates (see ``catalog_sync.py``).
+    """
+    return vector_index.build_index(
+        encode_texts(texts, model_name, backend), index_type, ids=np.arange(len(texts))
+    )
+
+
+def embed_records(
+    records: Iterable[Dict[str, Any]],
+    encode: Callable[[List[str]], np.ndarray],
+    batch_size: int = 256,
+) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """Embed the descriptions of ``records`` in batches as they arrive.
+
+    ``records`` may be a generator such as ``AbacusClient.iter_records``, so
+    each batch is encoded while the following pages are still downloading.
+    """
+    kept: List[Dict[str, Any]] = []
+    chunks: List[np.ndarray] = []
+    for batch in batched(records, batch_size):
+        kept.extend(batch)
+        chunks.append(encode([r.get("description", "") for r in batch]))
+    if not chunks:
+        return kept, encode([""])[:0]
+    return kept, np.concatenate(chunks).astype("float32")
+
+
+def benchmark(
+    embeddings: np.ndarray, index_types: List[str], k: int, queries: int
+) -> None:
+    """Print build time, memory footprint and recall@k of each index type.
+
+    Recall is measured against exact flat search over the same vectors, using
+    a sample of the corpus itself as queries.
+    """
+    rng = np.random.default_rng(0)
+    sample = embeddings[rng.choice(len(embeddings), min(queries, len(embeddings)), replace=False)]
+    baseline = vector_index.build_index(embeddings, "flat")
+    _, truth = vector_index.search(baseline, sample, k)
+
+    print(f"{'index':<9} {'build s':>8} {'size MB':>8} {'search ms':>10} {f'recall@{k}':>10}")
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = vector_index.build_index(embeddings, index_type)
+        build_s = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 1e6
+        start = time.perf_counter()
+        _, found = vector_index.search(index, sample, k)
+        search_ms = (time.perf_counter() - start) * 1000 / max(len(sample), 1)
+        recall = vector_index.recall_at_k(truth, found, k)
+        print(
+            f"{index_type:<9} {build_s:>8.2f} {size_mb:>8.2f} "
+            f"{search_ms:>10.3f} {recall:>10.3f}"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the catalog vector store.")
+    parser.add_argument(
+        "--index-type",
+        choices=vector_index.INDEX_TYPES,
+        default=None,
+        help="FAISS index type (defaults to VECTOR_INDEX_TYPE)",
+    )
+    parser.add_argument("--model", default=settings.EMBEDDER_MODEL, help="sentence model name")
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=None,
+        help="embedding backend (defaults to EMBEDDER_BACKEND)",
+    )
+    parser.add_argument(
+        "--source",
+        choices=("files", "abacus"),
+        default="files",
+        help="read the catalog from the bundled JSON files or fetch it from ABACUS",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=256, help="records embedded per batch"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="encode every description instead of reusing the embedding cache",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="report build time, size and recall@k of every index type and exit",
+    )
+    parser.add_argument("-k", type=int, default=10, help="k used for recall@k")
+    parser.add_argument(
+        "--queries", type=int, default=200, help="number of corpus vectors used as queries"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+
+    if args.benchmark:
+        texts = [e.get("description", "") for e in load_entries()]
+        embeddings = encode_texts(texts, args.model, args.backend)
+        benchmark(embeddings, list(vector_index.INDEX_TYPES), args.k, args.queries)
+        return
+
+    stores: Dict[str, Iterable[Dict[str, Any]]]
+    if args.source == "abacus":
+        client = AbacusClient()
+        stores = {name: client.iter_records(endpoint) for name, endpoint in ENDPOINTS.items()}
+    else:
+        entries = load_entries()
+        stores = {
+            vector_index.CAPABILITY_STORE: [e for e in entries if "category" in e],
+            vector_index.APPLICATION_STORE: [e for e in entries if "technologies" in e],
+        }
+
+    def encode_uncached(texts: List[str]) -> np.ndarray:
+        return encode_texts(texts, args.model, args.backend)
+
+    # Only descriptions that are new or changed since the last build are encoded.
+    cache = None if args.no_cache else open_cache(embedder_id(args.backend, args.model))
+    encode = cached_encoder(cache, encode_uncached)
+
+    for name, fetched in stores.items():
+        start = time.perf_counter()
+        records, embeddings = embed_records(fetched, encode, args.batch_size)
+        index = vector_index.build_index(
+            embeddings, args.index_type, ids=np.arange(len(records))
+        )
+        postings = None
+        if name == vector_index.APPLICATION_STORE:
+            postings = application_postings(Application.from_dict(r) for r in records)
+        vector_index.write_store(name, index, records, postings=postings)
+        print(
+            f"Built {name} {type(index).__name__} over {index.ntotal} entries "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+    if cache is not None:
+        print(f"Embedding cache: {cache.hits} hits, {cache.misses} encoded")
 
 
 if __name__ == "__main__":
@@ -1,11 +1,165 @@
 """FastAPI backend service entry point."""
 
-from fastapi import FastAPI
+import asyncio
+import hmac
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from admission import (
+    AdmissionMiddleware,
+    ConcurrencyLimiter,
+    Overloaded,
+    RateLimiter,
+    overloaded_response,
+)
+from bedrock_adapter import BedrockAdapter
+import metrics
 from orchestrator import Orchestrator
 from env import settings
 
-app = FastAPI()
+
+async def sync_catalog_periodically(interval: float) -> None:
+    """Apply ABACUS catalog changes every ``interval`` seconds.
+
+    Every worker process runs this task.  Syncs take turns on a lock file,
+    and a worker that finds a sync by another worker from the last half
+    interval only reloads the stores it wrote.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            stats = await Orchestrator().sync_catalog(min_interval=interval / 2)
+            print(f"Catalog sync: {stats}")
+        except Exception as exc:  # keep serving the current catalog
+            print(f"Catalog sync failed: {exc}")
+
+
+async def save_response_cache() -> None:
+    """Write unsaved response cache entries from a worker thread.
+
+    The snapshot is taken on the event loop, so requests can keep updating
+    the cache while the files are written.
+    """
+    cache = Orchestrator._response_cache
+    snapshot = cache.snapshot() if cache is not None else None
+    if snapshot is not None:
+        await asyncio.to_thread(cache.write, snapshot)
+
+
+async def save_response_cache_periodically(interval: float) -> None:
+    """Persist new response cache entries every ``interval`` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await save_response_cache()
+        except Exception as exc:  # the entries stay cached in memory
+            print(f"Response cache save failed: {exc}")
+
+
+async def purge_sessions_periodically(interval: float, days: float) -> None:
+    """Remove conversation sessions idle for ``days`` every ``interval`` seconds."""
+    archive = Path(settings.LONG_TERM_ARCHIVE_PATH) if settings.LONG_TERM_ARCHIVE_PATH else None
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            memory = Orchestrator().long_memory
+            removed = await asyncio.to_thread(
+                memory.purge_sessions, time.time() - days * 86400, archive=archive
+            )
+            if removed:
+                await asyncio.to_thread(memory.compact)
+                print(f"Purged {removed} conversation sessions")
+        except Exception as exc:  # retry on the next interval
+            print(f"Session purge failed: {exc}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Warm the orchestrator on start-up; release pooled resources on shutdown.
+
+    Loading the embedder and opening the memory-mapped vector stores here
+    keeps that cost out of the first request.  When
+    ``CATALOG_SYNC_INTERVAL`` is set a background task keeps the catalog in
+    sync with ABACUS, and with ``LONG_TERM_RETENTION_DAYS`` another purges
+    idle conversation sessions.  New response cache entries are saved every
+    ``RESPONSE_CACHE_SAVE_INTERVAL`` seconds and on shutdown.
+    """
+    if settings.VECTOR_STORE_WARMUP:
+        orchestrator = Orchestrator()
+        await asyncio.to_thread(orchestrator.warm_up)
+    tasks = []
+    if settings.CATALOG_SYNC_INTERVAL > 0:
+        tasks.append(
+            asyncio.create_task(sync_catalog_periodically(settings.CATALOG_SYNC_INTERVAL))
+        )
+    if settings.RESPONSE_CACHE_ENABLED and settings.RESPONSE_CACHE_SAVE_INTERVAL > 0:
+        tasks.append(
+            asyncio.create_task(
+                save_response_cache_periodically(settings.RESPONSE_CACHE_SAVE_INTERVAL)
+            )
+        )
+    if settings.LONG_TERM_RETENTION_DAYS > 0:
+        tasks.append(
+            asyncio.create_task(
+                purge_sessions_periodically(
+                    settings.LONG_TERM_RETENTION_INTERVAL, settings.LONG_TERM_RETENTION_DAYS
+                )
+            )
+        )
+    yield
+    for task in tasks:
+        task.cancel()
+    await BedrockAdapter.aclose()
+    await save_response_cache()
+    if Orchestrator._embedding_batcher is not None:
+        Orchestrator._embedding_batcher.close()
+    if Orchestrator._llm_memo is not None:
+        await asyncio.to_thread(Orchestrator._llm_memo.close)
+    if Orchestrator._long_memory is not None:
+        # Commit conversation writes still queued behind the write-behind worker.
+        await asyncio.to_thread(Orchestrator._long_memory.close)
+
+
+def orchestrator_stats() -> Dict[str, Dict[str, float]]:
+    """Return the orchestrator's counters once it has been created."""
+    orchestrator = getattr(Orchestrator, "_instance", None)
+    if orchestrator is None or not getattr(Orchestrator, "_initialized", False):
+        return {}
+    return orchestrator.stats()
+
+
+ask_limiter = ConcurrencyLimiter(
+    settings.ADMISSION_MAX_CONCURRENT,
+    settings.ADMISSION_QUEUE_SIZE,
+    settings.ADMISSION_QUEUE_TIMEOUT,
+    name="requests",
+)
+rate_limiter = RateLimiter(settings.RATE_LIMIT_PER_MINUTE / 60.0, settings.RATE_LIMIT_BURST)
+
+metrics.REGISTRY.add_collector(metrics.stats_collector("orchestrator", orchestrator_stats))
+metrics.REGISTRY.add_collector(
+    metrics.stats_collector(
+        "admission", lambda: {"requests": ask_limiter.stats(), "rate": rate_limiter.stats()}
+    )
+)
+
+app = FastAPI(lifespan=lifespan)
+
+# Added before CORS so rejections still carry the CORS headers.
+app.add_middleware(
+    AdmissionMiddleware,
+    paths=["/ask", "/ask/stream"],
+    limiter=ask_limiter,
+    rate_limiter=rate_limiter,
+    client_header=settings.RATE_LIMIT_CLIENT_HEADER,
+)
 
 origins = [o.strip() for o in settings.ALLOWED_ORIGINS.split(",") if o.strip()]
 app.add_middleware(
@@ -16,16 +170,127 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Track in-flight requests and latency; add ``Server-Timing`` when enabled.
+
+    For streamed responses the latency is the time until the headers are sent.
+    """
+    start = time.perf_counter()
+    status = 500
+    with metrics.HTTP_IN_FLIGHT.track_in_progress(), metrics.request_timings() as timings:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            elapsed = time.perf_counter() - start
+            endpoint = request.scope.get("endpoint")
+            metrics.HTTP_SECONDS.observe(
+                elapsed,
+                handler=getattr(endpoint, "__name__", "unmatched"),
+                status=str(status),
+            )
+    if settings.METRICS_TIMING_HEADER:
+        response.headers["Server-Timing"] = metrics.server_timing([*timings, ("total", elapsed)])
+    return response
+
+
+@app.exception_handler(Overloaded)
+async def shed_load(request: Request, exc: Overloaded) -> Response:
+    """Answer work shed by a saturated dependency with 503 and ``Retry-After``."""
+    return overloaded_response(exc)
+
+
 @app.get("/")
 def read_root() -> dict[str, str]:
     """Health check endpoint."""
     return {"status": "Backend running"}
 
 
+def resolve_session_id(session_id: Optional[str]) -> str:
+    """Return ``session_id``, or a new one when the client sent none.
+
+    Clients continue the conversation by sending back the id returned with
+    the answer, so anonymous clients never share one history.  A blank id is
+    rejected with 422.
+    """
+    if session_id is None:
+        return uuid.uuid4().hex
+    if not session_id.strip():
+        raise HTTPException(status_code=422, detail="session_id must not be blank")
+    return session_id
+
+
 @app.post("/ask")
 async def ask_question(request: dict[str, str]) -> dict[str, str]:
     """Run the orchestrator with the provided question."""
     question = request.get("question", "")
+    session_id = resolve_session_id(request.get("session_id"))
+    orchestrator = Orchestrator()
+    answer = await orchestrator.run(question, session_id=session_id)
+    return {"answer": answer, "session_id": session_id}
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: dict[str, str]) -> StreamingResponse:
+    """Stream orchestrator progress and answer tokens as Server-Sent Events.
+
+    The first event carries the conversation's ``session_id``.
+    """
+    question = request.get("question", "")
+    session_id = resolve_session_id(request.get("session_id"))
     orchestrator = Orchestrator()
-    answer = await orchestrator.run(question)
-    return {"answer": answer}
+
+    async def events() -> AsyncIterator[str]:
+        payload = json.dumps({"event": "session", "session_id": session_id})
+        yield f"event: session\ndata: {payload}\n\n"
+        try:
+            async for event in orchestrator.run_stream(question, session_id=session_id):
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as exc:  # surface failures to the client mid-stream
+            payload = json.dumps({"event": "error", "detail": str(exc)})
+            yield f"event: error\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/sessions/{session_id}/messages")
+async def session_messages(
+    session_id: str,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+    authorization: Optional[str] = Header(None),
+) -> dict[str, Any]:
+    """Return a page of a session's stored messages, oldest first.
+
+    Pass ``next_cursor`` from the response as ``cursor`` to get the next page.
+    Session ids are not secrets, so the route needs the
+    ``SESSION_HISTORY_API_KEY`` bearer token and is not served without one.
+    """
+    key = settings.SESSION_HISTORY_API_KEY
+    if not key:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), key.encode()):
+        raise HTTPException(
+            status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"}
+        )
+    resolve_session_id(session_id)
+    page = await Orchestrator().history(session_id, cursor, max(1, min(limit, 200)))
+    return {"messages": page.messages, "next_cursor": page.next_cursor}
+
+
+@app.get("/metrics")
+async def read_metrics() -> Response:
+    """Expose service metrics in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(
+        metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import json
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
 class ShortTermMemory:
@@ -22,30 +24,196 @@ class ShortTermMemory:
         return list(self.messages)
 
 
+class ShortTermSessions:
+    """Bounded LRU of per-session :class:`ShortTermMemory` objects.
+
+    The least recently used session is dropped once ``max_sessions`` are
+    held; its history is still in long-term memory.
+    """
+
+    def __init__(self, max_sessions: int = 1000, limit: int = 5) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.limit = limit
+        self._sessions: "OrderedDict[str, ShortTermMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> ShortTermMemory:
+        """Return the memory of ``session_id``, creating it if needed."""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = self._sessions[session_id] = ShortTermMemory(self.limit)
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return memory
+
+
 class LongTermMemory:
-    """Simple file-based memory for persisting conversations."""
+    """File-based memory persisting conversations as append-only JSON Lines.
+
+    Messages are appended to numbered segment files next to ``path``
+    (``long_term.00000001.jsonl``, ...); a new segment is started once the
+    current one reaches ``segment_bytes``, and the sealed segments are merged
+    by :meth:`compact` once there are more than ``max_segments`` of them.
+    Nothing is read at startup: :meth:`iter_messages` streams the segments on
+    demand.  A JSON file left at ``path`` by earlier versions is migrated on
+    open.
+    """
 
-    def __init__(self, path: Path) -> None:
+    def __init__(
+        self, path: Path, segment_bytes: int = 4 * 1024 * 1024, max_segments: int = 8
+    ) -> None:
         self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(1, max_segments)
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self._messages: List[Dict[str, str]] = []
-        self._load()
+        self._lock = threading.Lock()
+        self._fh: Optional[IO[str]] = None
+        self._size = 0
+        self._migrate()
+        self._drop_compacted()
+        segments = self._segments()
+        if segments:
+            (first, last), seg = segments[-1]
+            self._repair(seg)
+            # Only a plain, unfilled segment is appended to again.
+            reuse = first == last and first > 0 and seg.stat().st_size < segment_bytes
+            self._active = last if reuse else last + 1
+        else:
+            self._active = 1
+
+    # ------------------------------------------------------------------
+    # Segments
+
+    def _segment_path(self, first: int, last: Optional[int] = None) -> Path:
+        span = f"{first:08d}" if last in (None, first) else f"{first:08d}-{last:08d}"
+        return self.path.with_name(f"{self.path.stem}.{span}.jsonl")
 
-    def _load(self) -> None:
-        if self.path.exists():
+    def _segments(self) -> List[Tuple[Tuple[int, int], Path]]:
+        """Return ``((first, last), path)`` of every segment, oldest first."""
+        segments = []
+        for seg in self.path.parent.glob(f"{self.path.stem}.*.jsonl"):
+            first, _, last = seg.name[len(self.path.stem) + 1 : -len(".jsonl")].partition("-")
+            if first.isdigit() and (not last or last.isdigit()):
+                segments.append(((int(first), int(last or first)), seg))
+        return sorted(segments)
+
+    def _drop_compacted(self) -> None:
+        # A compaction interrupted before deleting its inputs leaves segments
+        # covered by the merged one.
+        spans = [span for span, _ in self._segments()]
+        for (first, last), seg in self._segments():
+            if any(f <= first and last <= l and (f, l) != (first, last) for f, l in spans):
+                seg.unlink()
+
+    @staticmethod
+    def _repair(seg: Path) -> None:
+        """Cut a line left half-written by a crash off the end of ``seg``."""
+        size = seg.stat().st_size
+        with seg.open("rb+") as fh:
+            start = max(0, size - 64 * 1024)
+            fh.seek(start)
+            tail = fh.read()
+            if tail and not tail.endswith(b"\n"):
+                fh.truncate(start + tail.rfind(b"\n") + 1)
+
+    def _migrate(self) -> None:
+        """Move the messages of a legacy JSON array file into segment 0."""
+        if not self.path.exists():
+            return
+        # The migrated segment is written before the legacy file is renamed,
+        # so a crash in between cannot lose or duplicate messages.
+        target = self._segment_path(0)
+        if not target.exists():
             try:
                 with self.path.open("r", encoding="utf-8") as fh:
-                    self._messages = json.load(fh)
-            except Exception:
-                self._messages = []
+                    messages = json.load(fh)
+            except (OSError, ValueError) as exc:
+                print(f"Failed to migrate {self.path}: {exc}")
+                return
+            self._write_segment(target, messages)
+        self.path.replace(self.path.with_name(self.path.name + ".migrated"))
+
+    @staticmethod
+    def _write_segment(target: Path, messages: Iterable[Dict[str, str]]) -> None:
+        tmp = target.with_name(target.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            for message in messages:
+                fh.write(json.dumps(message) + "\n")
+        tmp.replace(target)
+
+    @staticmethod
+    def _read_segment(seg: Path) -> Iterator[Dict[str, str]]:
+        try:
+            fh = seg.open("r", encoding="utf-8")
+        except FileNotFoundError:
+            # Merged away by a concurrent compaction.
+            return
+        with fh:
+            for line in fh:
+                if not line.endswith("\n"):
+                    # Still being written.
+                    return
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
 
-    def _save(self) -> None:
-        with self.path.open("w", encoding="utf-8") as fh:
-            json.dump(self._messages, fh, indent=2)
+    # ------------------------------------------------------------------
+    # Public API
 
     def add(self, role: str, content: str) -> None:
-        self._messages.append({"role": role, "content": content})
-        self._save()
+        """Append a message; only the new line is written."""
+        line = json.dumps({"role": role, "content": content}) + "\n"
+        with self._lock:
+            if self._fh is None:
+                seg = self._segment_path(self._active)
+                self._fh = seg.open("a", encoding="utf-8")
+                self._size = seg.stat().st_size
+            self._fh.write(line)
+            self._fh.flush()
+            self._size += len(line.encode("utf-8"))
+            if self._size >= self.segment_bytes:
+                self._fh.close()
+                self._fh = None
+                self._active += 1
+                if len(self._segments()) > self.max_segments:
+                    self._compact()
+
+    def iter_messages(self) -> Iterator[Dict[str, str]]:
+        """Yield every message, oldest first, reading one line at a time."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+            segments = [seg for _, seg in self._segments()]
+        for seg in segments:
+            yield from self._read_segment(seg)
 
     def all_messages(self) -> List[Dict[str, str]]:
-        return list(self._messages)
+        return list(self.iter_messages())
+
+    def compact(self) -> None:
+        """Merge the sealed segments into one, dropping unreadable lines."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        sealed = [(span, seg) for span, seg in self._segments() if span[1] < self._active]
+        if len(sealed) < 2:
+            return
+        first, last = sealed[0][0][0], sealed[-1][0][1]
+        messages = (m for _, seg in sealed for m in self._read_segment(seg))
+        self._write_segment(self._segment_path(first, last), messages)
+        for _, seg in sealed:
+            seg.unlink()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
@@ -0,0 +1,369 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms live on :data:`REGISTRY` and are updated on
+the hot path under a lock per metric; collectors registered with
+:meth:`Registry.add_collector` contribute values read at scrape time.
+``/metrics`` returns :meth:`Registry.render`.
+
+Stage durations of the request being served are also gathered by
+:func:`request_timings` for the optional ``Server-Timing`` response header.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name!r} takes labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_in_progress(self, **labels: str) -> Iterator[None]:
+        """Count the enclosed block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative ``le`` buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last one is +Inf), sum, count.
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next((i for i, b in enumerate(self.buckets) if value <= b), len(self.buckets))
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the enclosed block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+        return sum(counts)
+
+    def sum(self, **labels: str) -> float:
+        _, total = self._values.get(self._key(labels), ([0], [0.0]))
+        return total[0]
+
+    def samples(self) -> List[Sample]:
+        samples: List[Sample] = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    samples.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total[0]))
+                samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+Collector = Callable[[], Iterable[_Metric]]
+
+
+class Registry:
+    """Named metrics plus scrape-time collectors."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name!r} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+    def add_collector(self, collector: Collector) -> None:
+        """Add a callable returning metrics built afresh on every scrape."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                metrics.extend(collector())
+            except Exception as exc:  # a broken collector must not break scrapes
+                print(f"Metrics collector failed: {exc}")
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(
+            name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        for name, value in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def stats_collector(prefix: str, stats: Callable[[], Dict[str, Dict[str, float]]]) -> Collector:
+    """Expose a nested ``stats()`` dict as ``{prefix}_{section}_{key}`` gauges."""
+
+    def collect() -> Iterator[_Metric]:
+        for section, values in stats().items():
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    gauge = Gauge(f"{prefix}_{section}_{key}", f"{section} {key}")
+                    gauge.set(float(value))
+                    yield gauge
+
+    return collect
+
+
+# ----------------------------------------------------------------------
+# Per-request timings
+
+_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def request_timings() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the ``(name, seconds)`` recorded while serving one request."""
+    timings: List[Tuple[str, float]] = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Add a timing to the current request, if it is collecting them."""
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def server_timing(timings: Iterable[Tuple[str, float]]) -> str:
+    """Format timings as a ``Server-Timing`` header value (milliseconds)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings)
+
+
+# ----------------------------------------------------------------------
+# Metrics of the service
+
+REGISTRY = Registry()
+
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests being served")
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("handler", "status")
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "orchestrator_stage_seconds", "Duration of each orchestration stage", ("stage",)
+)
+STAGE_SAVED_SECONDS = REGISTRY.histogram(
+    "orchestrator_stage_overlap_seconds",
+    "Stage time per request hidden by running independent stages concurrently",
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total",
+    "Requests and Bedrock calls shed by admission control",
+    ("limiter", "reason"),
+)
+LLM_IN_FLIGHT = REGISTRY.gauge("llm_requests_in_flight", "Bedrock calls awaiting a response")
+LLM_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Bedrock call latency", ("operation",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens reported by Bedrock", ("kind",)
+)
+ABACUS_SECONDS = REGISTRY.histogram(
+    "abacus_request_duration_seconds",
+    "Time until ABACUS returns response headers for a page",
+    ("endpoint",),
+)
+ABACUS_RECORDS = REGISTRY.counter(
+    "abacus_records_total", "Records parsed from ABACUS responses", ("endpoint",)
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "upstream_retries_total", "Retried Bedrock and ABACUS calls", ("upstream",)
+)
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "upstream_hedged_requests_total",
+    "Duplicate calls sent after the hedging delay, and those that won",
+    ("upstream", "outcome"),
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "circuit_breaker_state", "Circuit state: 0 closed, 1 half-open, 2 open", ("upstream",)
+)
+CIRCUIT_REJECTED = REGISTRY.counter(
+    "circuit_breaker_rejected_total", "Calls failed fast by an open circuit", ("upstream",)
+)
+DEGRADED_ANSWERS = REGISTRY.counter(
+    "orchestrator_degraded_answers_total",
+    "Answers served without Bedrock while it was unavailable",
+    ("source",),
+)
+MEMORY_FLUSH_SECONDS = REGISTRY.histogram(
+    "sqlite_memory_flush_seconds", "Duration of each write-behind SQLite transaction"
+)
+MEMORY_ROWS = REGISTRY.counter(
+    "sqlite_memory_rows_total", "Conversation messages committed to SQLite"
+)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    """Record an orchestration stage in its histogram and the request timings."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    record_timing(name, seconds)
+
+
+@contextmanager
+def stage_timer(name: str) -> Iterator[None]:
+    """Time the enclosed block as orchestration stage ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
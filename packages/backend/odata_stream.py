@@ -0,0 +1,118 @@
+"""Incremental parsing of OData JSON responses."""
+
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+_WHITESPACE = " \t\n\r"
+
+
+class ODataStream:
+    """Parse an OData response body chunk by chunk.
+
+    :meth:`records` yields the elements of the ``value`` array (or of a
+    top-level array) as soon as each one is complete, so a large page is
+    never held in memory as a whole.  The other top-level properties, such
+    as ``@odata.nextLink`` and ``@odata.count``, are collected in
+    :attr:`meta`; a response without a ``value`` array ends up entirely in
+    :attr:`meta`.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.meta: Dict[str, Any] = {}
+        self.has_value = False
+
+    # ------------------------------------------------------------------
+    # Buffer handling
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer; return ``False`` at EOF."""
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            self._buf += self._utf8.decode(b"", final=True)
+            return False
+        # Drop consumed text so the buffer stays about one element long.
+        self._buf = self._buf[self._pos :] + self._utf8.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of OData response")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} in OData response at offset {self._pos}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """Decode the next complete JSON value, reading more input as needed."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number (or literal) at the end of the buffer may continue in
+            # the next chunk; only accept it once something follows.
+            if end < len(self._buf) or not self._fill():
+                self._pos = end
+                return value
+
+    # ------------------------------------------------------------------
+    # Public API
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Yield the records of the response one at a time."""
+        if self._peek() == "[":
+            self.has_value = True
+            yield from self._array()
+            return
+        self._expect("{")
+        while True:
+            char = self._peek()
+            if char == "}":
+                self._pos += 1
+                return
+            if char == ",":
+                self._pos += 1
+                continue
+            key = self._value()
+            self._expect(":")
+            if key == "value" and self._peek() == "[":
+                self.has_value = True
+                yield from self._array()
+            else:
+                self.meta[key] = self._value()
+
+    def _array(self) -> Iterator[Any]:
+        self._expect("[")
+        while True:
+            char = self._peek()
+            if char == "]":
+                self._pos += 1
+                return
+            if char == ",":
+                self._pos += 1
+                continue
+            yield self._value()
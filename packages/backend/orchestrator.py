@@ -4,20 +4,46 @@ from __future__ import annotations
 
 import asyncio
 import json
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 from abacus_client import AbacusClient
+from admission import ConcurrencyLimiter, Overloaded
 from bedrock_adapter import BedrockAdapter
+import catalog_sync
+from catalog import Application, Capability, Catalog, LazyCatalog, application_postings
+from embedder import Embedder, load_embedder
+from embedding_cache import EmbeddingCache, open_cache
+from embedding_batcher import EmbeddingBatcher
+from llm_memo import LLMMemo, memo_key
+import metrics
 from prompt_library import get_prompt
-from memory import ShortTermMemory
-from sqlite_memory import SQLiteMemory
+from resilience import UpstreamUnavailable
+from memory import ShortTermSessions
+from response_cache import ResponseCache, catalog_fingerprint, normalize_query
+from singleflight import SingleFlight
+from stage_graph import StageGraph, StageStats
+import vector_index
+from sqlite_memory import MessagePage, RecalledTurn, SQLiteMemory
 from env import settings
 
 
+PIPELINE_MODES = ("full", "merged", "direct")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimate the token count of ``text`` (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _ratio(part: float, whole: float) -> float:
+    return part / whole if whole else 0.0
+
+
 # System prompt used to instruct the language model on the format of the
 # search request object it must return.  The model should respond with a JSON
 # object containing a single ``query`` field whose value is a short string of
@@ -33,12 +59,32 @@ class Orchestrator:
     _instance: Optional["Orchestrator"] = None
     _initialized = False
 
-    _vector_model: Optional[SentenceTransformer] = None
-    _index: Optional[faiss.Index] = None
-    _entries: List[Dict[str, str]] = []
-    _capabilities: List[Dict[str, str]] = []
-    _applications: List[Dict[str, str]] = []
-    _cap_index_map: Dict[int, str] = {}
+    _vector_model: Optional[Embedder] = None
+    _capability_index: Optional[faiss.Index] = None
+    _application_index: Optional[faiss.Index] = None
+    _catalog: Optional[Catalog] = None
+    # ``catalog_sync`` generation of the stores loaded in this process.
+    _catalog_generation = 0
+    # Seconds replaced record stores stay open for requests still using them.
+    catalog_retire_delay = 60.0
+    _embedding_batcher: Optional[EmbeddingBatcher] = None
+    _embedding_cache: Optional[EmbeddingCache] = None
+    _response_cache: Optional[ResponseCache] = None
+    _llm_memo: Optional[LLMMemo] = None
+    _long_memory: Optional[SQLiteMemory] = None
+    # Recent turns per session, shared by every instance.
+    _short_memories = ShortTermSessions(settings.SHORT_TERM_MAX_SESSIONS)
+    # Shared by every instance so concurrent identical questions coalesce.
+    _single_flight: SingleFlight[Tuple[str, str]] = SingleFlight()
+    _stage_stats = StageStats()
+    # Caps Bedrock calls across requests so a slow model sheds load quickly
+    # instead of letting every request time out together.
+    _llm_slots = ConcurrencyLimiter(
+        settings.LLM_MAX_OUTSTANDING,
+        settings.LLM_QUEUE_SIZE,
+        settings.LLM_QUEUE_TIMEOUT,
+        name="llm_calls",
+    )
 
     def __new__(cls) -> "Orchestrator":
         if cls._instance is None:
@@ -46,228 +92,909 @@ class Orchestrator:
         return cls._instance
 
     def __init__(self) -> None:
+        if settings.PIPELINE_MODE not in PIPELINE_MODES:
+            raise ValueError(
+                f"Unknown PIPELINE_MODE {settings.PIPELINE_MODE!r}; "
+                f"expected one of {', '.join(PIPELINE_MODES)}"
+            )
+        self.pipeline_mode = settings.PIPELINE_MODE
+        self.short_query_words = settings.PIPELINE_SHORT_QUERY_WORDS
+        self.candidate_top_n = settings.APP_CANDIDATE_TOP_N
+        self.ranker_token_budget = settings.RANKER_PROMPT_TOKEN_BUDGET
+        self.recall_top_k = settings.RECALL_TOP_K
+        self.recall_min_score = settings.RECALL_MIN_SCORE
+        self.recall_token_budget = settings.RECALL_TOKEN_BUDGET
+        self.recall_follow_up_score = settings.RECALL_FOLLOW_UP_SCORE
+        self.recall_max_candidates = settings.RECALL_MAX_CANDIDATES
+        self.degraded_cache_threshold = settings.DEGRADED_CACHE_THRESHOLD
+
         if self.__class__._initialized:
             # Share the already-loaded resources with the new instance
             self.client = AbacusClient()
             self.adapter = BedrockAdapter()
-            self.short_memory = ShortTermMemory()
-            self.long_memory = SQLiteMemory(Path(settings.LONG_TERM_PATH))
+            self.short_memories = self.__class__._short_memories
+            self.long_memory = self.__class__._long_memory
             self._vector_model = self.__class__._vector_model
-            self.index = self.__class__._index
-            self.entries = self.__class__._entries
-            self.capabilities = self.__class__._capabilities
-            self.applications = self.__class__._applications
-            self._cap_index_map = self.__class__._cap_index_map
+            self.capability_index = self.__class__._capability_index
+            self.application_index = self.__class__._application_index
+            self.catalog = self.__class__._catalog
+            self.embedding_batcher = self.__class__._embedding_batcher
+            self.embedding_cache = self.__class__._embedding_cache
+            self.response_cache = self.__class__._response_cache
+            self.llm_memo = self.__class__._llm_memo
             return
 
         self.client = AbacusClient()
         self.adapter = BedrockAdapter()
-        self.short_memory = ShortTermMemory()
-        self.long_memory = SQLiteMemory(Path(settings.LONG_TERM_PATH))
+        self.short_memories = self.__class__._short_memories
+        if self.__class__._long_memory is None:
+            # One connection and write-behind worker shared by every request.
+            self.__class__._long_memory = SQLiteMemory(
+                Path(settings.LONG_TERM_PATH),
+                flush_interval=settings.LONG_TERM_FLUSH_INTERVAL_MS / 1000.0,
+                max_queue=settings.LONG_TERM_QUEUE_SIZE,
+                synchronous=settings.LONG_TERM_SYNCHRONOUS,
+            )
+        self.long_memory = self.__class__._long_memory
 
         if self.__class__._vector_model is None:
-            self.__class__._vector_model = SentenceTransformer("all-MiniLM-L6-v2")
+            self.__class__._vector_model = load_embedder()
         self._vector_model = self.__class__._vector_model
-
-        vector_dir = Path(__file__).with_name("vector_store")
-        index_path = vector_dir / "index.faiss"
-        meta_path = vector_dir / "metadata.json"
-
-        index_loaded = False
-        if index_path.exists() and meta_path.exists():
+        if settings.EMBED_BATCHING and self.__class__._embedding_batcher is None:
+            self.__class__._embedding_batcher = EmbeddingBatcher(
+                self._encode,
+                max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBED_BATCH_MAX_WAIT_MS,
+            )
+        self.embedding_batcher = self.__class__._embedding_batcher
+        if self.__class__._embedding_cache is None:
+            self.__class__._embedding_cache = open_cache()
+        self.embedding_cache = self.__class__._embedding_cache
+
+        vector_dir = vector_index.VECTOR_DIR
+        store_files = vector_index.catalog_store_files(vector_dir)
+
+        stores_loaded = False
+        self.__class__._catalog_generation = catalog_sync.generation(vector_dir)
+        if all(path.exists() for path in store_files):
             try:
-                if self.__class__._index is None:
-                    self.__class__._index = faiss.read_index(str(index_path))
-                    with meta_path.open("r", encoding="utf-8") as fh:
-                        entries = json.load(fh)
-                        if not isinstance(entries, list):
-                            entries = []
-                    self.__class__._entries = entries
-                    self.__class__._capabilities = [e for e in entries if "category" in e]
-                    self.__class__._applications = [e for e in entries if "technologies" in e]
-                    self.__class__._cap_index_map = {
-                        i: entries[i].get("id", "")
-                        for i, e in enumerate(entries)
-                        if "category" in e
-                    }
-                self.index = self.__class__._index
-                self.entries = self.__class__._entries
-                self.capabilities = self.__class__._capabilities
-                self.applications = self.__class__._applications
-                self._cap_index_map = self.__class__._cap_index_map
-                index_loaded = True
+                capability_index, capabilities = vector_index.read_store(
+                    vector_index.CAPABILITY_STORE, vector_dir
+                )
+                application_index, applications = vector_index.read_store(
+                    vector_index.APPLICATION_STORE, vector_dir
+                )
+                catalog = LazyCatalog(capabilities, applications)
+                stores_loaded = True
             except Exception as exc:  # pragma: no cover - start-up fallback
                 print(f"Failed to load vector store: {exc}. Rebuilding index.")
 
-        if not index_loaded:
-            # Fallback: fetch data and build the index, persisting it for later use.
-            self.capabilities = self.client.query_data("capabilities")
-            self.applications = self.client.query_data("applications")
-            texts = [
-                e.get("description", "")
-                for e in self.capabilities + self.applications
+        if not stores_loaded:
+            legacy_meta = vector_dir / "metadata.json"
+            legacy_stores = [
+                vector_dir / f"{name}.json"
+                for name in (vector_index.CAPABILITY_STORE, vector_index.APPLICATION_STORE)
             ]
-            if not texts:
+            if all(path.exists() for path in legacy_stores):
+                # Migrate JSON metadata written by older releases to record stores.
+                capabilities, applications = [
+                    json.loads(path.read_text(encoding="utf-8")) for path in legacy_stores
+                ]
+            elif legacy_meta.exists():
+                # Split the catalog of the old combined index without refetching it.
+                with legacy_meta.open("r", encoding="utf-8") as fh:
+                    entries = json.load(fh)
+                capabilities = [e for e in entries if "category" in e]
+                applications = [e for e in entries if "technologies" in e]
+            else:
+                # Fallback: fetch data and build the indexes, persisting them for later use.
+                capabilities = self.client.query_data("capabilities")
+                applications = self.client.query_data("applications")
+            if not capabilities and not applications:
                 raise RuntimeError(
                     "No catalog data available to build vector store."
                 )
-            embeddings = self._vector_model.encode(texts, convert_to_numpy=True)
-            embeddings = embeddings.astype("float32")
-            self.index = faiss.IndexFlatL2(embeddings.shape[1])
-            if len(embeddings):
-                self.index.add(embeddings)
-            self.entries = self.capabilities + self.applications
-            self._cap_index_map = {
-                i: self.capabilities[i].get("id", "")
-                for i in range(len(self.capabilities))
-            }
-            vector_dir.mkdir(exist_ok=True)
-            faiss.write_index(self.index, str(index_path))
-            with meta_path.open("w", encoding="utf-8") as fh:
-                json.dump(self.entries, fh, indent=2)
-
-            self.__class__._index = self.index
-            self.__class__._entries = self.entries
-            self.__class__._capabilities = self.capabilities
-            self.__class__._applications = self.applications
-        self.__class__._cap_index_map = self._cap_index_map
+            catalog = Catalog(capabilities, applications)
+            capability_index, _ = self._build_capability_index(catalog.capabilities)
+            application_index, _ = self._build_application_index(catalog.applications)
+            vector_index.write_store(
+                vector_index.CAPABILITY_STORE, capability_index, capabilities, vector_dir
+            )
+            vector_index.write_store(
+                vector_index.APPLICATION_STORE,
+                application_index,
+                applications,
+                vector_dir,
+                postings=application_postings(catalog.applications),
+            )
+
+        self.capability_index = capability_index
+        self.application_index = application_index
+        self.catalog = catalog
+        self.__class__._capability_index = capability_index
+        self.__class__._application_index = application_index
+        self.__class__._catalog = catalog
+
+        if settings.RESPONSE_CACHE_ENABLED and self.__class__._response_cache is None:
+            # The fingerprint changes whenever the index files are rewritten, so
+            # answers cached against an older catalog are dropped on load.
+            self.__class__._response_cache = ResponseCache(
+                vector_dir,
+                threshold=settings.RESPONSE_CACHE_THRESHOLD,
+                ttl=settings.RESPONSE_CACHE_TTL,
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                fingerprint=catalog_fingerprint(store_files),
+            )
+        self.response_cache = self.__class__._response_cache
+
+        if settings.LLM_MEMO_ENABLED and self.__class__._llm_memo is None:
+            self.__class__._llm_memo = LLMMemo(
+                max_entries=settings.LLM_MEMO_MAX_ENTRIES,
+                db_path=(
+                    Path(settings.LONG_TERM_PATH) if settings.LLM_MEMO_SQLITE else None
+                ),
+                ttl=settings.LLM_MEMO_TTL,
+                max_rows=settings.LLM_MEMO_SQLITE_MAX_ENTRIES,
+            )
+        self.llm_memo = self.__class__._llm_memo
 
         self.__class__._initialized = True
 
+    def warm_up(self) -> int:
+        """Page in the vector stores and run the embedder once before serving.
+
+        Returns the number of store bytes read.  Called from the FastAPI
+        lifespan so the first request does not pay for cold caches.
+        """
+        size = vector_index.warm_files(vector_index.catalog_store_files())
+        self._encode(["warm up"])
+        return size
+
+    async def sync_catalog(self, min_interval: float = 0.0) -> Dict[str, Dict[str, int]]:
+        """Apply ABACUS catalog changes and swap in the updated stores.
+
+        Only new or changed descriptions are re-embedded (see
+        ``catalog_sync``).  The work runs on a worker thread; the indexes and
+        catalog are then swapped in one step on the event loop.  Unchanged
+        records keep their vector ids, so a request that straddles the swap
+        still resolves its search results correctly.  If another worker
+        process synced within ``min_interval`` seconds, its stores are
+        picked up instead of querying ABACUS again.
+        """
+        cls = self.__class__
+        results = await asyncio.to_thread(
+            catalog_sync.sync_catalog,
+            self.client,
+            self._encode_catalog,
+            min_interval=min_interval,
+            loaded_generation=cls._catalog_generation,
+        )
+        if any(result.changed for result in results.values()):
+            capabilities = results[vector_index.CAPABILITY_STORE]
+            applications = results[vector_index.APPLICATION_STORE]
+            current = self.catalog if isinstance(self.catalog, LazyCatalog) else None
+            if current is None:
+                # The catalog was built in memory: open the unchanged store too.
+                for name, result in results.items():
+                    if result.records is None:
+                        result.index, result.records = vector_index.read_store(
+                            name, vector_index.VECTOR_DIR
+                        )
+            else:
+                # Keep the open index and records of an unchanged store.
+                if capabilities.records is None:
+                    capabilities.index = self.capability_index
+                    capabilities.records = current.capability_store
+                if applications.records is None:
+                    applications.index = self.application_index
+                    applications.records = current.application_store
+            capability_records = capabilities.records
+            application_records = applications.records
+            self._swap_catalog(
+                capabilities.index,
+                applications.index,
+                LazyCatalog(capability_records, application_records),
+            )
+            if current is not None:
+                # Requests that started before the swap may still read the old stores.
+                asyncio.get_running_loop().call_later(
+                    self.catalog_retire_delay,
+                    current.close,
+                    (capability_records, application_records),
+                )
+        cls._catalog_generation = max(
+            (result.generation for result in results.values()), default=cls._catalog_generation
+        )
+        return {name: result.stats for name, result in results.items()}
+
+    def _swap_catalog(
+        self, capability_index: faiss.Index, application_index: faiss.Index, catalog: Catalog
+    ) -> None:
+        cls = self.__class__
+        cls._capability_index = self.capability_index = capability_index
+        cls._application_index = self.application_index = application_index
+        cls._catalog = self.catalog = catalog
+        if self.response_cache is not None:
+            # Cached answers may cite applications that changed or are gone.
+            self.response_cache.invalidate(
+                catalog_fingerprint(vector_index.catalog_store_files())
+            )
+
     # ------------------------------------------------------------------
     # Low-level LLM helper
 
-    async def _call_llm(self, system_prompt: str, user_prompt: str) -> str:
-        """Send formatted messages to the Bedrock adapter."""
+    async def _call_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        memoize: bool = False,
+    ) -> str:
+        """Send formatted messages to the Bedrock adapter.
+
+        Responses are memoized in ``self.llm_memo`` when sampling is
+        deterministic (``temperature <= 0``) or the caller opts in with
+        ``memoize=True`` for prompts that are pure functions of their input.
+        Calls beyond ``LLM_MAX_OUTSTANDING`` wait briefly for a slot and raise
+        ``admission.Overloaded`` when none frees up.
+        """
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
-        loop = asyncio.get_running_loop()
-        data = await loop.run_in_executor(
-            None, lambda: self.adapter.create(self.adapter.model_id, messages)
-        )
+        model = self.adapter.model_id
+        temperature = temperature if temperature is not None else self.adapter.temperature
+        max_tokens = max_tokens if max_tokens is not None else self.adapter.max_tokens
+
+        key = None
+        if self.llm_memo is not None and (temperature <= 0 or memoize):
+            key = memo_key(model, system_prompt, messages, temperature, max_tokens)
+            cached = await self.llm_memo.aget(key)
+            if cached is not None:
+                return cached
+
+        async with self._llm_slots.slot():
+            data = await self.adapter.acreate(
+                model, messages, max_tokens=max_tokens, temperature=temperature
+            )
         try:
-            return data["choices"][0]["message"]["content"]
+            content = data["choices"][0]["message"]["content"]
         except (KeyError, IndexError) as exc:
             raise RuntimeError("Unexpected response structure from Bedrock API") from exc
+        if key is not None:
+            self.llm_memo.put(key, content)
+        return content
+
+    async def _stream_llm(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """Stream completion tokens for the formatted messages."""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        async with self._llm_slots.slot():
+            async for token in self.adapter.astream(self.adapter.model_id, messages):
+                yield token
 
     def _build_capability_index(
-        self, capabilities: List[Dict[str, str]]
+        self, capabilities: List[Capability]
     ) -> Tuple[faiss.Index, List[str]]:
         """Build a FAISS index from capability descriptions."""
-        texts = [c.get("description", "") for c in capabilities]
-        embeddings = self._vector_model.encode(texts, convert_to_numpy=True)
-        embeddings = embeddings.astype("float32")
-        index = faiss.IndexFlatL2(embeddings.shape[1])
-        if len(embeddings):
-            index.add(embeddings)
-        id_map = [c.get("id", "") for c in capabilities]
+        texts = [c.description for c in capabilities]
+        index = vector_index.build_index(
+            self._encode_catalog(texts), ids=np.arange(len(texts))
+        )
+        id_map = [c.id for c in capabilities]
         return index, id_map
 
     # ------------------------------------------------------------------
     # Application catalog utilities
 
     def _build_application_index(
-        self, applications: List[Dict[str, str]]
+        self, applications: List[Application]
     ) -> Tuple[faiss.Index, List[str]]:
         """Create a FAISS index from application descriptions."""
-        texts = [a.get("description", "") for a in applications]
-        embeddings = self._vector_model.encode(texts, convert_to_numpy=True)
-        embeddings = embeddings.astype("float32")
-        index = faiss.IndexFlatL2(embeddings.shape[1])
-        if len(embeddings):
-            index.add(embeddings)
-        id_map = [a.get("id", "") for a in applications]
+        texts = [a.description for a in applications]
+        index = vector_index.build_index(
+            self._encode_catalog(texts), ids=np.arange(len(texts))
+        )
+        id_map = [a.id for a in applications]
         return index, id_map
 
-    async def run(self, query: str) -> str:
-        """Run the recommendation workflow for a user ``query``."""
-        self.short_memory.add("user", query)
-        capability_id = await self.recommend_capability(query)
-        applications = await self.recommend_applications(capability_id, query)
-        draft = await self.generate_response(applications, query)
-        final = await self._review_answer(draft)
-        self.short_memory.add("assistant", final)
-        self.long_memory.add("user", query)
-        self.long_memory.add("assistant", final)
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Embed ``texts`` with the sentence model as a float32 matrix."""
+        if not texts:
+            # Keep the embedding width so empty catalogs still get a valid index.
+            return self._encode([""])[:0]
+        embeddings = self._vector_model.encode(texts, convert_to_numpy=True)
+        return embeddings.astype("float32")
+
+    def _encode_catalog(self, texts: List[str]) -> np.ndarray:
+        """Embed catalog descriptions, reusing vectors from the embedding cache."""
+        if self.embedding_cache is None:
+            return self._encode(texts)
+        return self.embedding_cache.encode(texts, self._encode)
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Embed a single query without blocking the event loop."""
+        if self.embedding_batcher is not None:
+            return await self.embedding_batcher.encode(text)
+        return await asyncio.to_thread(self._encode, [text])
+
+    async def _cached_answer(
+        self, query: str, embedding: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """Look ``query`` up in the response cache.
+
+        Returns the cached answer (or ``None``) and the raw query embedding
+        (``embedding`` if given, otherwise computed for the semantic lookup)
+        so later stages can reuse it.
+        """
+        if self.response_cache is None:
+            return None, embedding
+        with metrics.stage_timer("cache"):
+            answer = self.response_cache.get_exact(query)
+            if answer is not None:
+                return answer, embedding
+            if embedding is None:
+                embedding = await self._embed(query)
+            return self.response_cache.get_semantic(embedding), embedding
+
+    def _store_answer(
+        self, query: str, embedding: Optional[np.ndarray], answer: str
+    ) -> None:
+        if self.response_cache is not None and embedding is not None:
+            self.response_cache.put(query, embedding, answer)
+
+    async def _recall(
+        self, query: str, session_id: str
+    ) -> Tuple[List[RecalledTurn], Optional[np.ndarray]]:
+        """Return earlier turns of ``session_id`` relevant to ``query``.
+
+        Also returns the query embedding used for the search.  The turns are
+        limited to ``recall_token_budget``, dropping the least similar first.
+        """
+        if not session_id or self.recall_top_k <= 0:
+            return [], None
+        with metrics.stage_timer("recall"):
+            embedding = await self._embed(query)
+            turns = await asyncio.to_thread(
+                self.long_memory.recall,
+                session_id,
+                embedding,
+                self.recall_top_k,
+                min_score=self.recall_min_score,
+                max_candidates=self.recall_max_candidates,
+            )
+        budget = self.recall_token_budget
+        kept = set()
+        for turn in sorted(turns, key=lambda t: t.score, reverse=True):
+            cost = estimate_tokens(self._history_text([turn]))
+            if cost <= budget:
+                budget -= cost
+                kept.add(turn.message_id)
+        return [t for t in turns if t.message_id in kept], embedding
+
+    def _follow_up_capability(self, history: List[RecalledTurn]) -> Optional[str]:
+        """Return the capability of an earlier turn the query closely follows up on."""
+        best = max(history, key=lambda t: t.score, default=None)
+        if best is None or best.score < self.recall_follow_up_score or not best.capability_id:
+            return None
+        return best.capability_id if self.catalog.capability(best.capability_id) else None
+
+    def _selection_graph(
+        self,
+        query: str,
+        embedding: Optional[np.ndarray],
+        history: Optional[List[RecalledTurn]] = None,
+    ) -> StageGraph:
+        """Build the stages choosing the capability and ranked applications.
+
+        While the planner call is in flight the raw query is embedded and
+        searched speculatively, and the application candidates of that
+        capability are prepared.  Both are kept whenever the planner's search
+        text resolves to the same capability.  A follow-up of an earlier turn
+        in ``history`` reuses its capability and skips the planner.
+        """
+        graph = StageGraph()
+        follow_up = self._follow_up_capability(history) if history else None
+
+        async def embed() -> np.ndarray:
+            return embedding if embedding is not None else await self._embed(query)
+
+        async def prepare(capability_id: str, raw: np.ndarray) -> List[Application]:
+            return self._application_candidates(capability_id, query, raw)
+
+        graph.add("embed", embed)
+        if follow_up:
+
+            async def reuse(raw: np.ndarray) -> str:
+                return follow_up
+
+            graph.add("capability", reuse, "embed")
+            graph.add("candidates", prepare, "capability", "embed")
+        else:
+
+            async def speculate(raw: np.ndarray) -> str:
+                return self._search_capability(raw)
+
+            async def capability(search_text: str, raw: np.ndarray, guess: str) -> str:
+                if search_text == query:
+                    return guess
+                return self._search_capability(await self._embed(search_text))
+
+            async def candidates(
+                capability_id: str, guess: str, prefetched: List[Application], raw: np.ndarray
+            ) -> List[Application]:
+                if capability_id == guess:
+                    self._stage_stats.count("speculation_hits")
+                    return prefetched
+                self._stage_stats.count("speculation_misses")
+                return self._application_candidates(capability_id, query, raw)
+
+            graph.add("speculate", speculate, "embed")
+            graph.add("prefetch", prepare, "speculate", "embed")
+            graph.add("plan", lambda: self._plan(query))
+            graph.add("capability", capability, "plan", "embed", "speculate")
+            graph.add("candidates", candidates, "capability", "speculate", "prefetch", "embed")
+        graph.add(
+            "rank", lambda found: self._rank_applications(found, query), "candidates"
+        )
+        return graph
+
+    def _record_stages(self, graph: StageGraph) -> None:
+        self._stage_stats.record(graph)
+        for name, (begin, end) in graph.timings.items():
+            metrics.observe_stage(name, end - begin)
+        metrics.STAGE_SAVED_SECONDS.observe(graph.critical_path()["saved_ms"] / 1000)
+
+    async def _remember(
+        self,
+        query: str,
+        answer: str,
+        session_id: str,
+        embedding: Optional[np.ndarray],
+        capability_id: str = "",
+    ) -> None:
+        with metrics.stage_timer("memory"):
+            await self.long_memory.aadd_turn(
+                query, answer, session_id, embedding=embedding, capability_id=capability_id
+            )
+
+    async def _generate(
+        self,
+        query: str,
+        embedding: Optional[np.ndarray],
+        history: Optional[List[RecalledTurn]] = None,
+    ) -> Tuple[str, str]:
+        """Run the pipeline for ``query``; return the answer and capability ID.
+
+        Independent stages run concurrently (see :meth:`_selection_graph`);
+        their timings are accumulated in ``stats()["stages"]``.
+        """
+        graph = self._selection_graph(query, embedding, history)
+        if self.pipeline_mode == "merged":
+            graph.add(
+                "synthesizer",
+                lambda apps: self.generate_final_response(apps, query, history),
+                "rank",
+            )
+        else:
+            graph.add(
+                "draft", lambda apps: self.generate_response(apps, query, history), "rank"
+            )
+            graph.add("synthesizer", self._review_answer, "draft")
+        results = await graph.run()
+        self._record_stages(graph)
+        return results["synthesizer"], results["capability"]
+
+    async def _answer(
+        self, query: str, embedding: Optional[np.ndarray] = None
+    ) -> Tuple[str, str]:
+        """Produce the answer and capability ID for ``query`` without touching memory."""
+        final, embedding = await self._cached_answer(query, embedding)
+        if final is not None:
+            return final, ""
+        final, capability_id = await self._generate(query, embedding)
+        self._store_answer(query, embedding, final)
+        return final, capability_id
+
+    async def run(self, query: str, session_id: str = "") -> str:
+        """Run the recommendation workflow for a user ``query``.
+
+        Earlier turns of ``session_id`` relevant to the query are recalled
+        from long-term memory and given to the synthesizer; such answers
+        depend on the session and bypass the response cache.  Otherwise
+        concurrent calls with the same normalized question share a single
+        orchestration.  Conversation memory is written for every caller,
+        under its ``session_id``.  While Bedrock is unavailable the answer
+        comes from :meth:`_degraded_answer`.
+        """
+        short_memory = self.short_memories.get(session_id)
+        short_memory.add("user", query)
+        history, embedding = await self._recall(query, session_id)
+        try:
+            if history:
+                final, capability_id = await self._generate(query, embedding, history)
+            else:
+                final, capability_id = await self._single_flight.do(
+                    normalize_query(query), lambda: self._answer(query, embedding)
+                )
+        except UpstreamUnavailable as exc:
+            print(f"Serving a degraded answer: {exc}")
+            final, capability_id = await self._degraded_answer(query, embedding)
+        short_memory.add("assistant", final)
+        await self._remember(query, final, session_id, embedding, capability_id)
         return final
 
+    async def run_stream(
+        self, query: str, session_id: str = ""
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run the workflow for ``query`` yielding stage and token events.
+
+        Stage events (``{"event": "stage", "stage": ...}``) are emitted as each
+        step finishes; synthesizer and reviewer output is streamed as
+        ``{"event": "token", ...}`` events, followed by a final ``done`` event
+        carrying the complete answer.  Session recall works as in :meth:`run`.
+        """
+        short_memory = self.short_memories.get(session_id)
+        short_memory.add("user", query)
+        history, embedding = await self._recall(query, session_id)
+        cached = None
+        if not history:
+            cached, embedding = await self._cached_answer(query, embedding)
+        if cached is not None:
+            yield {"event": "stage", "stage": "cache"}
+            short_memory.add("assistant", cached)
+            await self._remember(query, cached, session_id, embedding)
+            yield {"event": "done", "answer": cached}
+            return
+
+        graph = self._selection_graph(query, embedding, history)
+        graph.start()
+        try:
+            capability_id = await graph.result("capability")
+            yield {"event": "stage", "stage": "capability", "capability_id": capability_id}
+
+            applications = await graph.result("rank")
+            yield {
+                "event": "stage",
+                "stage": "ranker",
+                "applications": [a.id for a in applications],
+            }
+        except UpstreamUnavailable:
+            async for event in self._degraded_events(query, embedding, session_id):
+                yield event
+            return
+        finally:
+            graph.cancel()
+        self._record_stages(graph)
+
+        merged = self.pipeline_mode == "merged"
+        parts: List[str] = []
+        start = time.perf_counter()
+        try:
+            async for token in self._stream_llm(
+                get_prompt("synthesizer_reviewer" if merged else "synthesizer"),
+                self._synthesizer_prompt(applications, query, history),
+            ):
+                parts.append(token)
+                yield {"event": "token", "stage": "synthesizer", "text": token}
+        except UpstreamUnavailable:
+            if parts:
+                raise
+            async for event in self._degraded_events(
+                query, embedding, session_id, applications, capability_id
+            ):
+                yield event
+            return
+        final = "".join(parts)
+        metrics.observe_stage("synthesizer", time.perf_counter() - start)
+        yield {"event": "stage", "stage": "synthesizer"}
+
+        if not merged:
+            parts = []
+            start = time.perf_counter()
+            try:
+                async for token in self._stream_llm(
+                    get_prompt("reviewer"), self._reviewer_prompt(final)
+                ):
+                    parts.append(token)
+                    yield {"event": "token", "stage": "reviewer", "text": token}
+                final = "".join(parts)
+            except UpstreamUnavailable:
+                if parts:
+                    raise
+                # Keep the unreviewed draft the client already received.
+            metrics.observe_stage("reviewer", time.perf_counter() - start)
+            yield {"event": "stage", "stage": "reviewer"}
+        if not history:
+            self._store_answer(query, embedding, final)
+
+        short_memory.add("assistant", final)
+        await self._remember(query, final, session_id, embedding, capability_id)
+        yield {"event": "done", "answer": final}
+
+    async def _degraded_events(
+        self,
+        query: str,
+        embedding: Optional[np.ndarray],
+        session_id: str,
+        applications: Optional[List[Application]] = None,
+        capability_id: str = "",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the :meth:`_degraded_answer` to ``query`` and remember it."""
+        final, found = await self._degraded_answer(query, embedding, applications)
+        yield {"event": "stage", "stage": "degraded"}
+        yield {"event": "token", "stage": "degraded", "text": final}
+        self.short_memories.get(session_id).add("assistant", final)
+        await self._remember(query, final, session_id, embedding, capability_id or found)
+        yield {"event": "done", "answer": final}
+
+    async def history(
+        self, session_id: str, cursor: Optional[int] = None, limit: int = 50
+    ) -> MessagePage:
+        """Return a page of the stored conversation of ``session_id``."""
+        return await asyncio.to_thread(self.long_memory.page, session_id, cursor, limit)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return cache, coalescing, embedding batch, stage, LLM slot and memory counters."""
+        stats: Dict[str, Dict[str, float]] = {"single_flight": self._single_flight.stats()}
+        if self.response_cache is not None:
+            cache = self.response_cache.stats()
+            stats["response_cache"] = {
+                **cache,
+                "hit_ratio": _ratio(
+                    cache["exact_hits"] + cache["semantic_hits"],
+                    cache["exact_hits"] + cache["exact_misses"],
+                ),
+            }
+        if self.llm_memo is not None:
+            memo = self.llm_memo.stats()
+            hits = memo["memory_hits"] + memo["sqlite_hits"]
+            stats["llm_memo"] = {**memo, "hit_ratio": _ratio(hits, hits + memo["misses"])}
+        if self.embedding_cache is not None:
+            cache = self.embedding_cache
+            stats["embedding_cache"] = {
+                "entries": len(cache),
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_ratio": _ratio(cache.hits, cache.hits + cache.misses),
+            }
+        if self.embedding_batcher is not None:
+            stats["embedding_batcher"] = self.embedding_batcher.stats()
+        if self._stage_stats.runs:
+            stats["stages"] = self._stage_stats.stats()
+        stats["llm_slots"] = self._llm_slots.stats()
+        if self.__class__._long_memory is not None:
+            stats["long_memory"] = self.__class__._long_memory.stats()
+        return stats
+
     # ------------------------------------------------------------------
     # Capability recommendation logic
 
     async def _llm_chain(self, query: str) -> str:
         """Run the query through the Bedrock LLM with the planner prompt."""
         user_prompt = f"User query: {query}"
-        return await self._call_llm(get_prompt("planner"), user_prompt)
-
-    async def recommend_capability(self, query: str) -> str:
-        """Return the ID of the capability most relevant to ``query``."""
+        return await self._call_llm(get_prompt("planner"), user_prompt, memoize=True)
+
+    async def _plan(self, query: str) -> str:
+        """Return the search text the planner derives from ``query``."""
+        if (
+            self.pipeline_mode == "direct"
+            and len(query.split()) <= self.short_query_words
+        ):
+            # Short queries are already keyword-like; skip the planner round trip.
+            return query
         try:
             result = await self._llm_chain(query)
-            search_obj = json.loads(result)
+            return json.loads(result).get("query", query)
+        except (Overloaded, UpstreamUnavailable):
+            # Shed with 503, or answer degraded in ``run``, rather than guess.
+            raise
         except Exception:
             # Fall back to using the raw query if the model output cannot be parsed.
-            search_obj = {"query": query}
-
-        search_text = search_obj.get("query", query)
-        embedding = self._vector_model.encode([search_text], convert_to_numpy=True)
-        embedding = embedding.astype("float32")
-        k = min(len(self.entries), 5)
-        distances, indices = self.index.search(embedding, k)
-        for idx in indices[0]:
-            if idx in self._cap_index_map:
-                return self._cap_index_map[idx]
-        return ""
+            return query
+
+    def _search_capability(self, embedding: np.ndarray) -> str:
+        """Return the ID of the capability nearest to ``embedding``."""
+        _, indices = vector_index.search(self.capability_index, embedding, 1)
+        capability = self.catalog.capability_at(int(indices[0][0])) if indices.size else None
+        return capability.id if capability is not None else ""
+
+    async def recommend_capability(
+        self, query: str, query_embedding: Optional[np.ndarray] = None
+    ) -> str:
+        """Return the ID of the capability most relevant to ``query``.
+
+        ``query_embedding`` is the embedding of the raw ``query`` if the caller
+        already computed it; it is reused when the planner falls back to the
+        raw query.
+        """
+        search_text = await self._plan(query)
+        if search_text == query and query_embedding is not None:
+            embedding = query_embedding
+        else:
+            embedding = await self._embed(search_text)
+        return self._search_capability(embedding)
 
     # ------------------------------------------------------------------
     # Application recommendation logic
 
-    async def recommend_applications(self, capability_id: str, query: str) -> List[Dict[str, str]]:
-        """Return applications ranked for ``query`` filtered by ``capability_id``."""
-        capability = next(
-            (c for c in self.capabilities if c.get("id") == capability_id),
-            None,
-        )
+    def _trim_to_budget(
+        self, candidates: List[Application], query: str
+    ) -> List[Application]:
+        """Drop the lowest-ranked candidates until the ranker prompt fits the budget."""
+        used = estimate_tokens(get_prompt("ranker")) + estimate_tokens(query)
+        kept: List[Application] = []
+        for app in candidates:
+            used += estimate_tokens(f"- {app.id}: {app.description}")
+            if kept and used > self.ranker_token_budget:
+                break
+            kept.append(app)
+        return kept
+
+    def _application_candidates(
+        self, capability_id: str, query: str, embedding: np.ndarray
+    ) -> List[Application]:
+        """Return the ranker's candidates for ``capability_id``.
+
+        These are the top ``candidate_top_n`` applications by vector
+        similarity to ``embedding`` among those matching the capability (or
+        among all applications when none match), trimmed to the ranker's
+        prompt token budget.
+        """
+        capability = self.catalog.capability(capability_id)
         if not capability:
             return []
-
-        capability_name = capability.get("name", "").lower()
+        allowed = self.catalog.applications_for_capability(capability)
+        _, indices = vector_index.search(
+            self.application_index, embedding, self.candidate_top_n, ids=allowed or None
+        )
         candidates = [
             app
-            for app in self.applications
-            if capability_name in " ".join(app.get("technologies", [])).lower()
-            or capability_name in app.get("description", "").lower()
+            for app in (self.catalog.application_at(int(i)) for i in indices[0])
+            if app is not None
         ]
+        return self._trim_to_budget(candidates, query)
+
+    async def _rank_applications(
+        self, candidates: List[Application], query: str
+    ) -> List[Application]:
+        """Order ``candidates`` for ``query`` with the ranker agent."""
         if not candidates:
-            candidates = self.applications
+            return []
 
         app_text = "\n".join(
-            f"- {a['id']}: {a.get('description', '')}" for a in candidates
+            f"- {a.id}: {a.description}" for a in candidates
         )
         user_prompt = f"User query: {query}\nApplications:\n{app_text}"
         try:
-            result = await self._call_llm(get_prompt("ranker"), user_prompt)
+            result = await self._call_llm(
+                get_prompt("ranker"), user_prompt, memoize=True
+            )
             ranked_ids = json.loads(result)
+        except (Overloaded, UpstreamUnavailable):
+            raise
         except Exception:
-            ranked_ids = [a["id"] for a in candidates]
+            ranked_ids = [a.id for a in candidates]
 
-        ranked = [
-            next((a for a in candidates if a.get("id") == rid), None)
-            for rid in ranked_ids
-        ]
+        by_id = {a.id: a for a in candidates}
+        ranked = [by_id.get(rid) if isinstance(rid, str) else None for rid in ranked_ids]
         return [r for r in ranked if r]
 
-    async def generate_response(self, applications: List[Dict[str, str]], query: str) -> str:
-        """Generate a conversational response summarizing ``applications``."""
+    async def recommend_applications(
+        self,
+        capability_id: str,
+        query: str,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[Application]:
+        """Return applications ranked for ``query`` filtered by ``capability_id``.
+
+        See :meth:`_application_candidates` for how the candidates passed to
+        the ranker call are chosen.
+        """
+        if not self.catalog.capability(capability_id):
+            return []
+        embedding = (
+            query_embedding if query_embedding is not None else await self._embed(query)
+        )
+        candidates = self._application_candidates(capability_id, query, embedding)
+        return await self._rank_applications(candidates, query)
+
+    @staticmethod
+    def _history_text(history: List[RecalledTurn]) -> str:
+        turns = "\n".join(f"User: {t.question}\nAssistant: {t.answer}" for t in history)
+        return f"Earlier in this conversation:\n{turns}"
+
+    @classmethod
+    def _synthesizer_prompt(
+        cls,
+        applications: List[Application],
+        query: str,
+        history: Optional[List[RecalledTurn]] = None,
+    ) -> str:
         app_text = "\n".join(
-            f"- {app.get('name', app.get('id', ''))}: {app.get('description', '')}"
-            for app in applications
+            f"- {app.name or app.id}: {app.description}" for app in applications
         )
-        user_prompt = f"User query: {query}\nRanked applications:\n{app_text}"
+        prompt = f"User query: {query}\nRanked applications:\n{app_text}"
+        if history:
+            prompt = f"{cls._history_text(history)}\n\n{prompt}"
+        return prompt
+
+    @staticmethod
+    def _reviewer_prompt(answer: str) -> str:
+        return f"Answer to review:\n{answer}"
+
+    async def generate_response(
+        self,
+        applications: List[Application],
+        query: str,
+        history: Optional[List[RecalledTurn]] = None,
+    ) -> str:
+        """Generate a conversational response summarizing ``applications``."""
+        user_prompt = self._synthesizer_prompt(applications, query, history)
         return await self._call_llm(get_prompt("synthesizer"), user_prompt)
 
+    async def generate_final_response(
+        self,
+        applications: List[Application],
+        query: str,
+        history: Optional[List[RecalledTurn]] = None,
+    ) -> str:
+        """Generate the reviewed answer in a single call (``merged`` mode)."""
+        user_prompt = self._synthesizer_prompt(applications, query, history)
+        return await self._call_llm(get_prompt("synthesizer_reviewer"), user_prompt)
+
     async def _review_answer(self, answer: str) -> str:
-        """Run the reviewer agent to polish the final answer."""
-        review_prompt = f"Answer to review:\n{answer}"
-        return await self._call_llm(get_prompt("reviewer"), review_prompt)
+        """Run the reviewer agent to polish the final answer.
+
+        The draft is returned unchanged while Bedrock is unavailable.
+        """
+        review_prompt = self._reviewer_prompt(answer)
+        try:
+            return await self._call_llm(get_prompt("reviewer"), review_prompt)
+        except UpstreamUnavailable:
+            return answer
+
+    async def _degraded_answer(
+        self,
+        query: str,
+        embedding: Optional[np.ndarray],
+        applications: Optional[List[Application]] = None,
+    ) -> Tuple[str, str]:
+        """Answer ``query`` without Bedrock; return the answer and capability ID.
+
+        Serves the cached answer of the most similar question scoring at
+        least ``degraded_cache_threshold``, otherwise lists ``applications``
+        (by default those the vector search alone finds).  Degraded answers
+        are never cached.
+        """
+        if embedding is None:
+            embedding = await self._embed(query)
+        if self.response_cache is not None:
+            cached = self.response_cache.get_semantic(
+                embedding, self.degraded_cache_threshold, degraded=True
+            )
+            if cached is not None:
+                metrics.DEGRADED_ANSWERS.inc(source="cache")
+                return cached, ""
+        capability_id = self._search_capability(embedding)
+        if applications is None:
+            applications = self._application_candidates(capability_id, query, embedding)
+        metrics.DEGRADED_ANSWERS.inc(source="search")
+        if not applications:
+            return (
+                "The assistant is temporarily unavailable and no matching "
+                "applications were found. Please try again shortly.",
+                capability_id,
+            )
+        listing = "\n".join(
+            f"- {a.name or a.id}: {a.description}" for a in applications[:5]
+        )
+        return (
+            "The assistant is temporarily unavailable. These applications best "
+            f"match your question:\n{listing}",
+            capability_id,
+        )
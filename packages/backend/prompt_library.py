@@ -18,6 +18,12 @@ PROMPTS = {
         "Review the worker's answer for clarity and correctness. "
         "Return the improved final answer in Markdown."
     ),
+    "synthesizer_reviewer": (
+        "You are an assistant that turns ranked applications into a helpful, "
+        "clear and correct answer. Using the provided list and user question, "
+        "generate a short, polished Markdown response describing the most "
+        "relevant applications as a bullet list. Return only the final answer."
+    ),
     "supervisor": (
         "Coordinate the workers to fulfill the user request. "
         "Use planning prompts and ensure the workflow is followed."
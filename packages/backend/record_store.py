@@ -0,0 +1,138 @@
+"""SQLite-backed catalog metadata read one record at a time."""
+
+from __future__ import annotations
+
+import itertools
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+class RecordStore:
+    """Read-only collection of JSON records stored in SQLite.
+
+    Records are kept in vector-index order (``pos``) and decoded only when
+    accessed, so opening a store costs the same regardless of catalog size and
+    every worker process shares the database pages through the OS page cache
+    instead of holding its own parsed copy.  An optional ``postings`` table
+    holds inverted indexes (``kind``/``term`` -> positions) built at write
+    time.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        # Opened read-only; the lock serializes use from the warm-up thread
+        # and the event loop.
+        self._conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._length = self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    @staticmethod
+    def write(
+        path: Path,
+        records: Iterable[Mapping[str, Any]],
+        postings: Optional[Mapping[str, Mapping[str, Iterable[int]]]] = None,
+        positions: Optional[Iterable[int]] = None,
+    ) -> None:
+        """Replace the store at ``path`` with ``records`` and ``postings``.
+
+        ``positions`` gives each record's position (its vector id); it
+        defaults to ``0..n-1``.  Positions need not be contiguous, which lets
+        incremental syncs keep the ids of unchanged records.
+        """
+        tmp = path.with_name(path.name + ".tmp")
+        if tmp.exists():
+            tmp.unlink()
+        conn = sqlite3.connect(tmp)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE records (pos INTEGER PRIMARY KEY, id TEXT, data TEXT NOT NULL)"
+                )
+                conn.execute("CREATE INDEX records_id ON records (id)")
+                conn.execute(
+                    "CREATE TABLE postings (kind TEXT NOT NULL, term TEXT NOT NULL, "
+                    "pos INTEGER NOT NULL)"
+                )
+                conn.execute("CREATE INDEX postings_term ON postings (kind, term)")
+                conn.executemany(
+                    "INSERT INTO records (pos, id, data) VALUES (?, ?, ?)",
+                    (
+                        (pos, str(record.get("id", "")), json.dumps(record))
+                        for pos, record in zip(
+                            positions if positions is not None else itertools.count(),
+                            records,
+                        )
+                    ),
+                )
+                for kind, terms in (postings or {}).items():
+                    conn.executemany(
+                        "INSERT INTO postings (kind, term, pos) VALUES (?, ?, ?)",
+                        (
+                            (kind, term, pos)
+                            for term, positions in terms.items()
+                            for pos in positions
+                        ),
+                    )
+        finally:
+            conn.close()
+        tmp.replace(path)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        # Positions are vector ids and may have gaps after a sync, so there
+        # is no "n-th from the end" to count back from.
+        if position < 0:
+            raise IndexError(position)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM records WHERE pos = ?", (position,)
+            ).fetchone()
+        if row is None:
+            raise IndexError(position)
+        return json.loads(row[0])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for _, record in self.items():
+            yield record
+
+    def positions(self) -> List[int]:
+        """Return the record positions in ascending order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT pos FROM records ORDER BY pos").fetchall()
+        return [pos for (pos,) in rows]
+
+    def items(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield ``(position, record)`` pairs in position order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT pos, data FROM records ORDER BY pos").fetchall()
+        for pos, data in rows:
+            yield pos, json.loads(data)
+
+    def position(self, record_id: str) -> Optional[int]:
+        """Return the position of the (last) record with ``record_id``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pos FROM records WHERE id = ? ORDER BY pos DESC LIMIT 1", (record_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def postings(self, kind: str, term: str) -> List[int]:
+        """Return the positions listed under ``kind``/``term``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pos FROM postings WHERE kind = ? AND term = ? ORDER BY pos",
+                (kind, term),
+            ).fetchall()
+        return [pos for (pos,) in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
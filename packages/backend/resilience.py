@@ -0,0 +1,314 @@
+"""Retries with decorrelated jitter, hedged requests and circuit breakers.
+
+Shared by :class:`bedrock_adapter.BedrockAdapter` and
+:class:`abacus_client.AbacusClient`.  Failures that mean the upstream is
+unhealthy (connection errors, timeouts, 429 and 5xx after the retries are
+spent, or an open circuit) raise :class:`UpstreamUnavailable`, so callers
+can fall back to a degraded answer instead of failing the request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, Type, TypeVar
+
+from urllib3.util.retry import Retry
+
+import metrics
+from env import settings
+
+T = TypeVar("T")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamUnavailable(RuntimeError):
+    """Raised when an upstream service failed after retries or is circuit-broken."""
+
+
+class CircuitOpen(UpstreamUnavailable):
+    """Raised without calling the upstream while its circuit is open."""
+
+
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """Return the next retry delay: uniform in ``[base, 3 * previous]``, capped.
+
+    Spreads retries of many clients apart while still growing roughly
+    exponentially (the "decorrelated jitter" schedule).
+    """
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+
+def backoff_delays(retries: int, base: float, cap: float) -> Iterator[float]:
+    """Yield the sleep before each of ``retries`` retries."""
+    delay = base
+    for _ in range(max(0, retries)):
+        delay = decorrelated_jitter(delay, base, cap)
+        yield delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the seconds of a numeric ``Retry-After`` header, if any."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def retryable(exc: Exception) -> bool:
+    """Whether a requests or httpx error is a connection error, timeout, 429 or 5xx."""
+    response = getattr(exc, "response", None)
+    return response is None or response.status_code in RETRY_STATUSES
+
+
+def retry_delay(exc: Exception, delays: Iterator[float]) -> Optional[float]:
+    """Return the sleep before retrying after ``exc``, or ``None`` when out of retries.
+
+    A ``Retry-After`` header lengthens the delay, up to ``RETRY_MAX_DELAY``.
+    """
+    delay = next(delays, None)
+    response = getattr(exc, "response", None)
+    if delay is None or response is None:
+        return delay
+    requested = parse_retry_after(response.headers.get("Retry-After"))
+    if requested is None:
+        return delay
+    return max(delay, min(requested, settings.RETRY_MAX_DELAY))
+
+
+def call_with_retries(
+    call: Callable[[], T],
+    breaker: "CircuitBreaker",
+    retries: int,
+    errors: Tuple[Type[Exception], ...],
+) -> T:
+    """Return ``call()``, retrying retryable ``errors`` with decorrelated jitter.
+
+    The last error is re-raised when the retries are spent; ``breaker``
+    fails the call fast while open and counts every retryable failure.
+    """
+    delays = backoff_delays(retries, settings.RETRY_BASE_DELAY, settings.RETRY_MAX_DELAY)
+    while True:
+        breaker.before_call()
+        try:
+            result = call()
+        except errors as exc:
+            delay = next_retry(breaker, exc, delays)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retries(
+    call: Callable[[], Awaitable[T]],
+    breaker: "CircuitBreaker",
+    retries: int,
+    errors: Tuple[Type[Exception], ...],
+) -> T:
+    """Async version of :func:`call_with_retries`."""
+    delays = backoff_delays(retries, settings.RETRY_BASE_DELAY, settings.RETRY_MAX_DELAY)
+    while True:
+        breaker.before_call()
+        try:
+            result = await call()
+        except errors as exc:
+            delay = next_retry(breaker, exc, delays)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+def next_retry(
+    breaker: "CircuitBreaker", exc: Exception, delays: Iterator[float]
+) -> Optional[float]:
+    """Record a failed attempt; return the delay before the next one, if any."""
+    if not retryable(exc):
+        # The upstream answered (e.g. 400): it is healthy, the request is not.
+        breaker.record_success()
+        return None
+    breaker.record_failure()
+    delay = retry_delay(exc, delays)
+    if delay is not None:
+        metrics.UPSTREAM_RETRIES.inc(upstream=breaker.name)
+    return delay
+
+
+def failure_type(exc: Exception) -> Type[RuntimeError]:
+    """Return the error type to raise for a final ``exc`` of an upstream call."""
+    return UpstreamUnavailable if retryable(exc) else RuntimeError
+
+
+class JitteredRetry(Retry):
+    """urllib3 ``Retry`` sleeping with decorrelated jitter between attempts.
+
+    ``backoff_factor`` is the base delay and ``backoff_max`` the cap; a
+    ``Retry-After`` header still takes precedence.
+    """
+
+    previous = 0.0
+
+    def new(self, **kw):  # type: ignore[no-untyped-def]
+        retry = super().new(**kw)
+        retry.previous = self.previous
+        return retry
+
+    def get_backoff_time(self) -> float:
+        if not self.history or self.backoff_factor <= 0:
+            return 0.0
+        self.previous = decorrelated_jitter(
+            self.previous or self.backoff_factor, self.backoff_factor, self.backoff_max
+        )
+        return self.previous
+
+
+class LatencyTracker:
+    """Latencies of the last ``window`` successful calls."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the ``pct`` percentile, or ``None`` until enough calls were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: Optional[float], upstream: str) -> T:
+    """Await ``call()``, starting a duplicate if it is still pending after ``delay``.
+
+    The first successful result wins and the other attempt is cancelled; if
+    both fail, the first attempt's error is raised.  ``delay=None`` makes a
+    single attempt.
+    """
+    first = asyncio.ensure_future(call())
+    if delay is None:
+        return await first
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            metrics.UPSTREAM_HEDGES.inc(upstream=upstream, outcome="sent")
+            tasks.append(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    if task is not first:
+                        metrics.UPSTREAM_HEDGES.inc(upstream=upstream, outcome="won")
+                    return task.result()
+        return first.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            else:
+                task.cancelled() or task.exception()
+
+
+class CircuitBreaker:
+    """Fail fast while an upstream keeps failing.
+
+    After ``threshold`` consecutive failures the circuit opens and calls are
+    rejected with :class:`CircuitOpen` for ``reset_timeout`` seconds.  Then a
+    single probe call is let through: success closes the circuit, failure
+    opens it again.  ``threshold <= 0`` disables the breaker.  Thread-safe,
+    as ABACUS pages are fetched from worker threads.
+    """
+
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, name: str, threshold: int, reset_timeout: float) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise :class:`CircuitOpen` unless a call may be made now."""
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            if self.state == "closed":
+                return
+            # Open, or half-open with a probe that has not reported back in time.
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state("half_open")
+                self._opened_at = time.monotonic()
+                return
+            self.rejected += 1
+        metrics.CIRCUIT_REJECTED.inc(upstream=self.name)
+        raise CircuitOpen(f"{self.name} is unavailable (circuit open)")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def record_failure(self) -> None:
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    print(f"Circuit for {self.name} opened after {self.failures} failures")
+                self._set_state("open")
+                self._opened_at = time.monotonic()
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.CIRCUIT_STATE.set(self.STATES[state], upstream=self.name)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "state": self.STATES[self.state],
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+
+
+def circuit_breaker(upstream: str, url: str) -> CircuitBreaker:
+    """Return the breaker shared by every client of ``upstream`` at ``url``."""
+    with _registry_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = _breakers[url] = CircuitBreaker(
+                upstream, settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_TIMEOUT
+            )
+        return breaker
+
+
+def latency_tracker(url: str) -> LatencyTracker:
+    """Return the latency window shared by every client calling ``url``."""
+    with _registry_lock:
+        tracker = _latencies.get(url)
+        if tracker is None:
+            tracker = _latencies[url] = LatencyTracker()
+        return tracker
@@ -0,0 +1,298 @@
+"""Semantic cache of final answers keyed by query embeddings."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Return the canonical form of ``query`` used for exact-match lookups."""
+    return " ".join(query.lower().split())
+
+
+def catalog_fingerprint(paths: Iterable[Path]) -> str:
+    """Return a fingerprint that changes whenever any catalog index file is rebuilt."""
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class _Entry:
+    query: str
+    answer: str
+    created_at: float
+
+
+class ResponseCache:
+    """Answer cache with exact and embedding-similarity lookups.
+
+    Exact matches are served from a dict keyed by the normalized query text.
+    Otherwise the query embedding is searched in an inner-product FAISS index of
+    previously answered queries and a hit is returned when the cosine
+    similarity reaches ``threshold``.  Entries expire after ``ttl`` seconds and
+    the least recently used entry is evicted once ``max_entries`` is reached.
+    The cache is persisted under ``directory`` together with the catalog
+    ``fingerprint`` and discarded on load when the catalog index has changed.
+    Updates only mark the cache ``dirty``; the owner calls :meth:`save` (or
+    :meth:`snapshot` and :meth:`write` from a worker thread) periodically
+    and at shutdown.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        threshold: float,
+        ttl: float,
+        max_entries: int,
+        fingerprint: str = "",
+    ) -> None:
+        self.index_path = directory / "response_cache.faiss"
+        self.meta_path = directory / "response_cache.json"
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        # (created_at, id) in insertion order, so expired entries are at the head.
+        self._expiry: Deque[Tuple[float, int]] = deque()
+        self._exact: Dict[str, int] = {}
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._next_id = 0
+        self.dirty = False
+
+        self.exact_hits = 0
+        self.exact_misses = 0
+        self.semantic_hits = 0
+        self.semantic_misses = 0
+        # Lookups serving degraded answers, kept out of the hit rate above.
+        self.degraded_hits = 0
+        self.degraded_misses = 0
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+
+    def _load(self) -> None:
+        if not (self.index_path.exists() and self.meta_path.exists()):
+            return
+        try:
+            with self.meta_path.open("r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            if meta.get("fingerprint") != self.fingerprint:
+                # The catalog index was rebuilt since these answers were cached.
+                self._remove_files()
+                return
+            index = faiss.read_index(str(self.index_path))
+        except Exception as exc:  # pragma: no cover - corrupt cache files
+            print(f"Failed to load response cache: {exc}. Starting empty.")
+            return
+        self._index = index
+        self._next_id = int(meta.get("next_id", 0))
+        for item in meta.get("entries", []):
+            entry = _Entry(item["query"], item["answer"], float(item["created_at"]))
+            self._entries[int(item["id"])] = entry
+            self._exact[normalize_query(entry.query)] = int(item["id"])
+        self._expiry.extend(sorted((e.created_at, cid) for cid, e in self._entries.items()))
+        self._evict_expired()
+
+    def snapshot(self) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """Return the serialized index and metadata if there are unsaved changes.
+
+        Cheap in-memory copies, so the cache can keep changing while
+        :meth:`write` puts the snapshot on disk from another thread.
+        """
+        if not self.dirty or self._index is None:
+            return None
+        self.dirty = False
+        index = faiss.serialize_index(self._index).tobytes()
+        meta = {
+            "fingerprint": self.fingerprint,
+            "next_id": self._next_id,
+            "entries": [
+                {
+                    "id": cid,
+                    "query": e.query,
+                    "answer": e.answer,
+                    "created_at": e.created_at,
+                }
+                for cid, e in self._entries.items()
+            ],
+        }
+        return index, meta
+
+    def write(self, snapshot: Tuple[bytes, Dict[str, Any]]) -> None:
+        """Write a :meth:`snapshot`, replacing the files atomically.
+
+        Each file is written to a temporary name and renamed over the old
+        one, so readers and other workers never see a partial file.
+        """
+        index, meta = snapshot
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        index_tmp = self.index_path.with_name(self.index_path.name + suffix)
+        meta_tmp = self.meta_path.with_name(self.meta_path.name + suffix)
+        index_tmp.write_bytes(index)
+        with meta_tmp.open("w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        os.replace(index_tmp, self.index_path)
+        os.replace(meta_tmp, self.meta_path)
+
+    def save(self) -> None:
+        """Persist unsaved changes next to the vector store."""
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            self.write(snapshot)
+
+    def _remove_files(self) -> None:
+        for path in (self.index_path, self.meta_path):
+            if path.exists():
+                path.unlink()
+
+    def invalidate(self, fingerprint: str) -> None:
+        """Drop every entry because the catalog index changed."""
+        self.fingerprint = fingerprint
+        self._entries.clear()
+        self._expiry.clear()
+        self._exact.clear()
+        self._index = None
+        self.dirty = False
+        self._remove_files()
+
+    # ------------------------------------------------------------------
+    # Lookups
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl > 0 and now - entry.created_at > self.ttl
+
+    def _hit(self, cid: int) -> Optional[str]:
+        entry = self._entries.get(cid)
+        if entry is None:
+            return None
+        if self._expired(entry, time.time()):
+            self._remove(cid)
+            return None
+        self._entries.move_to_end(cid)
+        return entry.answer
+
+    def get_exact(self, query: str) -> Optional[str]:
+        """Return the cached answer for the same normalized ``query``."""
+        cid = self._exact.get(normalize_query(query))
+        answer = self._hit(cid) if cid is not None else None
+        if answer is None:
+            self.exact_misses += 1
+        else:
+            self.exact_hits += 1
+        return answer
+
+    def get_semantic(
+        self, embedding: np.ndarray, threshold: Optional[float] = None, degraded: bool = False
+    ) -> Optional[str]:
+        """Return the answer of the most similar cached query above ``threshold``.
+
+        ``threshold`` defaults to the cache's own.  ``degraded`` lookups are
+        counted separately from the normal semantic hits and misses.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        answer = None
+        if self._index is not None and self._index.ntotal:
+            vector = self._normalized(embedding)
+            scores, ids = self._index.search(vector, 1)
+            if ids[0][0] != -1 and scores[0][0] >= threshold:
+                answer = self._hit(int(ids[0][0]))
+        if degraded:
+            if answer is None:
+                self.degraded_misses += 1
+            else:
+                self.degraded_hits += 1
+        elif answer is None:
+            self.semantic_misses += 1
+        else:
+            self.semantic_hits += 1
+        return answer
+
+    # ------------------------------------------------------------------
+    # Updates
+
+    @staticmethod
+    def _normalized(embedding: np.ndarray) -> np.ndarray:
+        vector = np.array(embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _remove(self, cid: int) -> None:
+        entry = self._entries.pop(cid, None)
+        if entry is None:
+            return
+        self.dirty = True
+        key = normalize_query(entry.query)
+        if self._exact.get(key) == cid:
+            del self._exact[key]
+        if self._index is not None:
+            self._index.remove_ids(np.array([cid], dtype="int64"))
+
+    def _evict_expired(self) -> None:
+        if self.ttl <= 0:
+            return
+        cutoff = time.time() - self.ttl
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, cid = self._expiry.popleft()
+            # Ids are never reused; entries removed or replaced earlier are skipped.
+            self._remove(cid)
+        if len(self._expiry) > 2 * max(self.max_entries, len(self._entries)):
+            # Drop ids of entries that were evicted as least recently used.
+            self._expiry = deque(item for item in self._expiry if item[1] in self._entries)
+
+    def put(self, query: str, embedding: np.ndarray, answer: str) -> None:
+        """Cache ``answer`` for ``query`` and mark the cache for saving."""
+        if self.max_entries <= 0:
+            return
+        vector = self._normalized(embedding)
+        if self._index is None:
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+
+        existing = self._exact.get(normalize_query(query))
+        if existing is not None:
+            self._remove(existing)
+        self._evict_expired()
+        while len(self._entries) >= self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+        cid = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(vector, np.array([cid], dtype="int64"))
+        entry = _Entry(query, answer, time.time())
+        self._entries[cid] = entry
+        if self.ttl > 0:
+            self._expiry.append((entry.created_at, cid))
+        self._exact[normalize_query(query)] = cid
+        self.dirty = True
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for exact and semantic lookups."""
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "exact_misses": self.exact_misses,
+            "semantic_hits": self.semantic_hits,
+            "semantic_misses": self.semantic_misses,
+            "degraded_hits": self.degraded_hits,
+            "degraded_misses": self.degraded_misses,
+        }
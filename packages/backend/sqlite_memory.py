@@ -1,54 +1,408 @@
 from __future__ import annotations
 
+import argparse
+import asyncio
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# (session_id, role, content, created_at, recall vector, capability_id)
+_Row = Tuple[str, str, str, float, Optional[bytes], str]
+_Rows = Sequence[_Row]
+
+_COLUMNS = "id, session_id, role, content, created_at"
+
+
+def _message(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    mid, session_id, role, content, created_at = row
+    return {
+        "id": mid,
+        "session_id": session_id,
+        "role": role,
+        "content": content,
+        "created_at": created_at,
+    }
+
+
+@dataclass
+class RecalledTurn:
+    """A past question of a session, its answer and its similarity to a query."""
+
+    message_id: int
+    question: str
+    answer: str
+    capability_id: str
+    score: float
+
+
+@dataclass
+class MessagePage:
+    """One page of a session's messages and the cursor of the next page."""
+
+    messages: List[Dict[str, Any]]
+    next_cursor: Optional[int]
 
 
 class SQLiteMemory:
-    """SQLite-backed persistent memory for conversations."""
+    """SQLite-backed persistent memory for conversations.
+
+    Messages belong to a session (``session_id``, ``""`` when the caller has
+    none) and carry a ``created_at`` timestamp; the ``sessions`` table
+    tracks each session's last activity for :meth:`purge_sessions`.
+    Questions written with :meth:`aadd_turn` also store their embedding in
+    ``message_vectors`` so :meth:`recall` can find relevant earlier turns.
+
+    The database runs in WAL mode with a configurable ``synchronous`` level
+    and one connection guarded by a lock, so it can be shared by concurrent
+    requests.  :meth:`add` and :meth:`add_many` write immediately;
+    :meth:`aadd` and :meth:`aadd_many` hand messages to a write-behind
+    worker thread that commits everything queued within ``flush_interval``
+    seconds as one transaction.  At most ``max_queue`` batches wait for the
+    worker; further callers wait for room.  Queued messages become visible
+    to readers once flushed (see :meth:`flush` and :meth:`close`), except
+    to :meth:`recall`, which also searches the turns still queued.
+    """
 
-    def __init__(self, path: Path) -> None:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        flush_interval: float = 0.05,
+        max_queue: int = 10000,
+        synchronous: str = "NORMAL",
+        max_batch_rows: int = 1000,
+    ) -> None:
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(
+                f"Unknown synchronous mode {synchronous!r}; expected one of {SYNCHRONOUS_MODES}"
+            )
         self.path = path
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.path)
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_batch_rows = max(1, max_batch_rows)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"PRAGMA synchronous={synchronous}")
         self._init_db()
 
+        self._queue: "queue.Queue[Optional[_Rows]]" = queue.Queue(maxsize=max(1, max_queue))
+        # Queued batches not yet committed, in queue order, for recall().
+        self._pending: Dict[int, _Rows] = {}
+        self._pending_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+        self.queued = 0
+        self.written = 0
+        self.flushes = 0
+        self.backpressure_waits = 0
+        self.failed = 0
+
     def _init_db(self) -> None:
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL
+        with self._lock:
+            cur = self.conn.cursor()
+            # Only takes effect for a new database; lets compact() return
+            # the pages freed by purged sessions to the file system.
+            cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL DEFAULT '',
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+            columns = {row[1] for row in cur.execute("PRAGMA table_info(messages)")}
+            migrated = "session_id" not in columns
+            if migrated:
+                # Databases written before sessions: keep their rows in "".
+                cur.execute(
+                    "ALTER TABLE messages ADD COLUMN session_id TEXT NOT NULL DEFAULT ''"
+                )
+            if "created_at" not in columns:
+                cur.execute(
+                    "ALTER TABLE messages ADD COLUMN created_at REAL NOT NULL DEFAULT 0"
+                )
+            # Rows migrated without a timestamp count as written now, so the
+            # first retention run does not treat them as ancient.
+            now = time.time()
+            if "created_at" not in columns:
+                cur.execute("UPDATE messages SET created_at = ? WHERE created_at = 0", (now,))
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id)"
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)"
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS message_vectors (
+                    message_id INTEGER PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    capability_id TEXT NOT NULL DEFAULT '',
+                    vector BLOB NOT NULL
+                )
+                """
+            )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS message_vectors_session "
+                "ON message_vectors (session_id, message_id)"
+            )
+            if migrated:
+                cur.execute(
+                    """
+                    INSERT OR IGNORE INTO sessions (session_id, created_at, updated_at)
+                    SELECT session_id, MIN(created_at), MAX(created_at)
+                    FROM messages GROUP BY session_id
+                    """
+                )
+            stale = [
+                row[0]
+                for row in cur.execute("SELECT session_id FROM sessions WHERE updated_at = 0")
+            ]
+            if stale:
+                # Databases migrated by earlier releases stored 0 instead.
+                marks = ", ".join("?" * len(stale))
+                cur.execute(
+                    f"UPDATE messages SET created_at = ? WHERE created_at = 0 "
+                    f"AND session_id IN ({marks})",
+                    (now, *stale),
+                )
+                cur.execute(
+                    f"UPDATE sessions SET created_at = ?, updated_at = ? "
+                    f"WHERE session_id IN ({marks})",
+                    (now, now, *stale),
+                )
+            self.conn.commit()
+
+    @staticmethod
+    def _rows(messages: Iterable[Tuple[str, str]], session_id: str) -> List[_Row]:
+        created_at = time.time()
+        return [(session_id, role, content, created_at, None, "") for role, content in messages]
+
+    def _insert(self, cur: sqlite3.Cursor, rows: _Rows) -> List[int]:
+        """Insert ``rows`` and touch their sessions; the caller commits."""
+        ids = []
+        touched: Dict[str, Tuple[float, float]] = {}
+        for row in rows:
+            cur.execute(
+                "INSERT INTO messages (session_id, role, content, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                row[:4],
             )
+            ids.append(int(cur.lastrowid))
+            if row[4] is not None:
+                cur.execute(
+                    "INSERT INTO message_vectors (message_id, session_id, capability_id, vector) "
+                    "VALUES (?, ?, ?, ?)",
+                    (ids[-1], row[0], row[5], row[4]),
+                )
+            first, last = touched.get(row[0], (row[3], row[3]))
+            touched[row[0]] = (min(first, row[3]), max(last, row[3]))
+        cur.executemany(
             """
+            INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT (session_id)
+            DO UPDATE SET updated_at = MAX(updated_at, excluded.updated_at)
+            """,
+            [(sid, first, last) for sid, (first, last) in touched.items()],
         )
-        self.conn.commit()
+        return ids
 
-    def add(self, role: str, content: str) -> int:
+    def add(self, role: str, content: str, session_id: str = "") -> int:
         """Insert a new message and return its ID."""
-        cur = self.conn.cursor()
-        cur.execute(
-            "INSERT INTO messages (role, content) VALUES (?, ?)",
-            (role, content),
-        )
-        self.conn.commit()
-        return int(cur.lastrowid)
+        return self.add_many([(role, content)], session_id)[0]
+
+    def add_many(self, messages: Iterable[Tuple[str, str]], session_id: str = "") -> List[int]:
+        """Insert ``(role, content)`` pairs in one transaction; return their IDs."""
+        rows = self._rows(messages, session_id)
+        with self._lock:
+            with self.conn:
+                return self._insert(self.conn.cursor(), rows)
+
+    # ------------------------------------------------------------------
+    # Write-behind queue
+
+    async def aadd(self, role: str, content: str, session_id: str = "") -> None:
+        """Queue a message for the write-behind worker."""
+        await self.aadd_many([(role, content)], session_id)
+
+    async def aadd_many(
+        self, messages: Iterable[Tuple[str, str]], session_id: str = ""
+    ) -> None:
+        """Queue ``(role, content)`` pairs to be written together.
+
+        Messages are timestamped when queued.  Returns as soon as the batch
+        is queued; when the queue is full the caller waits (off the event
+        loop) until the worker catches up.
+        """
+        await self._enqueue(self._rows(messages, session_id))
+
+    async def aadd_turn(
+        self,
+        question: str,
+        answer: str,
+        session_id: str = "",
+        *,
+        embedding: Optional[np.ndarray] = None,
+        capability_id: str = "",
+    ) -> None:
+        """Queue a question and its answer; index the question for :meth:`recall`.
 
-    def get(self, message_id: int) -> Optional[Dict[str, str]]:
+        ``embedding`` is the question's embedding and ``capability_id`` the
+        capability the answer was based on.
+        """
+        rows = self._rows([("user", question), ("assistant", answer)], session_id)
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype="float32").reshape(-1)
+            norm = float(np.linalg.norm(vector))
+            if norm > 0:
+                rows[0] = rows[0][:4] + ((vector / norm).tobytes(), capability_id)
+        await self._enqueue(rows)
+
+    async def _enqueue(self, rows: List[_Row]) -> None:
+        if not rows:
+            return
+        self._ensure_worker()
+        with self._pending_lock:
+            self._pending[id(rows)] = rows
+        try:
+            self._queue.put_nowait(rows)
+        except queue.Full:
+            self.backpressure_waits += 1
+            try:
+                await asyncio.to_thread(self._queue.put, rows)
+            except BaseException:
+                with self._pending_lock:
+                    self._pending.pop(id(rows), None)
+                raise
+        self.queued += len(rows)
+
+    def _ensure_worker(self) -> None:
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name="sqlite-memory-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self, first: _Rows) -> Tuple[List[_Rows], bool]:
+        batches = [first]
+        rows = len(first)
+        deadline = time.perf_counter() + self.flush_interval
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batches, True
+            batches.append(item)
+            rows += len(item)
+        return batches, False
+
+    def _worker(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._queue.task_done()
+                return
+            batches, stop = self._collect(first)
+            rows = [row for batch in batches for row in batch]
+            try:
+                with self._lock, metrics.MEMORY_FLUSH_SECONDS.time():
+                    try:
+                        with self.conn:
+                            self._insert(self.conn.cursor(), rows)
+                    finally:
+                        # Under the lock, so recall() sees each row exactly once.
+                        with self._pending_lock:
+                            for batch in batches:
+                                self._pending.pop(id(batch), None)
+                self.written += len(rows)
+                self.flushes += 1
+                metrics.MEMORY_ROWS.inc(len(rows))
+            except sqlite3.Error as exc:
+                self.failed += len(rows)
+                print(f"Failed to write {len(rows)} messages to long-term memory: {exc}")
+            for _ in range(len(batches) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self) -> None:
+        """Block until every queued message has been committed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """Commit queued messages, stop the worker and close the database.
+
+        The WAL is checkpointed into the main database file so the data is
+        durable even if the process is killed right after shutdown.
+        """
+        with self._thread_lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return write-behind counters."""
+        return {
+            "queued": self.queued,
+            "written": self.written,
+            "flushes": self.flushes,
+            "pending": self._queue.qsize(),
+            "backpressure_waits": self.backpressure_waits,
+            "failed": self.failed,
+        }
+
+    # ------------------------------------------------------------------
+    # Reads and edits
+
+    def get(self, message_id: int) -> Optional[Dict[str, Any]]:
         """Return a single message or ``None`` if not found."""
-        cur = self.conn.cursor()
-        cur.execute(
-            "SELECT id, role, content FROM messages WHERE id = ?",
-            (message_id,),
-        )
-        row = cur.fetchone()
-        if row:
-            mid, role, content = row
-            return {"id": mid, "role": role, "content": content}
-        return None
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute(f"SELECT {_COLUMNS} FROM messages WHERE id = ?", (message_id,))
+            row = cur.fetchone()
+        return _message(row) if row else None
 
     def update(
         self,
@@ -69,27 +423,256 @@ class SQLiteMemory:
             fields.append("content = ?")
             params.append(content)
         params.append(message_id)
-        cur = self.conn.cursor()
-        cur.execute(
-            f"UPDATE messages SET {', '.join(fields)} WHERE id = ?",
-            params,
-        )
-        self.conn.commit()
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute(
+                f"UPDATE messages SET {', '.join(fields)} WHERE id = ?",
+                params,
+            )
+            self.conn.commit()
         return cur.rowcount > 0
 
     def delete(self, message_id: int) -> bool:
         """Remove the message with the given ``message_id``."""
-        cur = self.conn.cursor()
-        cur.execute("DELETE FROM messages WHERE id = ?", (message_id,))
-        self.conn.commit()
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute("DELETE FROM message_vectors WHERE message_id = ?", (message_id,))
+            cur.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+            self.conn.commit()
         return cur.rowcount > 0
 
-    def all_messages(self) -> List[Dict[str, str]]:
+    def page(
+        self,
+        session_id: str,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        *,
+        newest_first: bool = False,
+    ) -> MessagePage:
+        """Return up to ``limit`` messages of ``session_id`` after ``cursor``.
+
+        Pages run oldest to newest, or newest to oldest with
+        ``newest_first``; pass the returned ``next_cursor`` to get the next
+        page.  Each page is a range scan of the ``(session_id, id)`` index.
+        """
+        if newest_first:
+            where, order = "id < ?", "DESC"
+            cursor = (1 << 63) - 1 if cursor is None else cursor
+        else:
+            where, order = "id > ?", "ASC"
+            cursor = 0 if cursor is None else cursor
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {_COLUMNS} FROM messages WHERE session_id = ? AND {where} "
+                f"ORDER BY id {order} LIMIT ?",
+                (session_id, cursor, limit + 1),
+            ).fetchall()
+        messages = [_message(row) for row in rows[:limit]]
+        more = len(rows) > limit
+        return MessagePage(messages, messages[-1]["id"] if more else None)
+
+    def recent(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the last ``limit`` messages of ``session_id``, oldest first."""
+        return self.page(session_id, limit=limit, newest_first=True).messages[::-1]
+
+    def iter_messages(
+        self, session_id: Optional[str] = None, batch_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield messages in insertion order, ``batch_size`` rows per query."""
+        cursor = 0
+        while True:
+            with self._lock:
+                if session_id is None:
+                    rows = self.conn.execute(
+                        f"SELECT {_COLUMNS} FROM messages WHERE id > ? ORDER BY id LIMIT ?",
+                        (cursor, batch_size),
+                    ).fetchall()
+                else:
+                    rows = self.conn.execute(
+                        f"SELECT {_COLUMNS} FROM messages WHERE session_id = ? AND id > ? "
+                        "ORDER BY id LIMIT ?",
+                        (session_id, cursor, batch_size),
+                    ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _message(row)
+            cursor = rows[-1][0]
+
+    def all_messages(self) -> List[Dict[str, Any]]:
         """Return all messages in insertion order."""
-        cur = self.conn.cursor()
-        cur.execute("SELECT id, role, content FROM messages ORDER BY id")
-        rows = cur.fetchall()
-        return [
-            {"id": mid, "role": role, "content": content}
-            for mid, role, content in rows
-        ]
+        return list(self.iter_messages())
+
+    def recall(
+        self,
+        session_id: str,
+        embedding: np.ndarray,
+        k: int = 3,
+        *,
+        min_score: float = 0.0,
+        max_candidates: int = 200,
+    ) -> List[RecalledTurn]:
+        """Return up to ``k`` earlier turns of ``session_id`` relevant to ``embedding``.
+
+        The vectors of the session's last ``max_candidates`` questions are
+        read through the ``(session_id, message_id)`` index, together with
+        turns still queued for the writer, and scored by cosine similarity;
+        turns scoring at least ``min_score`` are returned oldest first.
+        Queued turns have no id yet and get negative ``message_id`` values.
+        """
+        query = np.asarray(embedding, dtype="float32").reshape(-1)
+        norm = float(np.linalg.norm(query))
+        if k <= 0 or norm == 0:
+            return []
+        with self._lock:
+            rows = [
+                row
+                for row in self.conn.execute(
+                    "SELECT message_id, capability_id, vector FROM message_vectors "
+                    "WHERE session_id = ? ORDER BY message_id DESC LIMIT ?",
+                    (session_id, max_candidates),
+                )
+                if len(row[2]) == 4 * query.size
+            ]
+            rows.reverse()
+            with self._pending_lock:
+                batches = list(self._pending.values())
+        queued: Dict[int, Tuple[str, str]] = {}
+        for batch in batches:
+            for n, row in enumerate(batch):
+                if row[0] != session_id or row[4] is None or len(row[4]) != 4 * query.size:
+                    continue
+                answer = next((r[2] for r in batch[n + 1 :] if r[1] == "assistant"), "")
+                key = -len(queued) - 1
+                queued[key] = (row[2], answer)
+                rows.append((key, row[5], row[4]))
+        rows = rows[-max_candidates:] if max_candidates > 0 else rows
+        if not rows:
+            return []
+        matrix = np.frombuffer(b"".join(row[2] for row in rows), dtype="float32")
+        scores = matrix.reshape(len(rows), query.size) @ (query / norm)
+        best = [int(i) for i in np.argsort(-scores)[:k] if scores[i] >= min_score]
+
+        turns = []
+        with self._lock:
+            # ``rows`` is oldest first: committed turns, then queued ones.
+            for i in sorted(best):
+                message_id, capability_id = rows[i][0], rows[i][1]
+                if message_id < 0:
+                    question, answer = queued[message_id]
+                    turns.append(
+                        RecalledTurn(message_id, question, answer, capability_id, float(scores[i]))
+                    )
+                    continue
+                question = self.conn.execute(
+                    "SELECT content FROM messages WHERE id = ?", (message_id,)
+                ).fetchone()
+                answer = self.conn.execute(
+                    "SELECT content FROM messages WHERE session_id = ? AND id > ? "
+                    "AND role = 'assistant' ORDER BY id LIMIT 1",
+                    (session_id, message_id),
+                ).fetchone()
+                if question is None:
+                    continue
+                turns.append(
+                    RecalledTurn(
+                        message_id,
+                        question[0],
+                        answer[0] if answer else "",
+                        capability_id,
+                        float(scores[i]),
+                    )
+                )
+        return turns
+
+    # ------------------------------------------------------------------
+    # Retention
+
+    def purge_sessions(
+        self,
+        older_than: float,
+        *,
+        batch_size: int = 500,
+        archive: Optional[Path] = None,
+    ) -> int:
+        """Delete sessions inactive since the ``older_than`` timestamp.
+
+        Sessions are removed ``batch_size`` at a time, each batch in its own
+        transaction so queued writes are not held up.  With ``archive`` their
+        messages are first appended to that JSON Lines file.  Returns the
+        number of sessions removed.
+        """
+        removed = 0
+        while True:
+            with self._lock:
+                ids = [
+                    row[0]
+                    for row in self.conn.execute(
+                        "SELECT session_id FROM sessions WHERE updated_at < ? "
+                        "ORDER BY updated_at LIMIT ?",
+                        (older_than, batch_size),
+                    )
+                ]
+                if not ids:
+                    return removed
+                marks = ", ".join("?" * len(ids))
+                if archive is not None:
+                    rows = self.conn.execute(
+                        f"SELECT {_COLUMNS} FROM messages WHERE session_id IN ({marks}) "
+                        "ORDER BY session_id, id",
+                        ids,
+                    ).fetchall()
+                    _append_jsonl(archive, (_message(row) for row in rows))
+                with self.conn:
+                    self.conn.execute(f"DELETE FROM messages WHERE session_id IN ({marks})", ids)
+                    self.conn.execute(
+                        f"DELETE FROM message_vectors WHERE session_id IN ({marks})", ids
+                    )
+                    self.conn.execute(f"DELETE FROM sessions WHERE session_id IN ({marks})", ids)
+            removed += len(ids)
+
+    def compact(self) -> None:
+        """Return free pages to the file system and truncate the WAL."""
+        with self._lock:
+            if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                self.conn.execute("PRAGMA incremental_vacuum")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def _append_jsonl(path: Path, messages: Iterable[Dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as fh:
+        for message in messages:
+            fh.write(json.dumps(message, ensure_ascii=False) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from env import settings
+
+    parser = argparse.ArgumentParser(description="Purge old conversation sessions.")
+    parser.add_argument(
+        "--days", type=float, default=settings.LONG_TERM_RETENTION_DAYS,
+        help="remove sessions idle for this many days",
+    )
+    parser.add_argument(
+        "--archive", default=settings.LONG_TERM_ARCHIVE_PATH or None,
+        help="append removed messages to this JSON Lines file",
+    )
+    args = parser.parse_args(argv)
+    if args.days <= 0:
+        parser.error("--days must be positive (or set LONG_TERM_RETENTION_DAYS)")
+
+    memory = SQLiteMemory(Path(settings.LONG_TERM_PATH))
+    removed = memory.purge_sessions(
+        time.time() - args.days * 86400,
+        archive=Path(args.archive) if args.archive else None,
+    )
+    memory.compact()
+    memory.close()
+    print(f"Removed {removed} sessions")
+
+
+if __name__ == "__main__":
+    main()
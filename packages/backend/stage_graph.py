@@ -0,0 +1,115 @@
+"""Concurrent execution of dependent pipeline stages."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+Stage = Callable[..., Awaitable[Any]]
+
+
+class StageGraph:
+    """Run async stages as soon as the stages they depend on have finished.
+
+    Stages must be added after their dependencies, so the graph is acyclic
+    by construction.  Each stage is called with the results of its
+    dependencies as positional arguments.  ``timings`` maps every stage that
+    ran to its ``(start, end)`` in seconds since :meth:`start`.
+    """
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, Tuple[Stage, Tuple[str, ...]]] = {}
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        self._started = 0.0
+        self.timings: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, name: str, fn: Stage, *after: str) -> None:
+        """Add stage ``name`` running ``fn`` once the stages in ``after`` are done."""
+        if name in self._stages:
+            raise ValueError(f"Stage {name!r} already added")
+        missing = [dep for dep in after if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {name!r} depends on unknown stages {missing}")
+        self._stages[name] = (fn, after)
+
+    def start(self) -> None:
+        """Schedule every stage; stages without dependencies begin at once."""
+        self._started = time.perf_counter()
+        for name in self._stages:
+            task = asyncio.ensure_future(self._run(name))
+            # A failure surfaces through the stages awaiting it; don't also
+            # report it as never retrieved.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._tasks[name] = task
+
+    async def _run(self, name: str) -> Any:
+        fn, after = self._stages[name]
+        args = [await self._tasks[dep] for dep in after]
+        begin = time.perf_counter()
+        try:
+            return await fn(*args)
+        finally:
+            self.timings[name] = (begin - self._started, time.perf_counter() - self._started)
+
+    async def result(self, name: str) -> Any:
+        """Wait for stage ``name`` of a started graph and return its result."""
+        return await self._tasks[name]
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the whole graph and return the result of every stage."""
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks.values())
+        finally:
+            self.cancel()
+        return {name: task.result() for name, task in self._tasks.items()}
+
+    def cancel(self) -> None:
+        """Cancel the stages that are still pending."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+
+    def critical_path(self) -> Dict[str, float]:
+        """Return wall-clock and summed stage time, and the overlap saved, in ms."""
+        if not self.timings:
+            return {"wall_ms": 0.0, "sequential_ms": 0.0, "saved_ms": 0.0}
+        wall = max(end for _, end in self.timings.values())
+        sequential = sum(end - begin for begin, end in self.timings.values())
+        return {
+            "wall_ms": wall * 1000,
+            "sequential_ms": sequential * 1000,
+            "saved_ms": max(0.0, sequential - wall) * 1000,
+        }
+
+
+class StageStats:
+    """Accumulate the timings of finished :class:`StageGraph` runs."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.counters: Dict[str, int] = {}
+        self._stage_ms: Dict[str, float] = {}
+        self._stage_runs: Dict[str, int] = {}
+        self._path_ms: Dict[str, float] = {}
+
+    def count(self, name: str) -> None:
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    def record(self, graph: StageGraph) -> None:
+        self.runs += 1
+        for name, (begin, end) in graph.timings.items():
+            self._stage_ms[name] = self._stage_ms.get(name, 0.0) + (end - begin) * 1000
+            self._stage_runs[name] = self._stage_runs.get(name, 0) + 1
+        for key, value in graph.critical_path().items():
+            self._path_ms[key] = self._path_ms.get(key, 0.0) + value
+
+    def stats(self) -> Dict[str, float]:
+        """Return run counts, counters and mean stage and critical-path times."""
+        stats: Dict[str, float] = {"runs": self.runs, **self.counters}
+        for name, total in self._stage_ms.items():
+            stats[f"{name}_ms"] = total / self._stage_runs[name]
+        for key, total in self._path_ms.items():
+            stats[key] = total / self.runs
+        return stats
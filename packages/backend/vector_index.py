@@ -0,0 +1,357 @@
+"""Construction and search helpers for the FAISS catalog indexes."""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from env import settings
+from record_store import RecordStore
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+METRICS = ("ip", "l2")
+
+VECTOR_DIR = Path(__file__).with_name("vector_store")
+# Capabilities and applications are indexed separately so each search goes
+# straight to the right catalog instead of over-fetching a shared index.
+CAPABILITY_STORE = "capabilities"
+APPLICATION_STORE = "applications"
+
+
+def _metric(metric: str) -> int:
+    if metric not in METRICS:
+        raise ValueError(f"Unknown vector metric {metric!r}; expected one of {METRICS}")
+    return faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+
+
+def _pq_subquantizers(dim: int, requested: int) -> int:
+    """Return the largest divisor of ``dim`` not above ``requested``."""
+    for m in range(min(requested, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def as_float32(vectors: np.ndarray) -> np.ndarray:
+    """Return ``vectors`` as a contiguous 2-D float32 array."""
+    array = np.asarray(vectors, dtype="float32")
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+    return np.ascontiguousarray(array)
+
+
+def prepare(index: faiss.Index, vectors: np.ndarray) -> np.ndarray:
+    """Return ``vectors`` ready to add to or search ``index``.
+
+    Inner-product indexes hold L2-normalized vectors so their scores are
+    cosine similarities; queries are normalized the same way.
+    """
+    vectors = as_float32(vectors).copy()
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(
+    embeddings: np.ndarray,
+    index_type: Optional[str] = None,
+    metric: Optional[str] = None,
+    *,
+    hnsw_m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    nlist: Optional[int] = None,
+    pq_m: Optional[int] = None,
+    pq_nbits: Optional[int] = None,
+    ids: Optional[Sequence[int]] = None,
+) -> faiss.Index:
+    """Create, train and populate a FAISS index of ``embeddings``.
+
+    ``index_type`` is one of :data:`INDEX_TYPES` and defaults to
+    ``settings.VECTOR_INDEX_TYPE``.  IVF indexes are trained on the corpus
+    itself; ``nlist`` and the PQ code size are clamped so small catalogs still
+    have enough training points.  With ``ids`` vectors are added under those
+    ids (through an ``IndexIDMap2`` for non-IVF types) and keep them across
+    :func:`update_index`.
+    """
+    index_type = (index_type or settings.VECTOR_INDEX_TYPE).lower()
+    metric_type = _metric((metric or settings.VECTOR_METRIC).lower())
+    embeddings = as_float32(embeddings)
+    n, dim = embeddings.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlat(dim, metric_type)
+    elif index_type == "hnsw":
+        m = hnsw_m if hnsw_m is not None else settings.HNSW_M
+        index = faiss.IndexHNSWFlat(dim, m, metric_type)
+        index.hnsw.efConstruction = (
+            ef_construction if ef_construction is not None else settings.HNSW_EF_CONSTRUCTION
+        )
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        lists = nlist if nlist is not None else settings.IVF_NLIST
+        if lists <= 0:
+            lists = int(4 * math.sqrt(max(n, 1)))
+        lists = max(1, min(lists, n))
+        quantizer = faiss.IndexFlat(dim, metric_type)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, lists, metric_type)
+        else:
+            m = _pq_subquantizers(dim, pq_m if pq_m is not None else settings.PQ_M)
+            nbits = pq_nbits if pq_nbits is not None else settings.PQ_NBITS
+            # Each sub-quantizer needs at least 2**nbits training points.
+            nbits = max(1, min(nbits, int(math.log2(max(n, 2)))))
+            index = faiss.IndexIVFPQ(quantizer, dim, lists, m, nbits, metric_type)
+    else:
+        raise ValueError(
+            f"Unknown vector index type {index_type!r}; expected one of {INDEX_TYPES}"
+        )
+
+    vectors = prepare(index, embeddings)
+    if not index.is_trained and n:
+        index.train(vectors)
+    if ids is not None:
+        # IVF indexes store ids natively and renumber nothing on removal;
+        # the others get an IndexIDMap2 so ids survive remove_ids.
+        if not isinstance(index, faiss.IndexIVF):
+            index = faiss.IndexIDMap2(index)
+        if n:
+            index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    elif n:
+        index.add(vectors)
+    configure_search(index)
+    return index
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """Return the index wrapped by any ID-mapping layers."""
+    while hasattr(index, "id_map"):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def supports_updates(index: faiss.Index) -> bool:
+    """Return whether vector ids in ``index`` survive :func:`update_index`."""
+    return hasattr(index, "id_map") or isinstance(index, faiss.IndexIVF)
+
+
+def index_ids(index: faiss.Index) -> np.ndarray:
+    """Return the ids of the vectors in ``index`` (positions without an id map)."""
+    if hasattr(index, "id_map"):
+        return faiss.vector_to_array(index.id_map).astype("int64")
+    if isinstance(index, faiss.IndexIVF):
+        lists = index.invlists
+        return np.concatenate(
+            [np.empty(0, dtype="int64")]
+            + [
+                faiss.rev_swig_ptr(lists.get_ids(i), lists.list_size(i)).copy()
+                for i in range(lists.nlist)
+                if lists.list_size(i)
+            ]
+        )
+    return np.arange(index.ntotal, dtype="int64")
+
+
+def update_index(
+    index: faiss.Index,
+    remove: Sequence[int],
+    embeddings: np.ndarray,
+    ids: Sequence[int],
+) -> faiss.Index:
+    """Remove the vectors ``remove`` from ``index`` and add ``embeddings``.
+
+    ``index`` must keep explicit ids (:func:`supports_updates`) and be
+    writable, i.e. not memory-mapped; it is updated in place and returned.
+    Index types without ``remove_ids`` support (HNSW) are rebuilt from their
+    stored vectors plus the new ones and the new index is returned instead.
+    """
+    if not supports_updates(index):
+        raise ValueError("Incremental updates need an index built with ids")
+    remove = np.asarray(remove, dtype="int64")
+    ids = np.asarray(ids, dtype="int64")
+    try:
+        if len(remove):
+            index.remove_ids(faiss.IDSelectorBatch(remove))
+        if len(ids):
+            index.add_with_ids(prepare(index, embeddings), ids)
+    except RuntimeError:
+        # e.g. HNSW graphs cannot delete nodes: rebuild from stored vectors.
+        kept = np.setdiff1d(index_ids(index), remove)
+        vectors = np.empty((len(kept), index.d), dtype="float32")
+        for row, key in enumerate(kept):
+            vectors[row] = index.reconstruct(int(key))
+        if len(ids):
+            vectors = np.vstack([vectors, as_float32(embeddings)])
+        base = base_index(index)
+        index_type = "hnsw" if isinstance(base, faiss.IndexHNSW) else "flat"
+        metric = "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+        return build_index(vectors, index_type, metric, ids=np.concatenate([kept, ids]))
+    return index
+
+
+def configure_search(
+    index: faiss.Index,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> faiss.Index:
+    """Apply the ``nprobe``/``efSearch`` query-time knobs to ``index``."""
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        nprobe = nprobe if nprobe is not None else settings.IVF_NPROBE
+        base.nprobe = max(1, min(nprobe, base.nlist))
+    elif isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = ef_search if ef_search is not None else settings.HNSW_EF_SEARCH
+    return index
+
+
+def _search_parameters(index: faiss.Index, ids: Sequence[int]) -> faiss.SearchParameters:
+    """Return search parameters restricting results to ``ids``.
+
+    The index-specific parameter classes carry the configured ``nprobe`` or
+    ``efSearch`` because per-call parameters override the index defaults.
+    """
+    selector = faiss.IDSelectorBatch(np.asarray(ids, dtype="int64"))
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=base.nprobe)
+    elif isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    # Keep the selector alive for as long as the parameters reference it.
+    params.selector_ref = selector
+    return params
+
+
+def search(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+    ids: Optional[Sequence[int]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Search ``index`` for the ``k`` nearest neighbours of ``queries``.
+
+    When ``ids`` is given only those vectors are considered, which applies a
+    metadata filter inside the index instead of over-fetching and filtering
+    the results.  Missing neighbours are reported as ``-1``.
+    """
+    queries = as_float32(queries)
+    k = min(k, index.ntotal if ids is None else min(index.ntotal, len(ids)))
+    if k <= 0:
+        empty = np.empty((len(queries), 0))
+        return empty.astype("float32"), empty.astype("int64")
+    if ids is None:
+        return index.search(prepare(index, queries), k)
+    return index.search(prepare(index, queries), k, params=_search_parameters(index, ids))
+
+
+def recall_at_k(baseline: np.ndarray, candidate: np.ndarray, k: int) -> float:
+    """Return the mean fraction of ``baseline`` top-``k`` ids found by ``candidate``."""
+    hits = 0
+    for truth, found in zip(baseline[:, :k], candidate[:, :k]):
+        hits += len(set(truth.tolist()) & set(found.tolist()) - {-1})
+    return hits / float(baseline[:, :k].size or 1)
+
+
+# ----------------------------------------------------------------------
+# Persistence
+
+
+def store_paths(name: str, directory: Path = VECTOR_DIR) -> Tuple[Path, Path]:
+    """Return the index and metadata paths of the vector store ``name``."""
+    return directory / f"{name}.faiss", directory / f"{name}.db"
+
+
+def catalog_store_files(directory: Path = VECTOR_DIR) -> List[Path]:
+    """Return the files of the capability and application stores."""
+    return [
+        path
+        for name in (CAPABILITY_STORE, APPLICATION_STORE)
+        for path in store_paths(name, directory)
+    ]
+
+
+def write_store(
+    name: str,
+    index: faiss.Index,
+    records: List[Dict[str, Any]],
+    directory: Path = VECTOR_DIR,
+    postings: Optional[Mapping[str, Mapping[str, Iterable[int]]]] = None,
+    positions: Optional[Sequence[int]] = None,
+) -> None:
+    """Persist ``index`` and the ``records`` it was built from (same order).
+
+    Records go to a SQLite :class:`RecordStore` together with optional
+    inverted-index ``postings`` so readers can load them one at a time;
+    ``positions`` are the records' vector ids when they are not ``0..n-1``.
+    Both files are written to temporary paths and renamed into place, so
+    processes that have the old files memory-mapped keep a consistent view.
+    """
+    index_path, meta_path = store_paths(name, directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_name(index_path.name + ".tmp")
+    with tmp.open("wb") as fh:
+        faiss.write_index(index, faiss.PyCallbackIOWriter(fh.write))
+    tmp.replace(index_path)
+    RecordStore.write(meta_path, records, postings, positions)
+
+
+def _read_flags(mmap: bool) -> List[int]:
+    """Return the ``read_index`` flags to try, most memory-sharing first."""
+    if not mmap:
+        return [0]
+    mmap_flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+    # IO_FLAG_MMAP_IFC (FAISS >= 1.8) maps flat vector codes too, but IVF
+    # lists can only be mapped by the plain IO_FLAG_MMAP reader.
+    flags = [mmap_flags | getattr(faiss, "IO_FLAG_MMAP_IFC", 0), mmap_flags, 0]
+    return list(dict.fromkeys(flags))
+
+
+def _read_index(path: Path, mmap: bool) -> faiss.Index:
+    error: Optional[RuntimeError] = None
+    for flags in _read_flags(mmap):
+        try:
+            return faiss.read_index(str(path), flags)
+        except RuntimeError as exc:
+            error = exc
+    raise error  # type: ignore[misc]
+
+
+def read_store(
+    name: str, directory: Path = VECTOR_DIR, mmap: Optional[bool] = None
+) -> Tuple[faiss.Index, RecordStore]:
+    """Open the vector store ``name`` written by :func:`write_store`.
+
+    With ``mmap`` (default ``settings.VECTOR_INDEX_MMAP``) the index is
+    memory-mapped read-only, so worker processes share its pages through the
+    OS page cache instead of each holding a private copy.  Records are read
+    lazily from the returned :class:`RecordStore`.
+    """
+    index_path, meta_path = store_paths(name, directory)
+    mmap = settings.VECTOR_INDEX_MMAP if mmap is None else mmap
+    index = configure_search(_read_index(index_path, mmap))
+    records = RecordStore(meta_path)
+    if len(records) != index.ntotal:
+        records.close()
+        raise ValueError(f"Metadata for vector store {name!r} does not match its index")
+    return index, records
+
+
+def warm_files(paths: Iterable[Path]) -> int:
+    """Read ``paths`` sequentially so their pages are in the OS page cache.
+
+    Returns the number of bytes read.  Memory-mapped indexes and lazily read
+    records then avoid page faults on the first queries.
+    """
+    total = 0
+    for path in paths:
+        if path.exists():
+            with path.open("rb") as fh:
+                while True:
+                    chunk = fh.read(1 << 20)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+    return total
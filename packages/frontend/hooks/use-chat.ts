@@ -12,6 +12,8 @@ export function useChat() {
   const [messages, setMessages] = useState<Message[]>([])
   const [input, setInput] = useState("")
   const [isLoading, setIsLoading] = useState(false)
+  // Groups this conversation's turns in the backend's session history.
+  const [sessionId] = useState(() => crypto.randomUUID())
 
   const handleInputChange = useCallback((e: React.ChangeEvent<HTMLInputElement>) => {
     setInput(e.target.value)
@@ -33,7 +35,7 @@ export function useChat() {
       const res = await fetch(`${apiUrl}/ask`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ question }),
+        body: JSON.stringify({ question, session_id: sessionId }),
       })
       const data = await res.json()
       const assistantMessage: Message = {
@@ -53,7 +55,7 @@ export function useChat() {
     } finally {
       setIsLoading(false)
     }
-  }, [input])
+  }, [input, sessionId])
 
   const queryHistory = messages
     .filter((m) => m.role === "user")
@@ -0,0 +1,224 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from abacus_client import AbacusClient  # type: ignore  # noqa: E402
+from load_embeddings import embed_records  # type: ignore  # noqa: E402
+from odata_stream import ODataStream  # type: ignore  # noqa: E402
+
+RECORDS = [{"id": f"app{i:02d}", "description": f"Application {i} é"} for i in range(23)]
+
+
+class FakeOData:
+    """OData collection served with ``$skip``/``$top`` or server-driven paging."""
+
+    def __init__(self, count=True, server_page=None, failures=0, unstable=False):
+        self.count = count
+        self.server_page = server_page
+        self.failures = failures
+        self.unstable = unstable
+        self.requests = []
+
+    def handle(self, handler):
+        url = urlparse(handler.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.requests.append(query)
+        length = int(handler.headers.get("Content-Length") or 0)
+        payload = json.loads(handler.rfile.read(length)) if length else None
+        if self.failures:
+            self.failures -= 1
+            handler.send_response(503)
+            handler.send_header("Retry-After", "0")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        if payload is not None:
+            body = {"response": payload["plan"]}
+        elif url.path.endswith("/status"):
+            body = {"response": "ok"}
+        else:
+            records = RECORDS
+            if self.unstable:
+                # No inherent order: every request sees the rows rotated.
+                shift = len(self.requests) % len(RECORDS)
+                records = records[shift:] + records[:shift]
+            if query.get("$orderby"):
+                key = query["$orderby"].split(",")[-1]
+                records = sorted(records, key=lambda r: r[key])
+            skip = int(query.get("$skip", 0))
+            top = int(query.get("$top", len(RECORDS)))
+            if self.server_page:
+                top = min(top, self.server_page)
+            body = {"value": records[skip : skip + top]}
+            if self.count and query.get("$count") == "true":
+                body["@odata.count"] = len(RECORDS)
+            if self.server_page and skip + top < len(RECORDS):
+                body["@odata.nextLink"] = (
+                    f"http://{handler.headers['Host']}{url.path}?$skip={skip + top}"
+                )
+        data = json.dumps(body).encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(service):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                service.handle(self)
+
+            def do_POST(self):
+                service.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _client(url, **kwargs):
+    kwargs.setdefault("page_size", 5)
+    kwargs.setdefault("concurrency", 3)
+    client = AbacusClient(url, "secret", timeout=5, backoff=0, **kwargs)
+    client.chunk_size = 7  # split records and multi-byte characters
+    return client
+
+
+def test_odata_stream_parses_records_across_chunks():
+    body = json.dumps({"@odata.count": 2, "value": [{"a": 1.5}, {"b": "é"}], "x": [1]})
+    data = body.encode("utf-8")
+    for size in (1, 2, 5, len(data)):
+        stream = ODataStream(data[i : i + size] for i in range(0, len(data), size))
+        assert list(stream.records()) == [{"a": 1.5}, {"b": "é"}]
+        assert stream.meta == {"@odata.count": 2, "x": [1]}
+        assert stream.has_value
+
+
+def test_skip_pages_are_fetched_concurrently_in_order(serve):
+    service = FakeOData()
+    client = _client(serve(service))
+
+    assert list(client.iter_records("applications", {"$select": "id,description"})) == RECORDS
+    skips = sorted(int(q.get("$skip", 0)) for q in service.requests)
+    assert skips == [0, 5, 10, 15, 20]
+    assert all(q["$select"] == "id,description" for q in service.requests)
+    assert all(q["$orderby"] == "id" for q in service.requests)
+
+
+def test_skip_pages_are_stably_ordered(serve):
+    service = FakeOData(unstable=True)
+    assert _client(serve(service)).query_data("applications") == RECORDS
+
+    service = FakeOData(unstable=True)
+    records = _client(serve(service)).query_data(
+        "applications", {"$orderby": "description desc"}
+    )
+    assert sorted(r["id"] for r in records) == [r["id"] for r in RECORDS]
+    assert {q["$orderby"] for q in service.requests} == {"description desc,id"}
+
+
+def test_unorderable_queries_follow_next_links(serve):
+    service = FakeOData(server_page=10)
+    assert _client(serve(service), order_by="").query_data("applications") == RECORDS
+    assert [int(q.get("$skip", 0)) for q in service.requests] == [0, 10, 20]
+    assert not any("$top" in q or "$orderby" in q for q in service.requests)
+
+
+def test_next_links_are_followed_without_count(serve):
+    service = FakeOData(count=False, server_page=4)
+    client = _client(serve(service))
+
+    assert client.query_data("applications") == RECORDS
+    assert len(service.requests) == 6
+    assert client.query_data("status") == {"response": "ok"}
+
+
+def test_server_truncated_pages_fall_back_to_next_links(serve):
+    service = FakeOData(server_page=4)
+    assert _client(serve(service)).query_data("applications") == RECORDS
+    assert [int(q.get("$skip", 0)) for q in service.requests] == [0, 4, 8, 12, 16, 20]
+
+
+def test_transient_errors_are_retried(serve):
+    service = FakeOData(failures=2)
+    assert _client(serve(service), max_retries=3).query_data("applications") == RECORDS
+
+    service = FakeOData(failures=3)
+    with pytest.raises(RuntimeError):
+        _client(serve(service), max_retries=1).query_data("applications")
+
+
+def test_embed_records_batches_streamed_records(serve):
+    batches = []
+
+    def encode(texts):
+        batches.append(len(texts))
+        return np.ones((len(texts), 3))
+
+    records, embeddings = embed_records(
+        _client(serve(FakeOData())).iter_records("applications"), encode, batch_size=10
+    )
+    assert records == RECORDS
+    assert embeddings.shape == (23, 3) and embeddings.dtype == np.float32
+    assert batches == [10, 10, 3]
+
+
+def test_plan_queries_are_retried_by_one_layer_only(monkeypatch):
+    import socket
+
+    import urllib3.connection
+
+    with socket.socket() as sock:  # a port nothing listens on
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    attempts = []
+    new_conn = urllib3.connection.HTTPConnection._new_conn
+
+    def counting(self):
+        attempts.append(1)
+        return new_conn(self)
+
+    monkeypatch.setattr(urllib3.connection.HTTPConnection, "_new_conn", counting)
+    client = _client(f"http://127.0.0.1:{port}", max_retries=2)
+    with pytest.raises(RuntimeError):
+        client.query("list apps")
+    assert len(attempts) == 3  # not (2 + 1) * (2 + 1) with adapter retries
+
+
+def test_plan_queries_use_the_pooled_session(serve, monkeypatch):
+    import abacus_client  # type: ignore
+
+    def unpooled(*args, **kwargs):
+        raise AssertionError("plan query bypassed the session")
+
+    monkeypatch.setattr(abacus_client.requests, "post", unpooled)
+    service = FakeOData(failures=1)
+    client = _client(serve(service), max_retries=2)
+    assert client.query("list apps") == "list apps"
+    assert len(service.requests) == 2  # the 503 is retried once, not per layer
@@ -0,0 +1,96 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from admission import ConcurrencyLimiter, Overloaded, RateLimiter  # type: ignore  # noqa: E402
+
+
+def test_limiter_queues_hands_over_slots_and_sheds_excess():
+    limiter = ConcurrencyLimiter(1, queue_size=1, timeout=1.0, name="requests")
+    order = []
+
+    async def hold(name, seconds):
+        async with limiter.slot():
+            order.append(name)
+            await asyncio.sleep(seconds)
+
+    async def scenario():
+        first = asyncio.ensure_future(hold("first", 0.05))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(hold("second", 0))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as shed:
+            await limiter.acquire()
+        await asyncio.gather(first, second)
+        return shed.value
+
+    shed = asyncio.run(scenario())
+
+    assert order == ["first", "second"]
+    assert shed.status_code == 503 and shed.retry_after >= 1
+    assert limiter.stats() == {
+        "limit": 1,
+        "active": 0,
+        "waiting": 0,
+        "admitted": 2,
+        "queued": 1,
+        "rejected": 1,
+        "timed_out": 0,
+    }
+
+
+def test_limiter_waiters_time_out_or_cancel_without_leaking_slots():
+    limiter = ConcurrencyLimiter(1, queue_size=2, timeout=0.02)
+
+    async def scenario():
+        await limiter.acquire()
+        with pytest.raises(Overloaded):
+            await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        await asyncio.wait_for(limiter.acquire(), 0.1)
+        limiter.release()
+
+    asyncio.run(scenario())
+
+    assert limiter.active == 0
+    assert limiter.timed_out == 1
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_rate_limiter_refills_tokens_per_client():
+    limiter = RateLimiter(rate=1.0, burst=2)
+
+    limiter.check("a", now=0.0)
+    limiter.check("a", now=0.0)
+    with pytest.raises(Overloaded) as limited:
+        limiter.check("a", now=0.5)
+    limiter.check("b", now=0.5)
+    limiter.check("a", now=1.0)
+
+    assert limited.value.status_code == 429
+    assert limited.value.retry_after == pytest.approx(0.5)
+    assert limiter.stats() == {"clients": 2, "limited": 1}
+
+
+def test_disabled_limiters_admit_everything():
+    limiter = ConcurrencyLimiter(0)
+    rate = RateLimiter(rate=0, burst=1)
+
+    async def scenario():
+        for _ in range(100):
+            await limiter.acquire()
+            rate.check("a")
+
+    asyncio.run(scenario())
+    assert limiter.active == 0
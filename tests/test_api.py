@@ -1,6 +1,9 @@
+import json
 import sys
+from collections import OrderedDict
 from pathlib import Path
 
+import anyio
 import pytest
 from httpx import AsyncClient
 
@@ -10,6 +13,8 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
 import main as backend_main  # type: ignore  # noqa: E402
+import metrics  # type: ignore  # noqa: E402
+from sqlite_memory import MessagePage  # type: ignore  # noqa: E402
 
 
 @pytest.mark.anyio
@@ -23,11 +28,176 @@ async def test_read_root():
 @pytest.mark.anyio
 async def test_ask_endpoint(monkeypatch):
     class DummyOrchestrator:
-        async def run(self, question: str) -> str:
+        async def run(self, question: str, session_id: str = "") -> str:
+            assert session_id == "s1"
             return "dummy answer"
 
     monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
     async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
-        resp = await client.post("/ask", json={"question": "test"})
+        resp = await client.post("/ask", json={"question": "test", "session_id": "s1"})
     assert resp.status_code == 200
-    assert resp.json() == {"answer": "dummy answer"}
+    assert resp.json() == {"answer": "dummy answer", "session_id": "s1"}
+
+
+@pytest.mark.anyio
+async def test_ask_stream_endpoint(monkeypatch):
+    class DummyOrchestrator:
+        async def run_stream(self, question: str, session_id: str = ""):
+            yield {"event": "stage", "stage": "capability", "capability_id": "cap1"}
+            yield {"event": "token", "stage": "synthesizer", "text": "dummy"}
+            yield {"event": "done", "answer": "dummy"}
+
+    monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
+    async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
+        resp = await client.post("/ask/stream", json={"question": "test", "session_id": "s1"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in resp.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert [e["event"] for e in events] == ["session", "stage", "token", "done"]
+    assert events[0]["session_id"] == "s1"
+    assert events[-1]["answer"] == "dummy"
+
+
+@pytest.mark.anyio
+async def test_ask_without_a_session_id_starts_a_new_session(monkeypatch):
+    sessions = []
+
+    class DummyOrchestrator:
+        async def run(self, question: str, session_id: str = "") -> str:
+            sessions.append(session_id)
+            return "dummy answer"
+
+        async def run_stream(self, question: str, session_id: str = ""):
+            sessions.append(session_id)
+            yield {"event": "done", "answer": "dummy"}
+
+    monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
+    async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
+        first = await client.post("/ask", json={"question": "test"})
+        second = await client.post("/ask", json={"question": "test"})
+        stream = await client.post("/ask/stream", json={"question": "test"})
+        blank = await client.post("/ask/stream", json={"question": "test", "session_id": " "})
+
+    assert first.json()["session_id"] == sessions[0]
+    assert second.json()["session_id"] == sessions[1] != sessions[0]
+    session_event = json.loads(stream.text.split("data: ", 1)[1].split("\n", 1)[0])
+    assert session_event == {"event": "session", "session_id": sessions[2]}
+    assert all(sessions) and len(set(sessions)) == 3
+    assert blank.status_code == 422
+
+
+@pytest.mark.anyio
+async def test_session_messages_endpoint(monkeypatch):
+    class DummyOrchestrator:
+        async def history(self, session_id, cursor, limit):
+            assert (session_id, cursor, limit) == ("s1", 4, 200)
+            return MessagePage([{"id": 5, "content": "hi"}], 5)
+
+    monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
+    params = {"cursor": 4, "limit": 500}
+    async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
+        monkeypatch.setattr(backend_main.settings, "SESSION_HISTORY_API_KEY", "")
+        disabled = await client.get("/sessions/s1/messages", params=params)
+        monkeypatch.setattr(backend_main.settings, "SESSION_HISTORY_API_KEY", "secret")
+        anonymous = await client.get("/sessions/s1/messages", params=params)
+        wrong = await client.get(
+            "/sessions/s1/messages", params=params, headers={"Authorization": "Bearer nope"}
+        )
+        resp = await client.get(
+            "/sessions/s1/messages", params=params, headers={"Authorization": "Bearer secret"}
+        )
+    assert disabled.status_code == 404
+    assert anonymous.status_code == wrong.status_code == 401
+    assert resp.status_code == 200
+    assert resp.json() == {"messages": [{"id": 5, "content": "hi"}], "next_cursor": 5}
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint_and_timing_header(monkeypatch):
+    class DummyOrchestrator:
+        async def run(self, question: str, session_id: str = "") -> str:
+            metrics.observe_stage("plan", 0.25)
+            return "dummy answer"
+
+    monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
+    monkeypatch.setattr(backend_main.settings, "METRICS_TIMING_HEADER", True)
+    async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
+        resp = await client.post("/ask", json={"question": "test", "session_id": "s1"})
+        assert resp.headers["server-timing"].startswith("plan;dur=250.0, total;dur=")
+        resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'orchestrator_stage_seconds_count{stage="plan"}' in resp.text
+    assert 'http_request_duration_seconds_count{handler="ask_question",status="200"}' in resp.text
+    assert "http_requests_in_flight 1" in resp.text
+
+
+@pytest.mark.anyio
+async def test_ask_sheds_load_beyond_the_concurrency_limit(monkeypatch):
+    started, release = anyio.Event(), anyio.Event()
+
+    class DummyOrchestrator:
+        async def run(self, question: str, session_id: str = "") -> str:
+            started.set()
+            await release.wait()
+            return "dummy answer"
+
+    monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
+    monkeypatch.setattr(backend_main.ask_limiter, "limit", 1)
+    monkeypatch.setattr(backend_main.ask_limiter, "queue_size", 0)
+    responses = []
+
+    async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
+
+        async def ask():
+            responses.append(await client.post("/ask", json={"question": "test", "session_id": "s1"}))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(ask)
+            await started.wait()
+            await ask()
+            release.set()
+
+    shed, served = responses
+    assert shed.status_code == 503
+    assert int(shed.headers["retry-after"]) >= 1
+    assert served.status_code == 200
+    assert backend_main.ask_limiter.active == 0
+
+
+@pytest.mark.anyio
+async def test_ask_rate_limits_each_client(monkeypatch):
+    class DummyOrchestrator:
+        async def run(self, question: str, session_id: str = "") -> str:
+            return "dummy answer"
+
+    monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
+    monkeypatch.setattr(backend_main.rate_limiter, "rate", 1 / 60)
+    monkeypatch.setattr(backend_main.rate_limiter, "burst", 1)
+    monkeypatch.setattr(backend_main.rate_limiter, "_buckets", OrderedDict())
+    async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
+        first = await client.post("/ask", json={"question": "test", "session_id": "s1"})
+        second = await client.post("/ask", json={"question": "test", "session_id": "s1"})
+        root = await client.get("/")
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert 55 <= int(second.headers["retry-after"]) <= 60
+    assert root.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_ask_returns_503_when_bedrock_calls_are_saturated(monkeypatch):
+    class DummyOrchestrator:
+        async def run(self, question: str, session_id: str = "") -> str:
+            raise backend_main.Overloaded("Too many concurrent llm_calls", 503, 2.5)
+
+    monkeypatch.setattr(backend_main, "Orchestrator", DummyOrchestrator)
+    async with AsyncClient(app=backend_main.app, base_url="http://test") as client:
+        resp = await client.post("/ask", json={"question": "test", "session_id": "s1"})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "3"
+    assert resp.json() == {"detail": "Too many concurrent llm_calls"}
@@ -1,6 +1,13 @@
+import asyncio
+import json
 import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
+import httpx
+import pytest
+
 # Ensure backend modules can be imported
 BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
 if str(BACKEND_DIR) not in sys.path:
@@ -52,3 +59,108 @@ def test_request_disables_proxies(monkeypatch):
     monkeypatch.setattr(bedrock_adapter.requests, "post", fake_post)
     adapter._request({})
     assert captured["proxies"] == {"http": None, "https": None}
+
+
+def test_acreate_uses_shared_pool(monkeypatch):
+    first = bedrock_adapter.BedrockAdapter(
+        api_base="http://bedrock", api_key="key", model_id="model", http2=False
+    )
+    second = bedrock_adapter.BedrockAdapter(
+        api_base="http://bedrock", api_key="key", model_id="model", http2=False
+    )
+
+    captured = {}
+
+    async def fake_post(url, headers=None, json=None, timeout=None):
+        captured.setdefault("payloads", []).append(json)
+        return httpx.Response(
+            200,
+            json={"choices": [{"message": {"content": "ok"}}]},
+            request=httpx.Request("POST", url),
+        )
+
+    async def run():
+        pool = first._async_pool()
+        monkeypatch.setattr(pool.client, "post", fake_post)
+        assert second._async_pool() is pool
+        resp = await second.acreate("model", [{"role": "user", "content": "hi"}])
+        await bedrock_adapter.BedrockAdapter.aclose()
+        return resp
+
+    resp = asyncio.run(run())
+
+    assert resp["choices"][0]["message"]["content"] == "ok"
+    assert captured["payloads"][0]["model"] == "model"
+    assert not bedrock_adapter.BedrockAdapter._async_pools
+
+
+def test_acreate_retries_server_errors_then_reports_unavailable(monkeypatch):
+    monkeypatch.setattr(bedrock_adapter.settings, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(bedrock_adapter.settings, "RETRY_MAX_DELAY", 0.0)
+    adapter = bedrock_adapter.BedrockAdapter(
+        api_base="http://bedrock-retry", api_key="key", model_id="model", http2=False, max_retries=2
+    )
+    statuses = [503, 429, 200, 500, 500, 500]
+
+    async def fake_post(url, headers=None, json=None, timeout=None):
+        status = statuses.pop(0)
+        body = {"choices": [{"message": {"content": "ok"}}]} if status == 200 else {}
+        return httpx.Response(status, json=body, request=httpx.Request("POST", url))
+
+    async def run():
+        monkeypatch.setattr(adapter._async_pool().client, "post", fake_post)
+        try:
+            resp = await adapter.acreate("model", [{"role": "user", "content": "hi"}])
+            with pytest.raises(bedrock_adapter.resilience.UpstreamUnavailable):
+                await adapter.acreate("model", [{"role": "user", "content": "hi"}])
+        finally:
+            await bedrock_adapter.BedrockAdapter.aclose()
+        return resp
+
+    assert asyncio.run(run())["choices"][0]["message"]["content"] == "ok"
+    assert statuses == []
+    assert adapter._breaker().failures == 3
+
+
+class _StreamingStub(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible server emitting ``stream: true`` chunks."""
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        assert body["stream"] is True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for token in ["Hel", "lo", "!"]:
+            chunk = {"choices": [{"delta": {"content": token}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_astream_consumes_chunks_from_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StreamingStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    adapter = bedrock_adapter.BedrockAdapter(
+        api_base=f"http://127.0.0.1:{server.server_address[1]}",
+        api_key="key",
+        model_id="model",
+        http2=False,
+    )
+
+    async def run():
+        tokens = [
+            t async for t in adapter.astream("model", [{"role": "user", "content": "hi"}])
+        ]
+        await bedrock_adapter.BedrockAdapter.aclose()
+        return tokens
+
+    try:
+        assert asyncio.run(run()) == ["Hel", "lo", "!"]
+    finally:
+        server.shutdown()
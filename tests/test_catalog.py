@@ -0,0 +1,106 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import catalog  # type: ignore  # noqa: E402
+from record_store import RecordStore  # type: ignore  # noqa: E402
+
+
+def _catalog():
+    return catalog.Catalog(
+        [
+            {"id": "cap1", "name": "Amazon S3", "category": "storage", "description": "x"},
+            {"id": "cap2", "name": "AWS", "category": "cloud", "description": "y"},
+        ],
+        [
+            {"id": "app1", "name": "Portal", "description": "Web", "technologies": ["React", "AWS"]},
+            {"id": "app2", "name": "Archive", "description": "Stores files in Amazon S3", "technologies": []},
+            {"id": "app3", "name": "Claims", "description": "Claims", "technologies": ["Java"]},
+        ],
+    )
+
+
+def test_lookups_by_id_and_position():
+    cat = _catalog()
+    assert cat.capability("cap2").name == "AWS"
+    assert cat.application("app3").technologies == ("Java",)
+    assert cat.application_at(1).id == "app2"
+    assert cat.application("missing") is None
+    assert cat.application_at(7) is None
+
+
+def test_technology_and_capability_indexes():
+    cat = _catalog()
+    assert list(cat.applications_with_technology("aws")) == [0]
+    assert cat.applications_for_capability(cat.capability("cap1")) == [1]
+    assert cat.applications_for_capability(cat.capability("cap2")) == [0]
+
+
+def test_capability_matching_uses_whole_words():
+    cat = catalog.Catalog(
+        [
+            {"id": "ai", "name": "AI", "category": "ml", "description": ""},
+            {"id": "s3", "name": "Amazon S3", "category": "storage", "description": ""},
+        ],
+        [
+            {"id": "mail", "name": "Mail", "description": "Email gateway", "technologies": ["Mailchimp"]},
+            {"id": "bot", "name": "Bot", "description": "Chat bot using AI.", "technologies": []},
+            {"id": "docs", "name": "Docs", "description": "Amazon hosted", "technologies": ["S3"]},
+            {"id": "s3x", "name": "S3X", "description": "Amazon S3X clone", "technologies": []},
+        ],
+    )
+    assert cat.applications_for_capability(cat.capability("ai")) == [1]
+    # Words may come from the technologies, but "S3X" does not contain "S3".
+    assert cat.applications_for_capability(cat.capability("s3")) == [2]
+
+
+def test_records_use_slots():
+    app = _catalog().application("app1")
+    with pytest.raises(AttributeError):
+        app.extra = 1
+    assert app.to_dict()["technologies"] == ["React", "AWS"]
+
+
+def test_lazy_catalog_matches_eager_catalog(tmp_path):
+    eager = _catalog()
+    caps = [c.to_dict() for c in eager.capabilities]
+    apps = [a.to_dict() for a in eager.applications]
+    RecordStore.write(tmp_path / "caps.db", caps)
+    RecordStore.write(
+        tmp_path / "apps.db", apps, catalog.application_postings(eager.applications)
+    )
+    lazy = catalog.LazyCatalog(
+        RecordStore(tmp_path / "caps.db"), RecordStore(tmp_path / "apps.db")
+    )
+
+    assert len(lazy.applications) == 3
+    assert lazy.capability("cap2").name == "AWS"
+    assert lazy.application("app3").technologies == ("Java",)
+    assert lazy.application_at(1).id == "app2"
+    assert lazy.application("missing") is None
+    assert list(lazy.applications_with_technology("aws")) == [0]
+    assert lazy.applications_for_capability(lazy.capability("cap1")) == [1]
+    assert [a.id for a in lazy.applications] == ["app1", "app2", "app3"]
+
+
+def test_record_store_positions_with_gaps(tmp_path):
+    records = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    RecordStore.write(tmp_path / "apps.db", records, positions=[0, 4, 9])
+    store = RecordStore(tmp_path / "apps.db")
+
+    assert len(store) == 3
+    assert store[4] == {"id": "b"}
+    with pytest.raises(IndexError):
+        store[1]
+    with pytest.raises(IndexError):
+        store[-1]  # would have read pos 2, a gap, instead of the last record
+    lazy = catalog.LazyCatalog(RecordStore(tmp_path / "apps.db"), store)
+    assert lazy.application_at(9).id == "c"
+    assert lazy.application_at(-1) is None
+    with pytest.raises(IndexError):
+        lazy.applications[-1]
@@ -0,0 +1,226 @@
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import catalog_sync  # type: ignore  # noqa: E402
+import orchestrator as orch_module  # type: ignore  # noqa: E402
+import vector_index  # type: ignore  # noqa: E402
+
+WORDS = ["storage", "queue", "database", "search", "portal", "claims", "billing", "java"]
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        out = np.zeros((len(texts), len(WORDS)), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.split():
+                if word in WORDS:
+                    out[row, WORDS.index(word)] = 1.0
+        out[:, 0] += 0.01  # keep every vector non-zero
+        return out
+
+
+class FakeClient:
+    def __init__(self, catalogs):
+        self.catalogs = catalogs
+        self.params = []
+
+    def query_data(self, endpoint, params=None):
+        self.params.append((endpoint, params))
+        records = self.catalogs[endpoint]
+        if params and "$select" in params:
+            return [{"id": r["id"]} for r in records]
+        if params and "$filter" in params:
+            return [r for r in records if r.get("modified")]
+        return records
+
+
+def _app(app_id, description, **extra):
+    return {"id": app_id, "name": app_id, "description": description, "technologies": [], **extra}
+
+
+def test_plan_sync_keeps_positions_and_embeds_only_changes():
+    current = [(0, _app("a", "storage")), (1, _app("b", "queue")), (2, _app("c", "search"))]
+    fetched = [_app("a", "storage"), _app("b", "database"), _app("d", "portal")]
+
+    plan = catalog_sync.plan_sync(current, fetched)
+
+    assert plan.positions == [0, 1, 3]
+    assert plan.embed_positions == [1, 3]
+    assert plan.embed_texts == ["database", "portal"]
+    assert sorted(plan.remove) == [1, 2]
+    assert plan.stats == {"added": 1, "updated": 1, "removed": 1, "unchanged": 1}
+
+
+def test_sync_store_updates_index_incrementally(tmp_path):
+    encode = CountingEncoder()
+    name = vector_index.APPLICATION_STORE
+    first = [_app("a", "storage"), _app("b", "queue"), _app("c", "search")]
+    result = catalog_sync.sync_store(name, first, encode, tmp_path)
+    assert result.changed and result.stats["added"] == 3
+
+    encode.encoded.clear()
+    second = [_app("a", "storage", name="Renamed"), _app("b", "database"), _app("d", "portal")]
+    result = catalog_sync.sync_store(name, second, encode, tmp_path)
+
+    assert encode.encoded == ["database", "portal"]
+    assert result.stats == {"added": 1, "updated": 2, "removed": 1, "unchanged": 0}
+    assert result.records[0]["name"] == "Renamed"
+    assert result.records.position("d") == 3
+    _, ids = vector_index.search(result.index, encode(["database"]), 1)
+    assert ids[0, 0] == 1
+    assert sorted(vector_index.index_ids(result.index)) == [0, 1, 3]
+
+    encode.encoded.clear()
+    result = catalog_sync.sync_store(name, second, encode, tmp_path)
+    assert not result.changed and encode.encoded == []
+
+
+def test_delta_sync_uses_odata_filter_and_detects_deletions(tmp_path):
+    caps = [{"id": "cap1", "name": "Storage", "category": "c", "description": "storage"}]
+    apps = [_app("a", "storage"), _app("b", "queue")]
+    client = FakeClient({"capabilities": caps, "applications": apps})
+    encode = CountingEncoder()
+    catalog_sync.sync_catalog(client, encode, tmp_path, modified_field="modifiedOn")
+
+    client.catalogs["applications"] = [_app("a", "claims", modified=True)]
+    client.params.clear()
+    encode.encoded.clear()
+    results = catalog_sync.sync_catalog(client, encode, tmp_path, modified_field="modifiedOn")
+
+    filters = [p["$filter"] for _, p in client.params if p and "$filter" in p]
+    assert filters and all(f.startswith("modifiedOn gt ") for f in filters)
+    assert encode.encoded == ["claims"]
+    assert results["applications"].stats == {"added": 0, "updated": 1, "removed": 1, "unchanged": 0}
+    assert not results["capabilities"].changed
+
+
+def test_failed_sync_records_the_stores_it_already_wrote(tmp_path):
+    caps = [{"id": "cap1", "name": "Storage", "category": "c", "description": "storage"}]
+    client = FakeClient({"capabilities": caps, "applications": [_app("a", "storage")]})
+    encode = CountingEncoder()
+    catalog_sync.sync_catalog(client, encode, tmp_path, modified_field="modifiedOn")
+    before = catalog_sync._load_state(tmp_path)
+
+    client.catalogs["capabilities"] = [dict(caps[0], description="queue", modified=True)]
+    client.catalogs["applications"] = None  # the applications fetch fails
+    with pytest.raises(TypeError):
+        catalog_sync.sync_catalog(client, encode, tmp_path, modified_field="modifiedOn")
+
+    state = catalog_sync._load_state(tmp_path)
+    assert state["generation"] == before["generation"] + 1
+    assert state["capabilities"] >= before["capabilities"]
+    assert state["applications"] == before["applications"]
+    assert state["synced_at"] == before["synced_at"]
+
+
+def test_orchestrator_swaps_synced_catalog(tmp_path, monkeypatch):
+    caps = [{"id": "cap1", "name": "Storage", "category": "c", "description": "storage"}]
+    client = FakeClient({"capabilities": caps, "applications": [_app("a", "storage")]})
+    real_sync = catalog_sync.sync_catalog
+    monkeypatch.setattr(
+        catalog_sync,
+        "sync_catalog",
+        lambda client, encode, **kwargs: real_sync(
+            client, encode, tmp_path, modified_field="", **kwargs
+        ),
+    )
+
+    for attr in ("_capability_index", "_application_index", "_catalog"):
+        monkeypatch.setattr(orch_module.Orchestrator, attr, None)
+
+    orch = object.__new__(orch_module.Orchestrator)
+    orch.client = client
+    orch._encode = CountingEncoder()
+    orch.embedding_cache = None
+    orch.response_cache = None
+    orch.capability_index = orch.application_index = orch.catalog = None
+
+    stats = asyncio.run(orch.sync_catalog())
+
+    assert stats["applications"]["added"] == 1
+    assert orch.catalog.application("a").description == "storage"
+    assert orch.application_index.ntotal == 1
+    assert orch_module.Orchestrator._catalog is orch.catalog
+
+
+def test_recent_sync_by_another_worker_is_reloaded_not_refetched(tmp_path):
+    caps = [{"id": "cap1", "name": "Storage", "category": "c", "description": "storage"}]
+    client = FakeClient({"capabilities": caps, "applications": [_app("a", "storage")]})
+    encode = CountingEncoder()
+    first = catalog_sync.sync_catalog(client, encode, tmp_path, modified_field="")
+    assert catalog_sync.generation(tmp_path) == first["applications"].generation == 1
+
+    client.params.clear()
+    results = catalog_sync.sync_catalog(
+        client, encode, tmp_path, modified_field="", min_interval=60, loaded_generation=0
+    )
+    assert client.params == []
+    assert all(result.changed for result in results.values())
+    assert results["applications"].records.position("a") == 0
+
+    current = catalog_sync.sync_catalog(
+        client, encode, tmp_path, modified_field="", min_interval=60, loaded_generation=1
+    )
+    assert not any(result.changed or result.records for result in current.values())
+    for result in (*first.values(), *results.values()):
+        result.records.close()
+
+
+def test_orchestrator_keeps_unchanged_store_and_retires_replaced_one(tmp_path, monkeypatch):
+    caps = [{"id": "cap1", "name": "Storage", "category": "c", "description": "storage"}]
+    client = FakeClient({"capabilities": caps, "applications": [_app("a", "storage")]})
+    encode = CountingEncoder()
+    results = catalog_sync.sync_catalog(client, encode, tmp_path, modified_field="")
+    real_sync = catalog_sync.sync_catalog
+    monkeypatch.setattr(
+        catalog_sync,
+        "sync_catalog",
+        lambda client, encode, **kwargs: real_sync(
+            client, encode, tmp_path, modified_field="", **kwargs
+        ),
+    )
+    for attr in ("_capability_index", "_application_index", "_catalog"):
+        monkeypatch.setattr(orch_module.Orchestrator, attr, None)
+    monkeypatch.setattr(orch_module.Orchestrator, "_catalog_generation", 1)
+    monkeypatch.setattr(orch_module.Orchestrator, "catalog_retire_delay", 0)
+
+    caps_result, apps_result = results["capabilities"], results["applications"]
+    orch = object.__new__(orch_module.Orchestrator)
+    orch.client = client
+    orch._encode = encode
+    orch.embedding_cache = None
+    orch.response_cache = None
+    orch.capability_index = caps_result.index
+    orch.application_index = apps_result.index
+    orch.catalog = orch_module.LazyCatalog(caps_result.records, apps_result.records)
+
+    client.catalogs["applications"] = [_app("a", "storage"), _app("b", "queue")]
+
+    async def sync_and_wait():
+        stats = await orch.sync_catalog()
+        await asyncio.sleep(0.01)
+        return stats
+
+    stats = asyncio.run(sync_and_wait())
+
+    assert stats["applications"]["added"] == 1
+    assert orch.capability_index is caps_result.index
+    assert orch.catalog.capability_store is caps_result.records
+    assert orch.catalog.application("b") is not None
+    assert orch_module.Orchestrator._catalog_generation == 2
+    with pytest.raises(sqlite3.ProgrammingError):
+        apps_result.records.position("a")  # the replaced store was closed
+    orch.catalog.close()
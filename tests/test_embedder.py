@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import embedder  # type: ignore  # noqa: E402
+
+TEXTS = [
+    "object storage in the cloud",
+    "a message queue",
+    "search index api for data",
+    "database",
+]
+
+
+def _tiny_sentence_model(directory: Path):
+    """Build a small random BERT sentence model without downloading anything."""
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    st = pytest.importorskip("sentence_transformers")
+    models = pytest.importorskip("sentence_transformers.models")
+
+    words = "the a of to and is for in storage object cloud database queue message search index api data"
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words.split()
+    (directory / "vocab.txt").write_text("\n".join(vocab))
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(directory / "vocab.txt"))
+    config = transformers.BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=64,
+        max_position_embeddings=64,
+    )
+    torch.manual_seed(0)
+    transformers.BertModel(config).save_pretrained(directory / "bert")
+    tokenizer.save_pretrained(directory / "bert")
+
+    transformer = models.Transformer(str(directory / "bert"), max_seq_length=32)
+    model = st.SentenceTransformer(
+        modules=[transformer, models.Pooling(32), models.Normalize()]
+    )
+    model.save(str(directory / "sentence"))
+    return model
+
+
+def test_onnx_backend_matches_sentence_transformer(tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    model = _tiny_sentence_model(tmp_path)
+    out = embedder.export_onnx(str(tmp_path / "sentence"), tmp_path / "onnx", quantize=True)
+
+    reference = model.encode(TEXTS, convert_to_numpy=True)
+    full = embedder.OnnxEmbedder(out)
+    quantized = embedder.OnnxEmbedder(out, quantized=True)
+
+    assert full.encode(TEXTS).shape == reference.shape
+    assert np.all((reference * full.encode(TEXTS)).sum(axis=1) > 0.9999)
+    assert np.all((reference * quantized.encode(TEXTS)).sum(axis=1) > 0.99)
+    assert full.encode([]).shape == (0, reference.shape[1])
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        embedder.load_embedder("tensorflow")
+
+
+def test_onnx_embedder_id_tracks_model_name_and_file_contents(tmp_path):
+    def export(directory, model_name, weights):
+        directory.mkdir(parents=True)
+        (directory / embedder.ONNX_CONFIG_FILE).write_text(f'{{"model_name": "{model_name}"}}')
+        (directory / embedder.ONNX_MODEL_FILE).write_bytes(weights)
+        return directory
+
+    first = export(tmp_path / "a" / "onnx", "org/mini", b"weights-1")
+    other = export(tmp_path / "b" / "onnx", "org/large", b"weights-1")
+    first_id = embedder.embedder_id("onnx", onnx_dir=first, quantized=False)
+
+    assert first_id.startswith("onnx:org/mini@")
+    assert first_id != embedder.embedder_id("onnx", onnx_dir=other, quantized=False)
+    (first / embedder.ONNX_MODEL_FILE).write_bytes(b"weights-2")  # re-exported
+    assert first_id != embedder.embedder_id("onnx", onnx_dir=first, quantized=False)
@@ -0,0 +1,55 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import embedding_batcher  # type: ignore  # noqa: E402
+
+
+def test_concurrent_requests_are_encoded_in_one_batch():
+    batches = []
+    main_thread = threading.get_ident()
+
+    def encode(texts):
+        assert threading.get_ident() != main_thread
+        batches.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype="float32")
+
+    batcher = embedding_batcher.EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=50)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.encode("x" * n) for n in range(1, 6)))
+
+    results = asyncio.run(scenario())
+    batcher.close()
+
+    assert [r.shape for r in results] == [(1, 2)] * 5
+    assert [int(r[0][0]) for r in results] == [1, 2, 3, 4, 5]
+    assert len(batches) == 1
+    assert batcher.stats()["mean_batch_size"] == 5
+
+
+def test_max_batch_size_and_errors():
+    def encode(texts):
+        if "bad" in texts:
+            raise ValueError("boom")
+        return np.zeros((len(texts), 1), dtype="float32")
+
+    batcher = embedding_batcher.EmbeddingBatcher(encode, max_batch_size=2, max_wait_ms=20)
+
+    async def scenario():
+        await asyncio.gather(*(batcher.encode(str(i)) for i in range(4)))
+        with pytest.raises(ValueError):
+            await batcher.encode("bad")
+
+    asyncio.run(scenario())
+    batcher.close()
+
+    assert batcher.stats()["batches"] == 3
@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from embedding_cache import EmbeddingCache  # type: ignore  # noqa: E402
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype="float32")
+
+
+def test_only_misses_are_encoded_and_persisted(tmp_path):
+    encode = CountingEncoder()
+    cache = EmbeddingCache(tmp_path, "torch:test")
+    first = cache.encode(["alpha", "beta", "alpha"], encode)
+    assert encode.encoded == ["alpha", "beta"]
+    np.testing.assert_array_equal(first, encode(["alpha", "beta", "alpha"]))
+
+    encode.encoded.clear()
+    reopened = EmbeddingCache(tmp_path, "torch:test")
+    out = reopened.encode(["beta", "gamma", "alpha"], encode)
+    assert encode.encoded == ["gamma"]
+    assert (reopened.hits, reopened.misses) == (2, 1)
+    np.testing.assert_array_equal(out, encode(["beta", "gamma", "alpha"]))
+
+    encode.encoded.clear()
+    EmbeddingCache(tmp_path, "onnx:test").encode(["alpha"], encode)
+    assert encode.encoded == ["alpha"]
+
+
+def test_prune_keeps_only_live_texts(tmp_path):
+    encode = CountingEncoder()
+    cache = EmbeddingCache(tmp_path, "torch:test")
+    cache.encode(["alpha", "beta", "gamma"], encode)
+
+    assert cache.prune(["gamma", "alpha", "unknown"]) == 1
+    assert len(cache) == 2
+    encode.encoded.clear()
+    reopened = EmbeddingCache(tmp_path, "torch:test")
+    out = reopened.encode(["gamma", "alpha"], encode)
+    assert encode.encoded == []
+    np.testing.assert_array_equal(out, encode(["gamma", "alpha"]))
+
+
+def test_half_written_row_is_dropped(tmp_path):
+    encode = CountingEncoder()
+    cache = EmbeddingCache(tmp_path, "torch:test")
+    cache.encode(["alpha", "beta"], encode)
+    with cache.vectors_path.open("ab") as fh:
+        fh.write(b"\0" * 6)
+
+    reopened = EmbeddingCache(tmp_path, "torch:test")
+    assert len(reopened) == 2
+    encode.encoded.clear()
+    reopened.encode(["gamma"], encode)
+    np.testing.assert_array_equal(
+        EmbeddingCache(tmp_path, "torch:test").encode(["gamma", "beta"], encode),
+        encode(["gamma", "beta"]),
+    )
+
+
+def test_instances_sharing_a_directory_see_each_others_rows(tmp_path):
+    encode, expected = CountingEncoder(), CountingEncoder()
+    worker_a = EmbeddingCache(tmp_path, "torch:test")
+    worker_b = EmbeddingCache(tmp_path, "torch:test")
+    worker_a.encode(["aaaa"], encode)
+    np.testing.assert_array_equal(worker_b.encode(["bb"], encode), expected(["bb"]))
+    np.testing.assert_array_equal(
+        worker_a.encode(["bb", "aaaa", "c"], encode), expected(["bb", "aaaa", "c"])
+    )
+    assert encode.encoded == ["aaaa", "bb", "c"]  # worker A reused B's row
+
+    # A prune by one worker renumbers rows under the other.
+    assert worker_b.prune(["c", "bb"]) == 1
+    np.testing.assert_array_equal(
+        worker_a.encode(["c", "dd", "bb"], encode), expected(["c", "dd", "bb"])
+    )
+    fresh = EmbeddingCache(tmp_path, "torch:test")
+    assert len(fresh) == 3
+    np.testing.assert_array_equal(
+        fresh.encode(["dd", "bb", "c"], encode), expected(["dd", "bb", "c"])
+    )
+    assert encode.encoded == ["aaaa", "bb", "c", "dd"]
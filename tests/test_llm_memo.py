@@ -0,0 +1,58 @@
+import asyncio
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import llm_memo  # type: ignore  # noqa: E402
+
+
+def test_key_depends_on_every_request_field():
+    messages = [{"role": "user", "content": "hi"}]
+    base = llm_memo.memo_key("m", "sys", messages, 0.0, 10)
+    assert base == llm_memo.memo_key("m", "sys", list(messages), 0.0, 10)
+    assert base != llm_memo.memo_key("other", "sys", messages, 0.0, 10)
+    assert base != llm_memo.memo_key("m", "sys", messages, 0.5, 10)
+    assert base != llm_memo.memo_key("m", "sys", messages, 0.0, 20)
+
+
+def test_lru_and_sqlite_tiers(tmp_path):
+    db = tmp_path / "memory.db"
+    memo = llm_memo.LLMMemo(max_entries=1, db_path=db)
+    memo.put("a", "A")
+    memo.put("b", "B")  # evicts "a" from the LRU tier only
+    memo.flush()
+
+    assert memo.get("b") == "B"
+    assert memo.get("a") == "A"
+    assert memo.get("missing") is None
+    assert memo.stats() == {"memory_hits": 1, "sqlite_hits": 1, "misses": 1, "dropped": 0}
+
+    memo.close()
+    restarted = llm_memo.LLMMemo(max_entries=1, db_path=db)
+    assert restarted.get("b") == "B"
+    restarted.close()
+
+
+def test_sqlite_tier_is_read_off_loop_and_pruned(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_memo.time, "time", lambda: now[0])
+    db = tmp_path / "memory.db"
+    memo = llm_memo.LLMMemo(max_entries=1, db_path=db, ttl=100, max_rows=2, prune_interval=0)
+    for key in "abc":
+        memo.put(key, key.upper())
+        memo.flush()
+        now[0] += 1
+
+    assert asyncio.run(memo.aget("b")) == "B"
+    assert memo.conn.execute("SELECT key FROM llm_memo ORDER BY key").fetchall() == [
+        ("b",),
+        ("c",),
+    ]
+    now[0] += 200
+    memo.put("d", "D")
+    memo.flush()
+    assert memo.conn.execute("SELECT key FROM llm_memo").fetchall() == [("d",)]
+    memo.close()
@@ -0,0 +1,63 @@
+import json
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from memory import LongTermMemory  # type: ignore  # noqa: E402
+
+
+def _segment_names(tmp_path):
+    return sorted(p.name for p in tmp_path.glob("long_term.*.jsonl"))
+
+
+def test_appends_roll_segments_and_compact(tmp_path):
+    memory = LongTermMemory(tmp_path / "long_term.json", segment_bytes=100, max_segments=3)
+    for i in range(12):
+        memory.add("user", f"message {i}")
+
+    assert [m["content"] for m in memory.iter_messages()] == [f"message {i}" for i in range(12)]
+    assert len(_segment_names(tmp_path)) <= 4
+    assert any("-" in name for name in _segment_names(tmp_path))
+    memory.close()
+
+    reopened = LongTermMemory(tmp_path / "long_term.json", segment_bytes=100, max_segments=3)
+    reopened.add("assistant", "last")
+    assert [m["content"] for m in reopened.all_messages()][-2:] == ["message 11", "last"]
+    reopened.close()
+
+
+def test_torn_write_and_interrupted_compaction_are_recovered(tmp_path):
+    memory = LongTermMemory(tmp_path / "long_term.json", segment_bytes=20)
+    for i in range(3):
+        memory.add("user", f"m{i}")
+    memory.close()
+    names = _segment_names(tmp_path)
+    # A merged copy of the first two segments whose inputs were not deleted yet.
+    merged = [json.loads(line) for name in names[:2] for line in (tmp_path / name).open()]
+    with (tmp_path / "long_term.00000001-00000002.jsonl").open("w") as fh:
+        fh.writelines(json.dumps(m) + "\n" for m in merged)
+    with (tmp_path / names[-1]).open("a") as fh:
+        fh.write('{"role": "user", "con')
+
+    reopened = LongTermMemory(tmp_path / "long_term.json", segment_bytes=20)
+    reopened.add("user", "m3")
+    assert [m["content"] for m in reopened.iter_messages()] == ["m0", "m1", "m2", "m3"]
+    reopened.close()
+
+
+def test_legacy_json_file_is_migrated(tmp_path):
+    path = tmp_path / "long_term.json"
+    path.write_text(json.dumps([{"role": "user", "content": "old"}], indent=2))
+
+    memory = LongTermMemory(path)
+    memory.add("assistant", "new")
+    assert memory.all_messages() == [
+        {"role": "user", "content": "old"},
+        {"role": "assistant", "content": "new"},
+    ]
+    assert not path.exists() and (tmp_path / "long_term.json.migrated").exists()
+    memory.close()
+    assert [m["content"] for m in LongTermMemory(path).all_messages()] == ["old", "new"]
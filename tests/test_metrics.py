@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import metrics  # type: ignore  # noqa: E402
+
+
+def test_registry_renders_prometheus_text():
+    registry = metrics.Registry()
+    calls = registry.counter("calls_total", "Calls", ("kind",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    calls.inc(kind="a")
+    calls.inc(2, kind='b"c')
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+    registry.add_collector(metrics.stats_collector("app", lambda: {"cache": {"hits": 3, "name": "x"}}))
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE calls_total counter" in lines
+    assert 'calls_total{kind="a"} 1' in lines
+    assert 'calls_total{kind="b\\"c"} 2' in lines
+    assert [line for line in lines if line.startswith("latency_seconds")] == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3",
+    ]
+    assert "app_cache_hits 3" in lines and not any("app_cache_name" in line for line in lines)
+    with pytest.raises(ValueError):
+        calls.inc(other="a")
+    with pytest.raises(ValueError):
+        registry.counter("calls_total", "again")
+
+
+def test_request_timings_are_scoped_to_the_request():
+    metrics.record_timing("ignored", 1.0)
+    with metrics.request_timings() as timings:
+        metrics.observe_stage("plan", 0.0123)
+    metrics.observe_stage("plan", 0.5)
+    assert timings == [("plan", 0.0123)]
+    assert metrics.server_timing(timings) == "plan;dur=12.3"
+    assert metrics.STAGE_SECONDS.count(stage="plan") >= 2
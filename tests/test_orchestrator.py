@@ -1,12 +1,16 @@
+import asyncio
 import sys
+import threading
 from pathlib import Path
 import numpy as np
+import pytest
 
 BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
 if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
 import orchestrator as orch_module  # type: ignore
+import prompt_library  # type: ignore
 
 
 def test_orchestrator_fetches_catalog(monkeypatch):
@@ -16,11 +20,12 @@ def test_orchestrator_fetches_catalog(monkeypatch):
             item.unlink()
         vector_dir.rmdir()
 
-    monkeypatch.setattr(
-        orch_module.SentenceTransformer,
-        "encode",
-        lambda self, texts, convert_to_numpy=True: np.ones((len(texts), 1), dtype="float32"),
-    )
+    class FakeEmbedder:
+        def encode(self, texts, convert_to_numpy=True):
+            return np.ones((len(texts), 1), dtype="float32")
+
+    monkeypatch.setattr(orch_module.Orchestrator, "_vector_model", None)
+    monkeypatch.setattr(orch_module, "load_embedder", lambda: FakeEmbedder())
     monkeypatch.setattr(orch_module.faiss, "write_index", lambda index, path: None)
 
     calls = []
@@ -51,3 +56,410 @@ def test_orchestrator_fetches_catalog(monkeypatch):
         for item in vector_dir.iterdir():
             item.unlink()
         vector_dir.rmdir()
+
+
+def _bare_orchestrator():
+    """Return an ``Orchestrator`` without loading models or catalog data."""
+    orch = object.__new__(orch_module.Orchestrator)
+    orch.short_memories = orch_module.ShortTermSessions()
+    orch.response_cache = None
+    orch.llm_memo = None
+    orch.embedding_batcher = None
+    orch.embedding_cache = None
+    orch.pipeline_mode = "full"
+    orch.short_query_words = 8
+    orch.candidate_top_n = 20
+    orch.ranker_token_budget = 3000
+    orch.recall_top_k = 3
+    orch.recall_min_score = 0.5
+    orch.recall_token_budget = 600
+    orch.recall_follow_up_score = 0.8
+    orch.recall_max_candidates = 200
+    orch.degraded_cache_threshold = 0.8
+
+    class Memory:
+        def __init__(self):
+            self.messages = []
+
+        async def aadd_turn(self, question, answer, session_id="", **kwargs):
+            self.messages.extend([("user", question), ("assistant", answer)])
+
+    orch.long_memory = Memory()
+    return orch
+
+
+def test_run_stream_emits_stages_and_tokens():
+    orch = _bare_orchestrator()
+    app = orch_module.Application("app1", "App", "desc", ())
+
+    async def plan(query):
+        return query
+
+    async def rank_applications(candidates, query):
+        return candidates
+
+    async def stream_llm(system_prompt, user_prompt):
+        for token in ("a", "b"):
+            yield token
+
+    orch._encode = lambda texts: np.ones((len(texts), 1), dtype="float32")
+    orch._plan = plan
+    orch._search_capability = lambda embedding: "cap1"
+    orch._application_candidates = lambda capability_id, query, embedding: [app]
+    orch._rank_applications = rank_applications
+    orch._stream_llm = stream_llm
+
+    async def collect():
+        return [e async for e in orch.run_stream("question")]
+
+    events = asyncio.run(collect())
+
+    assert [e.get("stage") for e in events if e["event"] == "stage"] == [
+        "capability",
+        "ranker",
+        "synthesizer",
+        "reviewer",
+    ]
+    assert [e["text"] for e in events if e["event"] == "token"] == ["a", "b", "a", "b"]
+    assert events[-1] == {"event": "done", "answer": "ab"}
+    assert orch.long_memory.messages == [("user", "question"), ("assistant", "ab")]
+
+
+def test_call_llm_memoizes_deterministic_or_opted_in_calls():
+    orch = _bare_orchestrator()
+    orch.llm_memo = orch_module.LLMMemo(max_entries=8)
+    calls = []
+
+    class Adapter:
+        model_id = "model"
+        temperature = 0.7
+        max_tokens = 100
+
+        async def acreate(self, model, messages, *, max_tokens=None, temperature=None):
+            calls.append(temperature)
+            return {"choices": [{"message": {"content": f"reply {len(calls)}"}}]}
+
+    orch.adapter = Adapter()
+
+    async def scenario():
+        return [
+            await orch._call_llm("sys", "q"),
+            await orch._call_llm("sys", "q"),
+            await orch._call_llm("sys", "q", memoize=True),
+            await orch._call_llm("sys", "q", memoize=True),
+            await orch._call_llm("sys", "q", temperature=0),
+            await orch._call_llm("sys", "q", temperature=0),
+        ]
+
+    replies = asyncio.run(scenario())
+
+    assert replies == ["reply 1", "reply 2", "reply 3", "reply 3", "reply 4", "reply 4"]
+    assert calls == [0.7, 0.7, 0.7, 0]
+
+
+def test_call_llm_sheds_calls_beyond_the_outstanding_limit():
+    orch = _bare_orchestrator()
+    orch.llm_memo = None
+    orch._llm_slots = orch_module.ConcurrencyLimiter(1, queue_size=0)
+
+    class Adapter:
+        model_id = "model"
+        temperature = 0.7
+        max_tokens = 100
+
+        async def acreate(self, model, messages, *, max_tokens=None, temperature=None):
+            await asyncio.sleep(0.02)
+            return {"choices": [{"message": {"content": "reply"}}]}
+
+    orch.adapter = Adapter()
+
+    async def scenario():
+        return await asyncio.gather(
+            orch._call_llm("sys", "q"), orch._call_llm("sys", "q"), return_exceptions=True
+        )
+
+    first, second = asyncio.run(scenario())
+
+    assert first == "reply"
+    assert isinstance(second, RuntimeError) and second.status_code == 503
+    assert orch._llm_slots.stats()["active"] == 0
+
+
+def test_pipeline_modes_skip_llm_calls():
+    prompts = []
+
+    async def call_llm(system_prompt, user_prompt, **kwargs):
+        prompts.append(system_prompt)
+        return "answer"
+
+    for mode in ("full", "merged", "direct"):
+        orch = _bare_orchestrator()
+        orch.pipeline_mode = mode
+        orch._call_llm = call_llm
+        orch._application_candidates = lambda capability_id, query, embedding: []
+        orch._encode = lambda texts: np.ones((len(texts), 1), dtype="float32")
+        orch.capability_index = orch_module.faiss.IndexFlatL2(1)
+        orch.capability_index.add(np.ones((1, 1), dtype="float32"))
+        orch.catalog = orch_module.Catalog([{"id": "cap1", "category": "cat"}], [])
+        prompts.clear()
+        asyncio.run(orch.run("short question"))
+        names = [
+            name
+            for p in prompts
+            for name, text in prompt_library.PROMPTS.items()
+            if text == p
+        ]
+        expected = {
+            "full": ["planner", "synthesizer", "reviewer"],
+            "merged": ["planner", "synthesizer_reviewer"],
+            "direct": ["synthesizer", "reviewer"],
+        }[mode]
+        assert names == expected
+
+
+def test_run_coalesces_identical_questions_but_writes_memory_per_caller(monkeypatch):
+    monkeypatch.setattr(orch_module.Orchestrator, "_single_flight", orch_module.SingleFlight())
+    orch = _bare_orchestrator()
+    answers = []
+
+    async def answer(query, embedding=None):
+        answers.append(query)
+        await asyncio.sleep(0.01)
+        return "shared", ""
+
+    orch._answer = answer
+
+    async def scenario():
+        return await asyncio.gather(
+            orch.run("Which apps use AWS?"), orch.run("which apps use  aws?")
+        )
+
+    assert asyncio.run(scenario()) == ["shared", "shared"]
+    assert len(answers) == 1
+    assert len(orch.long_memory.messages) == 4
+    assert orch.stats()["single_flight"]["coalesced"] == 1
+
+
+def test_run_serves_degraded_answer_while_bedrock_is_unavailable(monkeypatch):
+    monkeypatch.setattr(orch_module.Orchestrator, "_single_flight", orch_module.SingleFlight())
+    orch = _bare_orchestrator()
+    app = orch_module.Application("app1", "Claims Portal", "Handles claims", ())
+    unnamed = orch_module.Application("app2", "", "Files claims", ())
+
+    async def answer(query, embedding=None):
+        raise orch_module.UpstreamUnavailable("Failed to call Bedrock API")
+
+    async def embed(text):
+        return np.ones(4, dtype="float32")
+
+    async def call_llm(system_prompt, user_prompt, **kwargs):
+        raise orch_module.UpstreamUnavailable("circuit open")
+
+    orch._answer = answer
+    orch._embed = embed
+    orch._call_llm = call_llm
+    orch._search_capability = lambda embedding: "cap1"
+    orch._application_candidates = lambda capability_id, query, embedding: [app, unnamed]
+
+    final = asyncio.run(orch.run("Which apps handle claims?"))
+
+    assert "temporarily unavailable" in final
+    assert "- Claims Portal: Handles claims\n- app2: Files claims" in final
+    assert orch.long_memory.messages[-1] == ("assistant", final)
+    assert asyncio.run(orch._review_answer("draft")) == "draft"
+
+
+def test_planner_and_ranker_only_fall_back_on_bad_output():
+    orch = _bare_orchestrator()
+    apps = [orch_module.Application(i, i, "desc", ()) for i in ("a", "b")]
+    replies = []
+
+    async def call_llm(system_prompt, user_prompt, **kwargs):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    orch._call_llm = call_llm
+    replies.extend(["not json", "not json"])
+    assert asyncio.run(orch._plan("a long question about which apps store files")) == (
+        "a long question about which apps store files"
+    )
+    assert asyncio.run(orch._rank_applications(apps, "q")) == apps
+
+    for error in (
+        orch_module.Overloaded("busy"),
+        orch_module.UpstreamUnavailable("circuit open"),
+    ):
+        replies.extend([error, error])
+        with pytest.raises(type(error)):
+            asyncio.run(orch._plan("a long question about which apps store files"))
+        with pytest.raises(type(error)):
+            asyncio.run(orch._rank_applications(apps, "q"))
+
+
+def test_run_stream_degrades_when_the_planner_is_unavailable():
+    orch = _bare_orchestrator()
+    app = orch_module.Application("app1", "Claims", "Handles claims", ())
+
+    async def plan(query):
+        raise orch_module.UpstreamUnavailable("circuit open")
+
+    orch._encode = lambda texts: np.ones((len(texts), 1), dtype="float32")
+    orch._plan = plan
+    orch._search_capability = lambda embedding: "cap1"
+    orch._application_candidates = lambda capability_id, query, embedding: [app]
+
+    async def collect():
+        return [e async for e in orch.run_stream("question")]
+
+    events = asyncio.run(collect())
+
+    assert [e.get("stage") for e in events if e["event"] == "stage"] == ["degraded"]
+    assert "- Claims: Handles claims" in events[-1]["answer"]
+    assert orch.long_memory.messages[-1] == ("assistant", events[-1]["answer"])
+
+
+def test_recommend_capability_searches_capability_index_only():
+    orch = _bare_orchestrator()
+    orch.pipeline_mode = "direct"
+    vectors = {"storage": [1.0, 0.0], "containers": [0.0, 1.0]}
+    orch._encode = lambda texts: np.array([vectors[t] for t in texts], dtype="float32")
+    orch.catalog = orch_module.Catalog(
+        [
+            {"id": "cap1", "category": "c", "description": "containers"},
+            {"id": "cap2", "category": "c", "description": "storage"},
+        ],
+        [],
+    )
+    orch.capability_index, ids = orch._build_capability_index(orch.catalog.capabilities)
+
+    assert ids == ["cap1", "cap2"]
+    assert asyncio.run(orch.recommend_capability("storage")) == "cap2"
+
+
+def test_recommend_applications_uses_filtered_vector_candidates():
+    orch = _bare_orchestrator()
+    orch.candidate_top_n = 2
+    vectors = {"q": [1.0, 0.0], "a": [1.0, 0.1], "b": [0.0, 1.0], "c": [1.0, 0.2], "d": [1.0, 0.0]}
+    orch._encode = lambda texts: np.array([vectors[t] for t in texts], dtype="float32")
+    orch.catalog = orch_module.Catalog(
+        [{"id": "cap1", "name": "AWS", "category": "cloud"}],
+        [
+            {"id": "app1", "description": "a", "technologies": ["AWS"]},
+            {"id": "app2", "description": "b", "technologies": ["AWS"]},
+            {"id": "app3", "description": "c", "technologies": ["AWS"]},
+            {"id": "app4", "description": "d", "technologies": ["Azure"]},
+        ],
+    )
+    orch.application_index, _ = orch._build_application_index(orch.catalog.applications)
+    prompts = []
+
+    async def call_llm(system_prompt, user_prompt, **kwargs):
+        prompts.append(user_prompt)
+        raise RuntimeError("ranker unavailable")
+
+    orch._call_llm = call_llm
+    ranked = asyncio.run(orch.recommend_applications("cap1", "q"))
+
+    # app4 is closest but filtered out by capability; app2 is cut by top-N.
+    assert [a.id for a in ranked] == ["app1", "app3"]
+    assert "app4" not in prompts[0] and "app2" not in prompts[0]
+
+    orch.ranker_token_budget = 1
+    assert [a.id for a in asyncio.run(orch.recommend_applications("cap1", "q"))] == ["app1"]
+
+
+def test_follow_up_reuses_recalled_capability_and_history(tmp_path):
+    orch = _bare_orchestrator()
+    orch.long_memory = orch_module.SQLiteMemory(tmp_path / "memory.db")
+    vectors = {"Which apps store files?": [1.0, 0.0], "And which of them are cloud based?": [0.9, 0.1]}
+    orch._encode = lambda texts: np.array([vectors[t] for t in texts], dtype="float32")
+    orch.catalog = orch_module.Catalog([{"id": "cap1", "category": "storage"}], [])
+    planned, prompts = [], []
+
+    async def plan(query):
+        planned.append(query)
+        return query
+
+    async def call_llm(system_prompt, user_prompt, **kwargs):
+        prompts.append(user_prompt)
+        return "answer"
+
+    orch._plan = plan
+    orch._search_capability = lambda embedding: "cap1"
+    orch._application_candidates = lambda capability_id, query, embedding: []
+    orch._call_llm = call_llm
+
+    async def scenario():
+        await orch.run("Which apps store files?", session_id="s")
+        orch.long_memory.flush()
+        await orch.run("And which of them are cloud based?", session_id="s")
+
+    asyncio.run(scenario())
+    orch.long_memory.close()
+
+    assert planned == ["Which apps store files?"]
+    assert "Earlier in this conversation:\nUser: Which apps store files?" in prompts[-2]
+
+
+def test_speculative_candidates_are_kept_when_the_planner_agrees(monkeypatch):
+    monkeypatch.setattr(orch_module.Orchestrator, "_stage_stats", orch_module.StageStats())
+    orch = _bare_orchestrator()
+    vectors = {"q": [1.0, 0.0], "storage": [1.0, 0.1], "compute": [0.0, 1.0]}
+    orch._encode = lambda texts: np.array([vectors[t] for t in texts], dtype="float32")
+    orch.catalog = orch_module.Catalog(
+        [
+            {"id": "cap1", "category": "c", "description": "storage"},
+            {"id": "cap2", "category": "c", "description": "compute"},
+        ],
+        [],
+    )
+    orch.capability_index, _ = orch._build_capability_index(orch.catalog.capabilities)
+
+    async def embed(text):
+        # Like the embedding batcher, embedding waits off the event loop.
+        await asyncio.sleep(0.01)
+        return orch._encode([text])
+
+    orch._embed = embed
+    prepared = []
+    orch._application_candidates = lambda capability_id, query, embedding: prepared.append(
+        capability_id
+    ) or []
+    plans = iter(['{"query": "storage"}', '{"query": "compute"}'])
+
+    async def call_llm(system_prompt, user_prompt, **kwargs):
+        if system_prompt == prompt_library.get_prompt("planner"):
+            await asyncio.sleep(0.01)
+            return next(plans)
+        return "answer"
+
+    orch._call_llm = call_llm
+
+    async def scenario():
+        return [await orch._generate("q", None) for _ in range(2)]
+
+    assert [cap for _, cap in asyncio.run(scenario())] == ["cap1", "cap2"]
+    # The speculative search on "q" guessed cap1 both times; only the
+    # second request had to prepare candidates again after the planner.
+    assert prepared == ["cap1", "cap1", "cap2"]
+    stages = orch.stats()["stages"]
+    assert stages["runs"] == 2
+    assert (stages["speculation_hits"], stages["speculation_misses"]) == (1, 1)
+    assert stages["saved_ms"] > 0 and stages["wall_ms"] < stages["sequential_ms"]
+
+
+def test_embed_without_batcher_encodes_off_the_event_loop():
+    orch = _bare_orchestrator()
+    threads = []
+
+    def encode(texts):
+        threads.append(threading.get_ident())
+        return np.ones((len(texts), 4), dtype="float32")
+
+    orch._encode = encode
+    vector = asyncio.run(orch._embed("query"))
+
+    assert vector.shape == (1, 4)
+    assert threads and threads[0] != threading.get_ident()
@@ -0,0 +1,136 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from urllib3.util.retry import RequestHistory
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import resilience  # type: ignore  # noqa: E402
+
+
+class StatusError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(status)
+
+        class Response:
+            status_code = status
+
+        self.response = Response()
+        self.response.headers = headers or {}
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(resilience.settings, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(resilience.settings, "RETRY_MAX_DELAY", 0.0)
+
+
+def test_backoff_delays_are_jittered_within_bounds():
+    delays = list(resilience.backoff_delays(50, 0.1, 2.0))
+    assert len(delays) == 50
+    assert all(0.1 <= d <= 2.0 for d in delays)
+    assert len(set(delays)) > 1
+
+    retry = resilience.JitteredRetry(total=3, backoff_factor=0.1, backoff_max=0.5)
+    assert retry.get_backoff_time() == 0.0
+    for _ in range(3):
+        retry = retry.new(history=retry.history + (RequestHistory("GET", "/", None, 503, None),))
+        assert 0.1 <= retry.get_backoff_time() <= 0.5
+
+
+def test_retries_retryable_errors_and_honors_retry_after(no_sleep, monkeypatch):
+    breaker = resilience.CircuitBreaker("test", threshold=10, reset_timeout=60)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    assert resilience.call_with_retries(flaky, breaker, 2, (StatusError,)) == "ok"
+    assert len(attempts) == 3
+    assert breaker.failures == 0
+
+    def bad_request():
+        attempts.append(1)
+        raise StatusError(400)
+
+    attempts.clear()
+    with pytest.raises(StatusError):
+        resilience.call_with_retries(bad_request, breaker, 2, (StatusError,))
+    assert len(attempts) == 1
+    assert resilience.failure_type(StatusError(400)) is RuntimeError
+    assert resilience.failure_type(StatusError(429)) is resilience.UpstreamUnavailable
+
+    monkeypatch.setattr(resilience.settings, "RETRY_MAX_DELAY", 3.0)
+    delays = iter([0.5])
+    assert resilience.retry_delay(StatusError(429, {"Retry-After": "10"}), delays) == 3.0
+
+
+def test_circuit_breaker_opens_fails_fast_and_probes(no_sleep):
+    breaker = resilience.CircuitBreaker("test", threshold=2, reset_timeout=0.05)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise StatusError(502)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(StatusError):
+                await resilience.acall_with_retries(failing, breaker, 0, (StatusError,))
+        with pytest.raises(resilience.CircuitOpen):
+            await resilience.acall_with_retries(failing, breaker, 0, (StatusError,))
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    breaker.before_call()  # the probe
+    assert breaker.state == "half_open"
+    with pytest.raises(resilience.CircuitOpen):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats() == {"state": 0, "failures": 0, "rejected": 2}
+
+
+def test_hedged_call_takes_the_first_successful_response():
+    started = []
+
+    async def call():
+        started.append(len(started))
+        attempt = started[-1]
+        await asyncio.sleep(0.2 if attempt == 0 else 0.01)
+        return attempt
+
+    async def scenario():
+        start = time.perf_counter()
+        result = await resilience.hedged(call, 0.02, "test")
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(scenario())
+    assert result == 1
+    assert elapsed < 0.15
+    assert resilience.metrics.UPSTREAM_HEDGES.value(upstream="test", outcome="won") == 1
+
+    started.clear()
+    assert asyncio.run(resilience.hedged(call, None, "test")) == 0
+    assert started == [0]
+
+
+def test_latency_tracker_needs_enough_samples():
+    tracker = resilience.LatencyTracker(window=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) is None
+    for i in range(9, 100):
+        tracker.record(i / 100)
+    assert tracker.percentile(95) == pytest.approx(0.95)
@@ -0,0 +1,104 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import response_cache  # type: ignore  # noqa: E402
+
+
+def _cache(tmp_path, **kwargs):
+    options = {"threshold": 0.9, "ttl": 60, "max_entries": 10, "fingerprint": "v1"}
+    options.update(kwargs)
+    return response_cache.ResponseCache(tmp_path, **options)
+
+
+def test_exact_and_semantic_hits_are_counted_separately(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("Which apps use AWS?", np.array([1.0, 0.0, 0.0]), "answer")
+
+    assert cache.get_exact("  which apps USE aws? ") == "answer"
+    assert cache.get_exact("something else") is None
+    assert cache.get_semantic(np.array([0.99, 0.05, 0.0])) == "answer"
+    assert cache.get_semantic(np.array([0.0, 1.0, 0.0])) is None
+
+    assert cache.stats() == {
+        "entries": 1,
+        "exact_hits": 1,
+        "exact_misses": 1,
+        "semantic_hits": 1,
+        "semantic_misses": 1,
+        "degraded_hits": 0,
+        "degraded_misses": 0,
+    }
+    assert cache.get_semantic(np.array([1.0, 0.0, 0.0]), 0.5, degraded=True) == "answer"
+    assert cache.get_semantic(np.array([0.0, 1.0, 0.0]), 0.5, degraded=True) is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["semantic_misses"]) == (1, 1)
+    assert (stats["degraded_hits"], stats["degraded_misses"]) == (1, 1)
+
+
+def test_ttl_and_lru_eviction(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put("a", np.array([1.0, 0.0]), "A")
+    cache.put("b", np.array([0.0, 1.0]), "B")
+    assert cache.get_exact("a") == "A"  # "b" is now least recently used
+    cache.put("c", np.array([1.0, 1.0]), "C")
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == "A"
+
+    now[0] += 61
+    assert cache.get_exact("a") is None
+    assert cache.get_semantic(np.array([1.0, 1.0])) is None
+
+
+def test_persisted_cache_is_invalidated_by_new_fingerprint(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("a", np.array([1.0, 0.0]), "A")
+    cache.save()
+
+    assert _cache(tmp_path).get_exact("a") == "A"
+    assert _cache(tmp_path, fingerprint="v2").get_exact("a") is None
+    assert not (tmp_path / "response_cache.json").exists()
+
+
+def test_put_defers_saving_until_snapshot_is_written(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("a", np.array([1.0, 0.0]), "A")
+    assert cache.dirty
+    assert not (tmp_path / "response_cache.json").exists()
+
+    snapshot = cache.snapshot()
+    cache.put("b", np.array([0.0, 1.0]), "B")  # after the snapshot
+    cache.write(snapshot)
+
+    reloaded = _cache(tmp_path)
+    assert reloaded.get_exact("a") == "A"
+    assert reloaded.get_exact("b") is None
+    assert not list(tmp_path.glob("*.tmp"))
+    cache.save()
+    assert not cache.dirty and cache.snapshot() is None
+    assert _cache(tmp_path).get_exact("b") == "B"
+
+
+def test_expired_entries_are_evicted_from_the_head(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = _cache(tmp_path, max_entries=5)
+    cache.put("a", np.array([1.0, 0.0]), "A")
+    now[0] += 30
+    cache.put("b", np.array([0.0, 1.0]), "B")
+    cache.put("a", np.array([1.0, 0.0]), "A2")  # replaces the older "a"
+    now[0] += 40
+    cache.put("c", np.array([1.0, 1.0]), "C")
+
+    assert cache.stats()["entries"] == 3
+    now[0] += 25  # "b" and the new "a" are 65s old
+    cache.put("d", np.array([1.0, 2.0]), "D")
+    assert cache.stats()["entries"] == 2
+    assert cache.get_exact("c") == "C"
@@ -0,0 +1,57 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import singleflight  # type: ignore  # noqa: E402
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = singleflight.SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("q", work) for _ in range(5)))
+        later = await flight.do("q", work)
+        return results, later
+
+    results, later = asyncio.run(scenario())
+
+    assert results == ["result"] * 5
+    assert later == "result"
+    assert len(runs) == 2
+    assert flight.stats() == {"leaders": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_propagate_and_cancelled_caller_does_not_cancel_others():
+    flight = singleflight.SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await asyncio.gather(flight.do("a", failing), flight.do("a", failing))
+        leader = asyncio.ensure_future(flight.do("b", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("b", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "ok"
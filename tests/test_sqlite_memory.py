@@ -0,0 +1,186 @@
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from memory import ShortTermSessions  # type: ignore  # noqa: E402
+from sqlite_memory import SQLiteMemory  # type: ignore  # noqa: E402
+
+
+def test_add_many_writes_in_one_transaction(tmp_path):
+    memory = SQLiteMemory(tmp_path / "memory.db")
+    ids = memory.add_many([("user", "q"), ("assistant", "a")])
+    assert ids == [1, 2]
+    assert memory.add("user", "again") == 3
+    assert memory.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert [m["content"] for m in memory.all_messages()] == ["q", "a", "again"]
+    memory.close()
+
+
+def test_queued_writes_are_batched_and_flushed_on_close(tmp_path):
+    path = tmp_path / "memory.db"
+    memory = SQLiteMemory(path, flush_interval=0.05)
+
+    async def requests():
+        await asyncio.gather(
+            *(memory.aadd_many([("user", f"q{i}"), ("assistant", f"a{i}")]) for i in range(20))
+        )
+
+    asyncio.run(requests())
+    memory.close()
+    assert memory.written == 40
+    assert memory.flushes < 20
+
+    reopened = SQLiteMemory(path)
+    messages = reopened.all_messages()
+    assert len(messages) == 40
+    assert [m["content"] for m in messages[:2]] == ["q0", "a0"]
+    reopened.close()
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    memory = SQLiteMemory(tmp_path / "memory.db", flush_interval=0.01, max_queue=1)
+
+    async def requests():
+        for i in range(10):
+            await memory.aadd("user", f"m{i}")
+
+    asyncio.run(requests())
+    memory.flush()
+    assert [m["content"] for m in memory.all_messages()] == [f"m{i}" for i in range(10)]
+    assert memory.stats()["pending"] == 0
+    memory.close()
+
+
+def test_sessions_are_paged_by_cursor(tmp_path):
+    memory = SQLiteMemory(tmp_path / "memory.db")
+    for i in range(5):
+        memory.add_many([("user", f"a{i}")], session_id="a")
+        memory.add("user", f"b{i}", session_id="b")
+
+    page = memory.page("a", limit=2)
+    assert [m["content"] for m in page.messages] == ["a0", "a1"]
+    page = memory.page("a", page.next_cursor, limit=2)
+    assert [m["content"] for m in page.messages] == ["a2", "a3"]
+    last = memory.page("a", page.next_cursor, limit=2)
+    assert [m["content"] for m in last.messages] == ["a4"] and last.next_cursor is None
+    assert [m["content"] for m in memory.recent("b", 2)] == ["b3", "b4"]
+    assert {m["session_id"] for m in memory.iter_messages("b", batch_size=2)} == {"b"}
+    plan = memory.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM messages WHERE session_id = 'a' AND id > 3"
+    ).fetchall()
+    assert "messages_session" in str(plan)
+    memory.close()
+
+
+def test_purge_archives_and_deletes_idle_sessions(tmp_path):
+    memory = SQLiteMemory(tmp_path / "memory.db")
+    memory.add_many([("user", "old"), ("assistant", "reply")], session_id="old")
+    memory.conn.execute("UPDATE sessions SET updated_at = 10 WHERE session_id = 'old'")
+    memory.conn.commit()
+    memory.add("user", "new", session_id="new")
+
+    archive = tmp_path / "archive.jsonl"
+    assert memory.purge_sessions(100, batch_size=1, archive=archive) == 1
+    memory.compact()
+    assert [m["session_id"] for m in memory.all_messages()] == ["new"]
+    lines = archive.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["content"] for line in lines] == ["old", "reply"]
+    memory.close()
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    path = tmp_path / "memory.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "role TEXT NOT NULL, content TEXT NOT NULL)"
+    )
+    conn.execute("INSERT INTO messages (role, content) VALUES ('user', 'hello')")
+    conn.commit()
+    conn.close()
+
+    before = time.time()
+    memory = SQLiteMemory(path)
+    migrated = memory.get(1)
+    assert migrated["session_id"] == "" and migrated["content"] == "hello"
+    assert migrated["created_at"] >= before
+    memory.add("user", "next", session_id="s")
+    assert [m["content"] for m in memory.recent("")] == ["hello"]
+    # Migrated history is as old as the migration, not the epoch.
+    assert memory.purge_sessions(before - 86400) == 0
+    memory.close()
+
+
+def test_sessions_migrated_with_zero_timestamps_are_backfilled(tmp_path):
+    path = tmp_path / "memory.db"
+    memory = SQLiteMemory(path)
+    memory.add("user", "hello")
+    with memory.conn:
+        memory.conn.execute("UPDATE messages SET created_at = 0")
+        memory.conn.execute("UPDATE sessions SET created_at = 0, updated_at = 0")
+    memory.close()
+
+    memory = SQLiteMemory(path)
+    assert memory.get(1)["created_at"] > 0
+    assert memory.purge_sessions(time.time() - 86400) == 0
+    memory.close()
+
+
+def test_recall_returns_similar_turns_of_the_session(tmp_path):
+    memory = SQLiteMemory(tmp_path / "memory.db", flush_interval=0.01)
+
+    async def turns():
+        await memory.aadd_turn("storage?", "S3", "a", embedding=np.array([1.0, 0.0]), capability_id="cap1")
+        await memory.aadd_turn("weather?", "sunny", "a", embedding=np.array([0.0, 1.0]))
+        await memory.aadd_turn("backups?", "Glacier", "a", embedding=np.array([0.8, 0.6]))
+        await memory.aadd_turn("storage?", "other", "b", embedding=np.array([1.0, 0.0]))
+
+    asyncio.run(turns())
+    memory.flush()
+    recalled = memory.recall("a", np.array([2.0, 0.0]), k=2, min_score=0.5)
+    assert [(t.question, t.answer) for t in recalled] == [("storage?", "S3"), ("backups?", "Glacier")]
+    assert recalled[0].capability_id == "cap1" and recalled[0].score > recalled[1].score
+
+    assert memory.purge_sessions(float("inf")) == 2
+    assert memory.recall("a", np.array([1.0, 0.0])) == []
+    memory.close()
+
+
+def test_short_term_sessions_are_bounded():
+    sessions = ShortTermSessions(max_sessions=2, limit=2)
+    sessions.get("a").add("user", "1")
+    sessions.get("b").add("user", "2")
+    sessions.get("a")
+    sessions.get("c")
+    assert len(sessions) == 2
+    assert sessions.get("a").context() == [{"role": "user", "content": "1"}]
+    assert sessions.get("b").context() == []
+
+
+def test_recall_includes_turns_still_queued(tmp_path):
+    memory = SQLiteMemory(tmp_path / "memory.db", flush_interval=0.01)
+    asyncio.run(memory.aadd_turn("storage?", "S3", "a", embedding=np.array([1.0, 0.0])))
+    memory.flush()
+    memory.flush_interval = 30  # keep the next turn queued
+    asyncio.run(
+        memory.aadd_turn("backups?", "Glacier", "a", embedding=np.array([0.8, 0.6]), capability_id="cap2")
+    )
+
+    recalled = memory.recall("a", np.array([1.0, 0.0]), k=2, min_score=0.5)
+    assert [(t.question, t.answer) for t in recalled] == [("storage?", "S3"), ("backups?", "Glacier")]
+    assert recalled[0].message_id > 0 > recalled[1].message_id
+    assert recalled[1].capability_id == "cap2"
+    assert memory.recall("b", np.array([1.0, 0.0])) == []
+    memory.close()
+    reopened = SQLiteMemory(tmp_path / "memory.db")
+    assert [m["content"] for m in reopened.recent("a")][-1] == "Glacier"
+    reopened.close()
@@ -0,0 +1,58 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from stage_graph import StageGraph, StageStats  # type: ignore  # noqa: E402
+
+
+def test_independent_stages_overlap():
+    graph = StageGraph()
+
+    async def slow(value):
+        await asyncio.sleep(0.05)
+        return value
+
+    graph.add("a", lambda: slow(1))
+    graph.add("b", lambda: slow(2))
+    graph.add("sum", lambda a, b: slow(a + b), "a", "b")
+
+    results = asyncio.run(graph.run())
+
+    assert results == {"a": 1, "b": 2, "sum": 3}
+    assert graph.timings["sum"][0] >= max(graph.timings["a"][1], graph.timings["b"][1])
+    path = graph.critical_path()
+    assert path["wall_ms"] < 140 and path["saved_ms"] >= 30
+    stats = StageStats()
+    stats.record(graph)
+    assert stats.stats()["runs"] == 1 and "sum_ms" in stats.stats()
+
+
+def test_failures_propagate_and_cancel_pending_stages():
+    graph = StageGraph()
+    cancelled = []
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def wait():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    graph.add("fail", fail)
+    graph.add("wait", wait)
+    graph.add("after", lambda value: asyncio.sleep(0), "fail")
+
+    with pytest.raises(ValueError):
+        asyncio.run(graph.run())
+    assert cancelled == [True]
+    with pytest.raises(ValueError):
+        graph.add("orphan", fail, "missing")
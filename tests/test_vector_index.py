@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "packages" / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import vector_index  # type: ignore  # noqa: E402
+
+
+@pytest.mark.parametrize("index_type", vector_index.INDEX_TYPES)
+def test_index_types_find_exact_matches(index_type):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype("float32")
+    index = vector_index.build_index(vectors, index_type, nlist=4, pq_m=16)
+    vector_index.configure_search(index, nprobe=4, ef_search=64)
+
+    _, ids = vector_index.search(index, vectors[:20], 5)
+
+    assert index.ntotal == 300
+    assert np.mean(ids[:, 0] == np.arange(20)) >= 0.9
+
+
+def test_inner_product_index_normalizes_vectors():
+    vectors = np.array([[3.0, 0.0], [0.0, 0.5]], dtype="float32")
+    index = vector_index.build_index(vectors, "flat", "ip")
+
+    scores, ids = vector_index.search(index, np.array([[10.0, 1.0]]), 2)
+
+    assert ids[0].tolist() == [0, 1]
+    assert scores[0][0] == pytest.approx(10 / np.sqrt(101), rel=1e-5)
+
+
+def test_tiny_corpus_and_recall():
+    vectors = np.arange(3, dtype="float32").reshape(3, 1)
+    for index_type in vector_index.INDEX_TYPES:
+        index = vector_index.build_index(vectors, index_type, "l2")
+        assert vector_index.search(index, vectors[:1], 10)[1].shape == (1, 3)
+
+    truth = np.array([[1, 2], [3, 4]])
+    assert vector_index.recall_at_k(truth, np.array([[2, 9], [3, 4]]), 2) == 0.75
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_store_round_trip(tmp_path, mmap):
+    vectors = np.eye(4, dtype="float32")
+    records = [{"id": f"r{i}", "description": str(i)} for i in range(4)]
+    index = vector_index.build_index(vectors, "flat")
+    vector_index.write_store("demo", index, records, tmp_path)
+
+    loaded, store = vector_index.read_store("demo", tmp_path, mmap=mmap)
+    _, ids = vector_index.search(loaded, vectors[2], 1)
+
+    assert ids[0, 0] == 2
+    assert store[2] == records[2]
+    assert store.position("r3") == 3
+    assert vector_index.warm_files(vector_index.store_paths("demo", tmp_path)) > 0